@@ -0,0 +1,425 @@
+"""
+# ---------------------------------------------------------------
+# Program:    benchmark.py
+# Purpose:    Measuring speed of cipher.py
+#
+# Description:
+# Compares the reference Rijndael scheme (encoder/decoder) with
+# the table-driven one (table_encoder/table_decoder) and with
+# the bitsliced engine, reports seconds needed to process one
+# megabyte of text. Optionally
+# measures counter mode throughput for different worker counts.
+# With --suite every stage of the scheme and whole messages of
+# growing size are measured, results can be saved as JSON and
+# compared with a baseline saved earlier
+# ---------------------------------------------------------------
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cipher
+import modes
+
+MEGABYTE = 1024 * 1024
+SUITE_SIZES = "16,1K,64K,1M"
+UNITS = {"K": 1024, "M": MEGABYTE}
+
+
+def time_call(function, *args):
+    """
+    Measures time of a single function call
+
+    Args:
+        function - function to call
+        args - arguments passed to the function
+
+    Returns:
+        elapsed, result - seconds of type float and value returned by function
+    """
+
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def bench_tables(sample_size):
+    """
+    Encrypts and decrypts the same random text with the reference \n
+    and with the table-driven scheme, verifies both give identical  \n
+    results and calculates speed per megabyte
+
+    Args:
+        sample_size - length of text used for measurement of type int
+
+    Returns:
+        results - seconds per MB for each scheme - dict
+    """
+
+    size = 16
+    rotate_rows_schema = (0, 1, 2, 3)
+    sbox = cipher.read_sbox(size)
+    inv_sbox = cipher.read_inv_sbox(size)
+    rcon = cipher.read_rcon(size)
+    key = [random.randrange(256) for i in range(size)]
+    text = "".join(chr(random.choice(range(4, 256))) for i in range(sample_size))
+
+    t_tables = cipher.generate_t_tables(sbox)
+    inv_t_tables = cipher.generate_inv_t_tables(inv_sbox)
+    round_keys = cipher.key_schedule(list(key), rcon, sbox)
+
+    elapsed_ref_enc, reference = time_call(
+        cipher.encoder, text, size, rotate_rows_schema, sbox, round_keys
+    )
+    elapsed_tab_enc, encrypted = time_call(
+        cipher.table_encoder, text, size, rotate_rows_schema, t_tables, round_keys
+    )
+    if reference != encrypted:
+        raise AssertionError("table_encoder output differs from encoder")
+
+    elapsed_ref_dec, reference = time_call(
+        cipher.decoder, encrypted, size, rotate_rows_schema, inv_sbox, round_keys
+    )
+    elapsed_tab_dec, decrypted = time_call(
+        cipher.table_decoder,
+        encrypted,
+        size,
+        rotate_rows_schema,
+        inv_t_tables,
+        round_keys,
+    )
+    if reference != decrypted or decrypted != text:
+        raise AssertionError("table_decoder output differs from decoder")
+
+    context = cipher.RijndaelContext(key, size, rotate_rows_schema, "bitslice")
+    elapsed_bit_enc, result = time_call(context.encrypt, text)
+    if result != encrypted:
+        raise AssertionError("bitslice engine output differs from encoder")
+    elapsed_bit_dec, result = time_call(context.decrypt, encrypted)
+    if result != text:
+        raise AssertionError("bitslice engine output differs from decoder")
+
+    scale = MEGABYTE / sample_size
+    return {
+        "encoder": elapsed_ref_enc * scale,
+        "table_encoder": elapsed_tab_enc * scale,
+        "decoder": elapsed_ref_dec * scale,
+        "table_decoder": elapsed_tab_dec * scale,
+        "bitslice_encoder": elapsed_bit_enc * scale,
+        "bitslice_decoder": elapsed_bit_dec * scale,
+    }
+
+
+def bench_ctr(sample_size, worker_counts):
+    """
+    Measures counter mode throughput for every number of worker \n
+    processes, pools are started before the measurement
+
+    Args:
+        sample_size - length of data used for measurement of type int
+        worker_counts - numbers of worker processes - list of type int
+
+    Returns:
+        results - MB/s for each number of workers - dict
+    """
+
+    context = cipher.RijndaelContext([random.randrange(256) for i in range(16)])
+    data = os.urandom(sample_size)
+    nonce = os.urandom(modes.NONCE_SIZE)
+    expected = modes.ctr_crypt(context, data, nonce)
+
+    results = {}
+    for workers in worker_counts:
+        with ProcessPoolExecutor(workers) as executor:
+            modes.ctr_crypt(context, data[:16], nonce, workers, executor)
+            elapsed, result = time_call(
+                modes.ctr_crypt, context, data, nonce, workers, executor
+            )
+        if result != expected:
+            raise AssertionError("parallel counter mode output differs")
+        results[workers] = sample_size / MEGABYTE / elapsed
+    return results
+
+
+def parse_size(text):
+    """
+    Converts size given as text with optional K/M suffix, ex. 64K
+
+    Args:
+        text - size of type string
+
+    Returns:
+        size - number of bytes of type int
+    """
+
+    text = text.strip().upper()
+    if text[-1:] in UNITS:
+        return int(text[:-1]) * UNITS[text[-1]]
+    return int(text)
+
+
+def measure(function, args, min_time):
+    """
+    Calls function again and again until min_time passes
+
+    Args:
+        function - function to call
+        args - arguments passed to the function - tuple
+        min_time - minimal time of measurement in seconds of type float
+
+    Returns:
+        calls, elapsed - number of calls of type int and seconds of type float
+    """
+
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        function(*args)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return calls, elapsed
+
+
+def rate(calls, elapsed, processed):
+    """
+    Builds single result entry
+
+    Args:
+        calls - number of calls of type int
+        elapsed - seconds of type float
+        processed - bytes processed by one call of type int
+
+    Returns:
+        result - ops/s and MB/s - dict
+    """
+
+    return {
+        "ops_per_s": calls / elapsed,
+        "mb_per_s": calls * processed / MEGABYTE / elapsed,
+    }
+
+
+def bench_stages(min_time):
+    """
+    Measures every stage of the reference scheme on a single block
+
+    Args:
+        min_time - minimal time of each measurement in seconds of type float
+
+    Returns:
+        results - ops/s and MB/s for each stage - dict
+    """
+
+    size = 16
+    sbox = cipher.read_sbox(size)
+    rcon = cipher.read_rcon(size)
+    key = [random.randrange(256) for i in range(size)]
+    block = [random.randrange(256) for i in range(size)]
+    text = "".join(chr(random.randrange(4, 256)) for i in range(size))
+
+    stages = {
+        "GF": (cipher.GF, (random.randrange(256), random.randrange(256)), 1),
+        "sub_bytes": (cipher.sub_bytes, (block, size, sbox), size),
+        "rotate_rows": (cipher.rotate_rows, (block, (0, 1, 2, 3)), size),
+        "mix_columns": (cipher.mix_columns, (block,), size),
+        "inv_mix_columns": (cipher.inv_mix_columns, (block,), size),
+        "key_schedule": (lambda: cipher.key_schedule(list(key), rcon, sbox), (), size),
+        "create_blocks": (cipher.create_blocks, (text, size, "encoder"), size),
+    }
+    results = {}
+    for name, (function, args, processed) in stages.items():
+        results[name] = rate(*measure(function, args, min_time), processed)
+    return results
+
+
+def bench_messages(sizes, min_time, engine=None):
+    """
+    Measures encode_message and decode_message for texts of every size
+
+    Args:
+        sizes - lengths of texts - list of type int
+        min_time - minimal time of each measurement in seconds of type float
+        engine - one of cipher.ENGINES keys, default engine when omitted
+
+    Returns:
+        results - ops/s and MB/s for each function and size - dict
+    """
+
+    key = [random.randrange(256) for i in range(16)]
+    results = {}
+    for size in sizes:
+        text = bytes(random.randrange(4, 256) for i in range(size)).decode("latin1")
+        encoded = cipher.encode_message(text, key, engine)
+        if cipher.decode_message(encoded, key, engine) != text:
+            raise AssertionError("decode_message does not restore the text")
+        results["encode_message/{}".format(size)] = rate(
+            *measure(cipher.encode_message, (text, key, engine), min_time), size
+        )
+        results["decode_message/{}".format(size)] = rate(
+            *measure(cipher.decode_message, (encoded, key, engine), min_time), size
+        )
+    return results
+
+
+def run_suite(sizes, min_time, engine=None):
+    """
+    Runs stage and message benchmarks
+
+    Args:
+        sizes - lengths of texts - list of type int
+        min_time - minimal time of each measurement in seconds of type float
+        engine - one of cipher.ENGINES keys, default engine when omitted
+
+    Returns:
+        report - environment description and results - dict
+    """
+
+    results = bench_stages(min_time)
+    results.update(bench_messages(sizes, min_time, engine))
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "engine": engine or cipher.DEFAULT_ENGINE,
+        "results": results,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Finds benchmarks slower than in the baseline by more than tolerance
+
+    Args:
+        results - results of run_suite - dict
+        baseline - results of run_suite saved earlier - dict
+        tolerance - allowed slowdown, ex. 0.1 means 10% - type float
+
+    Returns:
+        regressions - name, baseline and current ops/s - list of tuples
+    """
+
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        previous = baseline[name]["ops_per_s"]
+        if result["ops_per_s"] < previous * (1 - tolerance):
+            regressions.append((name, previous, result["ops_per_s"]))
+    return regressions
+
+
+def print_suite(results):
+    """
+    Prints results of run_suite as a table
+
+    Args:
+        results - ops/s and MB/s for each benchmark - dict
+
+    Returns:
+        None
+    """
+
+    print("{:<28}{:>14}{:>12}".format("benchmark", "ops/s", "MB/s"))
+    for name, result in results.items():
+        print(
+            "{:<28}{:>14.1f}{:>12.3f}".format(
+                name, result["ops_per_s"], result["mb_per_s"]
+            )
+        )
+
+
+def suite(args):
+    """
+    Runs the suite from command line arguments
+
+    Args:
+        args - parsed command line arguments
+
+    Returns:
+        status - 1 when regressions were found, 0 otherwise - type int
+    """
+
+    sizes = [parse_size(size) for size in args.sizes.split(",")]
+    report = run_suite(sizes, args.min_time, args.engine)
+    print_suite(report["results"])
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    regressions = compare(report["results"], baseline["results"], args.tolerance)
+    for name, previous, current in regressions:
+        print("REGRESSION {}: {:.1f} -> {:.1f} ops/s".format(name, previous, current))
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rijndael cipher benchmark")
+    parser.add_argument(
+        "--sample", type=int, default=16384, help="bytes of text to measure"
+    )
+    parser.add_argument(
+        "--ctr-workers",
+        default="",
+        help="comma separated worker counts for counter mode, ex. 1,2,4",
+    )
+    parser.add_argument(
+        "--ctr-sample", type=int, default=4 * MEGABYTE, help="bytes for counter mode"
+    )
+    parser.add_argument(
+        "--suite", action="store_true", help="measure every stage and whole messages"
+    )
+    parser.add_argument(
+        "--sizes",
+        default=SUITE_SIZES,
+        help="comma separated text lengths for the suite, ex. 16,1K,1M,100M",
+    )
+    parser.add_argument(
+        "--min-time", type=float, default=0.2, help="seconds for each measurement"
+    )
+    parser.add_argument("--engine", choices=sorted(cipher.ENGINES))
+    parser.add_argument("--output", help="save suite results as JSON")
+    parser.add_argument("--baseline", help="JSON saved earlier with --output")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.1, help="allowed slowdown, 0.1 = 10%%"
+    )
+    args = parser.parse_args()
+
+    if args.suite:
+        sys.exit(suite(args))
+
+    results = bench_tables(args.sample)
+    print("{:<16}{:>12}".format("function", "s/MB"))
+    for name, seconds in results.items():
+        print("{:<16}{:>12.3f}".format(name, seconds))
+    print(
+        "speedup: encrypt x{:.1f}, decrypt x{:.1f}".format(
+            results["encoder"] / results["table_encoder"],
+            results["decoder"] / results["table_decoder"],
+        )
+    )
+    print(
+        "bitslice speedup: encrypt x{:.1f}, decrypt x{:.1f}".format(
+            results["encoder"] / results["bitslice_encoder"],
+            results["decoder"] / results["bitslice_decoder"],
+        )
+    )
+
+    if args.ctr_workers:
+        worker_counts = [int(count) for count in args.ctr_workers.split(",")]
+        print("\n{:<16}{:>12}".format("CTR workers", "MB/s"))
+        for workers, speed in bench_ctr(args.ctr_sample, worker_counts).items():
+            print("{:<16}{:>12.3f}".format(workers, speed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+# ---------------------------------------------------------------
+# Program:    bulk.py
+# Purpose:    Encrypting or decrypting whole directory trees
+#
+# Description:
+# Walks a directory and processes every file with cipher.py
+# into the same relative path in the output directory. Files
+# are given to worker processes largest first, so big files do
+# not end up waiting until the end. Every file is streamed in
+# chunks (memory of a worker depends only on the chunk size) and
+# written atomically, so an interrupted run leaves only
+# complete outputs. Files whose output is newer than the input
+# are skipped, so running the same command again resumes it.
+# ---------------------------------------------------------------
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cipher
+
+MEGABYTE = 1024 * 1024
+
+
+def collect_files(src_dir, dst_dir):
+    """
+    Finds every file in src_dir and its output path in dst_dir, \n
+    dst_dir is left out when it lies inside src_dir
+
+    Args:
+        src_dir - input directory of type string
+        dst_dir - output directory of type string
+
+    Returns:
+        files - input path, output path and size, largest first - list of tuples
+    """
+
+    dst_dir = os.path.abspath(dst_dir)
+    files = []
+    for directory, subdirectories, names in os.walk(src_dir):
+        subdirectories[:] = [
+            name
+            for name in subdirectories
+            if os.path.abspath(os.path.join(directory, name)) != dst_dir
+        ]
+        for name in names:
+            src_path = os.path.join(directory, name)
+            if not os.path.isfile(src_path):
+                continue
+            dst_path = os.path.join(dst_dir, os.path.relpath(src_path, src_dir))
+            files.append((src_path, dst_path, os.path.getsize(src_path)))
+    files.sort(key=lambda file: file[2], reverse=True)
+    return files
+
+
+def is_done(src_path, dst_path):
+    """
+    Checks if the output was written after the input was last changed, \n
+    outputs are written atomically, so an existing one is complete
+
+    Args:
+        src_path - input file of type string
+        dst_path - output file of type string
+
+    Returns:
+        True when the file can be skipped
+    """
+
+    try:
+        return os.path.getmtime(dst_path) >= os.path.getmtime(src_path)
+    except OSError:
+        return False
+
+
+def process_file(command, key, engine, src_path, dst_path, chunk_size):
+    """
+    Encrypts or decrypts one file, runs in a worker process
+
+    Args:
+        command - "encrypt" or "decrypt" of type string
+        key - key as 16 values of type bytes, expanded once per process (cipher.KEY_CACHE)
+        engine - one of cipher.ENGINES keys of type string
+        src_path - input file of type string
+        dst_path - output file of type string
+        chunk_size - number of bytes read at once of type int
+
+    Returns:
+        size - number of processed bytes of type int
+    """
+
+    context = cipher.get_context(key, engine)
+    os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+    if command == "encrypt":
+        cipher.encrypt_file(src_path, dst_path, context, chunk_size)
+    else:
+        cipher.decrypt_file(src_path, dst_path, context, chunk_size)
+    return os.path.getsize(src_path)
+
+
+def process_tree(
+    command,
+    src_dir,
+    dst_dir,
+    key,
+    workers=1,
+    engine=None,
+    chunk_size=cipher.STREAM_CHUNK,
+    force=False,
+):
+    """
+    Encrypts or decrypts every file of src_dir into dst_dir, \n
+    with one worker files are processed in the calling process. \n
+    A failed file does not stop the others.
+
+    Args:
+        command - "encrypt" or "decrypt" of type string
+        src_dir - input directory of type string
+        dst_dir - output directory of type string
+        key - key prepared by parse_key - list of type int
+        workers - number of worker processes of type int
+        engine - one of cipher.ENGINES keys, default engine when omitted
+        chunk_size - number of bytes read at once of type int
+        force - process also files done in an earlier run of type bool
+
+    Returns:
+        report - processed/skipped files, failures, bytes, seconds and MB/s - dict
+    """
+
+    if command not in ("encrypt", "decrypt"):
+        raise ValueError("Unknown command {!r}".format(command))
+    key = bytes(key)
+    engine = cipher.get_engine(engine)
+
+    start = time.perf_counter()
+    files = collect_files(src_dir, dst_dir)
+    pending = [file for file in files if force or not is_done(file[0], file[1])]
+    report = {
+        "files": 0,
+        "skipped": len(files) - len(pending),
+        "failed": {},
+        "bytes": 0,
+    }
+
+    def finished(src_path, result):
+        try:
+            report["bytes"] += result()
+            report["files"] += 1
+        except (OSError, ValueError) as error:
+            report["failed"][src_path] = str(error)
+
+    if workers <= 1:
+        for src_path, dst_path, size in pending:
+            finished(
+                src_path,
+                lambda: process_file(
+                    command, key, engine, src_path, dst_path, chunk_size
+                ),
+            )
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            # tasks are started in order of submission, the largest first
+            futures = {
+                executor.submit(
+                    process_file, command, key, engine, src_path, dst_path, chunk_size
+                ): src_path
+                for src_path, dst_path, size in pending
+            }
+            for future in as_completed(futures):
+                finished(futures[future], future.result)
+
+    report["seconds"] = time.perf_counter() - start
+    report["mb_per_s"] = report["bytes"] / MEGABYTE / report["seconds"]
+    return report
+
+
+def main(argv=None):
+    """
+    Command line interface, ex.                                        \n
+    python bulk.py encrypt documents documents.enc --key 0123456789abcdef \n
+    python bulk.py decrypt documents.enc documents --key 0123456789abcdef \n
+    key can be also given by RIJNDAEL_KEY environment variable
+
+    Args:
+        argv - command line arguments - list of type string
+
+    Returns:
+        exit code, 1 when any file failed - type int
+    """
+
+    parser = argparse.ArgumentParser(description="Rijndael cipher for directory trees")
+    parser.add_argument("command", choices=("encrypt", "decrypt"))
+    parser.add_argument("src", help="input directory")
+    parser.add_argument("dst", help="output directory")
+    parser.add_argument("--key", default=os.environ.get("RIJNDAEL_KEY", ""))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--engine", choices=tuple(cipher.ENGINES), default=None)
+    parser.add_argument("--chunk-size", type=int, default=cipher.STREAM_CHUNK)
+    parser.add_argument(
+        "--force", action="store_true", help="process also files done earlier"
+    )
+    args = parser.parse_args(argv)
+
+    key = cipher.parse_key(args.key)
+    if key is None:
+        parser.error("KEY not accepted, it must consist of 16 characters")
+    if args.chunk_size <= 0:
+        parser.error("chunk size must be positive")
+    if not os.path.isdir(args.src):
+        parser.error("{} is not a directory".format(args.src))
+    if os.path.abspath(args.src) == os.path.abspath(args.dst):
+        parser.error("output directory must differ from input directory")
+
+    report = process_tree(
+        args.command,
+        args.src,
+        args.dst,
+        key,
+        args.workers,
+        args.engine,
+        args.chunk_size,
+        args.force,
+    )
+    for path, error in report["failed"].items():
+        print("FAILED {}: {}".format(path, error))
+    print(
+        "{} files, {} skipped, {} failed, {:.1f} MB in {:.2f} s, {:.2f} MB/s".format(
+            report["files"],
+            report["skipped"],
+            len(report["failed"]),
+            report["bytes"] / MEGABYTE,
+            report["seconds"],
+            report["mb_per_s"],
+        )
+    )
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
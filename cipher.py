@@ -14,8 +14,37 @@
 # cipher keys with lengths of 128 bits
 # ---------------------------------------------------------------
 """
+import argparse
+import base64
+import bisect
+import collections
+import contextlib
+import functools
+import hashlib
+import io
+import logging
+import mmap
 import random
+import struct
 import os
+import sys
+import tempfile
+import threading
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+NUMPY_CHUNK = 16 * 65536
+BITSLICE_CHUNK = 16 * 2048
+CIPHERTEXT_FORMATS = ("decimal", "hex", "base64", "raw")
+STREAM_CHUNK = 1024 * 1024
+READER_CACHE_BLOCKS = 4096
+KEY_CACHE_CAPACITY = int(os.environ.get("RIJNDAEL_KEY_CACHE", "128"))
+TABLES_MODULE = "cipher_tables"
+LATENCY_BUCKETS = (0.00001, 0.0001, 0.001, 0.01, 0.1, 1.0, 10.0)
 
 
 def read_sbox(size):
@@ -66,10 +95,32 @@ def read_inv_sbox(size):
     return inv_sbox
 
 
+def table_text(values):
+    """
+    Formats table values as in data/*.txt files, 16 hex numbers in a row
+
+    Args:
+        values - table values - list of type int
+
+    Returns:
+        text - formatted values of type string
+    """
+
+    text = ""
+    for counter, item in enumerate(values, 1):
+        text += "0x{:02x} ".format(item)
+        if counter % 16 == 0:
+            text += "\n"
+    return text
+
+
 def generate_inside_key(size):
     """
     Generate inside key (sbox) and inverted key (inv_sbox) \n
-    Saves values to files: "sbox.txt", "inv_sbox.txt"
+    Saves values to files: "sbox.txt", "inv_sbox.txt".     \n
+    Processes starting together may call it at once, so   \n
+    sbox.txt is never overwritten (the first one is kept)  \n
+    and inv_sbox.txt is always computed from the kept sbox
 
     Args:
         size - amount of columns/rows - number of type int
@@ -80,30 +131,31 @@ def generate_inside_key(size):
 
     list_xy = []
     sbox = []
-    inv_sbox = []
     for i in range(size**2):
         list_xy.append(i)
 
-    for i in range(size**2):
-        inv_sbox.append(None)
-
     for i in range(size**2):
         rand_num = random.randrange(0, len(list_xy))
-        rand_element = list_xy[rand_num]
-        inv_sbox[rand_element] = i
         sbox.append(list_xy.pop(rand_num))
 
-    with open("data/sbox.txt", "w") as file:
-        for counter, item in enumerate(sbox, 1):
-            file.write("0x{:02x} ".format(item))
-            if counter % 16 == 0:
-                file.write("\n")
+    descriptor, temp_path = tempfile.mkstemp(
+        dir="data", prefix=".sbox.txt.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(descriptor, "w") as file:
+            file.write(table_text(sbox))
+        os.link(temp_path, "data/sbox.txt")
+    except FileExistsError:
+        pass
+    finally:
+        os.remove(temp_path)
 
-    with open("data/inv_sbox.txt", "w") as file:
-        for counter, item in enumerate(inv_sbox, 1):
-            file.write("0x{:02x} ".format(item))
-            if counter % 16 == 0:
-                file.write("\n")
+    sbox = read_sbox(size)
+    inv_sbox = [None] * len(sbox)
+    for i, item in enumerate(sbox):
+        inv_sbox[item] = i
+    with atomic_open("data/inv_sbox.txt") as file:
+        file.write(table_text(inv_sbox).encode())
 
 
 def read_user_key():
@@ -173,11 +225,9 @@ def generate_rcon(size):
                 c ^= 0x1B
         return c
 
-    with open("data/rcon.txt", "w") as file:
-        for i in range(size**2):
-            file.write("0x" + ("{:02x}".format(generate_rcon_number(i))[-2:]) + " ")
-            if i % 16 == 15:
-                file.write("\n")
+    rcon = [generate_rcon_number(i) & 0xFF for i in range(size**2)]
+    with atomic_open("data/rcon.txt") as file:
+        file.write(table_text(rcon).encode())
 
 
 def create_blocks(message, size, calling_function):
@@ -196,23 +246,18 @@ def create_blocks(message, size, calling_function):
     if calling_function == "decoder":
         blocks = []
         message = list(map(int, message.strip().split(" ")))
-        while len(message) > 0:
-            message_block = message[:size]
-            while len(message) < size:
+        for start in range(0, len(message), size):
+            message_block = message[start : start + size]
+            while len(message_block) < size:
                 message_block.append(3)
-            message = message[size:]
             blocks.append(message_block)
         return blocks
     elif calling_function == "encoder":
         blocks = []
-        while len(message) > 0:
-            message_block = []
-            while len(message) < size:
-                message += chr(3)
-            for i in range(size):
-                message_block.append(ord(message[i]))
-            message = message[size:]
-            blocks.append(message_block)
+        if len(message) % size:
+            message += chr(3) * (size - len(message) % size)
+        for start in range(0, len(message), size):
+            blocks.append([ord(char) for char in message[start : start + size]])
         return blocks
     return 0
 
@@ -515,22 +560,21 @@ def add_round_key(block, round_key, size):
     return block
 
 
-def encoder(string_text, size, rotate_rows_schema, sbox, round_keys):
+def encrypt_rounds(blocks, size, rotate_rows_schema, sbox, round_keys):
     """
-    Recreates the entire Rijndael encryption scheme
+    Runs all rounds of the Rijndael encryption scheme over blocks
 
     Args:
-        string_text - delivered by user text to be encrypted of type string
+        blocks - blocks created by create_blocks - list of lists of type int
         size - amount of columns/rows - number of type int
         rotate_rows_schema - four digit one for each row in a tuple ex. (0,1,2,3)
         sbox - byte substition table - a list of type int
         round_keys - keys generated by key_schedule for all rounds - list of lists of type int
 
     Returns:
-        output - encrypted text of type string
+        blocks - encrypted blocks - list of lists of type int
     """
 
-    blocks = create_blocks(string_text, size, "encoder")
     actual_round = 0
     for block in blocks:
         block = add_round_key(block, round_keys[0], size)
@@ -561,30 +605,51 @@ def encoder(string_text, size, rotate_rows_schema, sbox, round_keys):
     for block in blocks:
         block = add_round_key(block, round_keys[actual_round], size)
 
-    output = ""
-    for block in blocks:
-        for char in block:
-            output += str(char) + " "
+    return blocks
+
 
-    return output.strip()
+def encoder(
+    string_text, size, rotate_rows_schema, sbox, round_keys, ciphertext_format="decimal"
+):
+    """
+    Recreates the entire Rijndael encryption scheme
 
+    Args:
+        string_text - delivered by user text to be encrypted of type string
+        size - amount of columns/rows - number of type int
+        rotate_rows_schema - four digit one for each row in a tuple ex. (0,1,2,3)
+        sbox - byte substition table - a list of type int
+        round_keys - keys generated by key_schedule for all rounds - list of lists of type int
+        ciphertext_format - one of CIPHERTEXT_FORMATS of type string
 
-def decoder(string_text, size, rotate_rows_schema, inv_sbox, round_keys):
+    Returns:
+        output - encrypted text of type string
     """
-    Recreates the entire Rijndael decryption scheme
+
+    blocks = create_blocks(string_text, size, "encoder")
+    blocks = encrypt_rounds(blocks, size, rotate_rows_schema, sbox, round_keys)
+
+    if ciphertext_format != "decimal":
+        data = bytes(char for block in blocks for char in block)
+        return format_ciphertext(data, ciphertext_format)
+    return " ".join(str(char) for block in blocks for char in block)
+
+
+def decrypt_rounds(blocks, size, rotate_rows_schema, inv_sbox, round_keys):
+    """
+    Runs all rounds of the Rijndael decryption scheme over blocks
 
     Args:
-        string_text - delivered by user text to be decrypted of type string
+        blocks - blocks created by create_blocks - list of lists of type int
         size - amount of columns/rows - number of type int
         rotate_rows_schema - four digit one for each row in a tuple ex. (0,1,2,3)
         inv_sbox - inversed byte substition table - a list of type int
         round_keys - keys generated by key_schedule for all rounds - list of lists of type int
 
     Returns:
-        output - decrypted text of type string
+        blocks - decrypted blocks - list of lists of type int
     """
 
-    blocks = create_blocks(string_text, size, "decoder")
     actual_round = 10
     for block in blocks:
         block = add_round_key(block, round_keys[actual_round], size)
@@ -617,90 +682,2784 @@ def decoder(string_text, size, rotate_rows_schema, inv_sbox, round_keys):
     for block in blocks:
         block = add_round_key(block, round_keys[actual_round], size)
 
-    output = ""
-    for block in blocks:
-        for char in block:
-            if char != 3:
-                output += chr(char)
+    return blocks
 
-    return output
 
+def decoder(
+    string_text,
+    size,
+    rotate_rows_schema,
+    inv_sbox,
+    round_keys,
+    ciphertext_format="decimal",
+):
+    """
+    Recreates the entire Rijndael decryption scheme
+
+    Args:
+        string_text - delivered by user text to be decrypted of type string (bytes for raw format)
+        size - amount of columns/rows - number of type int
+        rotate_rows_schema - four digit one for each row in a tuple ex. (0,1,2,3)
+        inv_sbox - inversed byte substition table - a list of type int
+        round_keys - keys generated by key_schedule for all rounds - list of lists of type int
+        ciphertext_format - one of CIPHERTEXT_FORMATS of type string
+
+    Returns:
+        output - decrypted text of type string
+    """
+
+    if ciphertext_format == "decimal":
+        blocks = create_blocks(string_text, size, "decoder")
+    else:
+        data = parse_ciphertext(string_text, size, ciphertext_format)
+        blocks = [list(data[i : i + size]) for i in range(0, len(data), size)]
+    blocks = decrypt_rounds(blocks, size, rotate_rows_schema, inv_sbox, round_keys)
+
+    return "".join(chr(char) for block in blocks for char in block if char != 3)
 
-def encode_message(message):
+
+def gf_table(factor):
     """
-    Preparing all needed data and run function that \n
-    recreate the entire Rijndael encryption scheme
+    Precomputes Galois multiplication of every byte by a given factor
+
     Args:
-        message - delivered by user text to be encrypted of type string
+        factor - value multiplying every byte of type int
+
     Returns:
-        output - encrypted text of type string
+        table - GF(factor, x) for x in 0..255 - List of type int
     """
 
-    if not os.path.exists("data/key.txt"):
-        return None
+    return [GF(factor, x) for x in range(256)]
 
-    size = 16
-    rotate_rows_schema = (0, 1, 2, 3)
 
-    rcon = read_rcon(size)
-    sbox = read_sbox(size)
+@functools.lru_cache(maxsize=None)
+def load_gf_table(factor):
+    """
+    Galois multiplication table of a factor, generated once
+
+    Args:
+        factor - value multiplying every byte of type int
 
-    round_keys = key_schedule(read_user_key(), rcon, sbox)
+    Returns:
+        table - GF(factor, x) for x in 0..255 - tuple of type int
+    """
 
-    encoded_message = encoder(message, size, rotate_rows_schema, sbox, round_keys)
+    return tuple(gf_table(factor))
 
-    if os.path.exists("data/key.txt"):
-        os.remove("data/key.txt")
 
-    return encoded_message
+def mix_columns_in_place(block, mul2, mul3):
+    """
+    Mix Columns (the same matrix as mix_columns) writing results \n
+    back to block, values are multiplied by lookup tables, so    \n
+    no list or number is created
 
+    Args:
+        block - an list to be multiplied of numbers of type int
+        mul2, mul3 - tables made by load_gf_table(2), load_gf_table(3)
 
-def decode_message(message):
+    Returns:
+        block - the same list after multiplication - List of type int
     """
-    Preparing all needed data and run function that \n
-    recreate the entire Rijndael decryption scheme
+
+    for i in (0, 4, 8, 12):
+        a0 = block[i]
+        a1 = block[i + 1]
+        a2 = block[i + 2]
+        a3 = block[i + 3]
+        block[i] = mul2[a0] ^ mul3[a1] ^ a2 ^ a3
+        block[i + 1] = a0 ^ mul2[a1] ^ mul3[a2] ^ a3
+        block[i + 2] = a0 ^ a1 ^ mul2[a2] ^ mul3[a3]
+        block[i + 3] = mul3[a0] ^ a1 ^ a2 ^ mul2[a3]
+    return block
+
+
+def inv_mix_columns_in_place(block, mul9, mul11, mul13, mul14):
+    """
+    Inverted Mix Columns (the same matrix as inv_mix_columns) \n
+    writing results back to block
+
     Args:
-        message - delivered by user text to be decrypted of type string
+        block - an list to be multiplied of numbers of type int
+        mul9, mul11, mul13, mul14 - tables made by load_gf_table
+
     Returns:
-        output - decrypted text of type string
+        block - the same list after multiplication - List of type int
     """
 
-    if not os.path.exists("data/key.txt"):
-        return None
+    for i in (0, 4, 8, 12):
+        a0 = block[i]
+        a1 = block[i + 1]
+        a2 = block[i + 2]
+        a3 = block[i + 3]
+        block[i] = mul14[a0] ^ mul11[a1] ^ mul13[a2] ^ mul9[a3]
+        block[i + 1] = mul9[a0] ^ mul14[a1] ^ mul11[a2] ^ mul13[a3]
+        block[i + 2] = mul13[a0] ^ mul9[a1] ^ mul14[a2] ^ mul11[a3]
+        block[i + 3] = mul11[a0] ^ mul13[a1] ^ mul9[a2] ^ mul14[a3]
+    return block
 
-    size = 16
-    rotate_rows_schema = (0, 1, 2, 3)
 
-    rcon = read_rcon(size)
-    sbox = read_sbox(size)
-    inv_sbox = read_inv_sbox(size)
-    round_keys = key_schedule(read_user_key(), rcon, sbox)
+def pipeline_encrypt_blocks(src, dst, rotate_rows_schema, sbox, round_keys):
+    """
+    Encrypts whole 16-byte blocks one by one, every block goes  \n
+    through all rounds while it is hot. All steps change a single \n
+    state list made once, so rounds do not allocate anything.    \n
+    Results are the same as produced by encoder.
+
+    Args:
+        src - blocks to encrypt, length divisible by 16 - bytes-like object
+        dst - buffer for encrypted blocks, may be src itself - bytearray
+        rotate_rows_schema - four digit one for each row in a tuple ex. (0,1,2,3)
+        sbox - byte substition table - bytes or list of type int
+        round_keys - keys generated by key_schedule for all rounds - list of lists of type int
 
-    decoded_message = decoder(message, size, rotate_rows_schema, inv_sbox, round_keys)
+    Returns:
+        dst - encrypted blocks - bytearray
+    """
 
-    if os.path.exists("data/key.txt"):
-        os.remove("data/key.txt")
+    mul2, mul3 = load_gf_table(2), load_gf_table(3)
+    first_key, middle_keys, last_key = round_keys[0], round_keys[1:-1], round_keys[-1]
+    state = [0] * 16
+    for offset in range(0, len(src) - len(src) % 16, 16):
+        for i in range(16):
+            state[i] = src[offset + i] ^ first_key[i]
+        for round_key in middle_keys:
+            sub_bytes(state, 16, sbox)
+            rotate_rows(state, rotate_rows_schema)
+            mix_columns_in_place(state, mul2, mul3)
+            add_round_key(state, round_key, 16)
+        sub_bytes(state, 16, sbox)
+        rotate_rows(state, rotate_rows_schema)
+        for i in range(16):
+            dst[offset + i] = state[i] ^ last_key[i]
+    return dst
+
+
+def pipeline_decrypt_blocks(src, dst, rotate_rows_schema, inv_sbox, round_keys):
+    """
+    Decrypts whole 16-byte blocks one by one with a single state \n
+    list, as in pipeline_encrypt_blocks. Results are the same as  \n
+    produced by decoder.
 
-    return decoded_message
+    Args:
+        src - blocks to decrypt, length divisible by 16 - bytes-like object
+        dst - buffer for decrypted blocks, may be src itself - bytearray
+        rotate_rows_schema - four digit one for each row in a tuple ex. (0,1,2,3)
+        inv_sbox - inversed byte substition table - bytes or list of type int
+        round_keys - keys generated by key_schedule for all rounds - list of lists of type int
 
+    Returns:
+        dst - decrypted blocks - bytearray
+    """
 
-def add_key(provided_key):
+    mul9, mul11, mul13, mul14 = (load_gf_table(factor) for factor in (9, 11, 13, 14))
+    first_key, middle_keys, last_key = (
+        round_keys[0],
+        round_keys[-2:0:-1],
+        round_keys[-1],
+    )
+    state = [0] * 16
+    for offset in range(0, len(src) - len(src) % 16, 16):
+        for i in range(16):
+            state[i] = src[offset + i] ^ last_key[i]
+        inv_rotate_rows(state, rotate_rows_schema)
+        inv_sub_bytes(state, 16, inv_sbox)
+        for round_key in middle_keys:
+            add_round_key(state, round_key, 16)
+            inv_mix_columns_in_place(state, mul9, mul11, mul13, mul14)
+            inv_rotate_rows(state, rotate_rows_schema)
+            inv_sub_bytes(state, 16, inv_sbox)
+        for i in range(16):
+            dst[offset + i] = state[i] ^ first_key[i]
+    return dst
+
+
+def generate_t_tables(sbox):
     """
-    Save key provided by user to file "KEY.txt". \n
-    Key would be ready for next operation, after \n
-    will be deleted
+    Generates encryption lookup tables which merge Sub Bytes    \n
+    and Mix Columns into one 32-bit word per byte, ex.          \n
+
+    t_tables[0][x] = 02*S[x] 01*S[x] 01*S[x] 03*S[x]            \n
+    t_tables[1][x] = 03*S[x] 02*S[x] 01*S[x] 01*S[x]            \n
+    t_tables[2][x] = 01*S[x] 03*S[x] 02*S[x] 01*S[x]            \n
+    t_tables[3][x] = 01*S[x] 01*S[x] 03*S[x] 02*S[x]            \n
+
+    t_tables[4..7] hold S[x] alone on every byte position of the word,
+    they are used by the last round, which has no Mix Columns.
+    Tables are derived from the delivered sbox, so any sbox is supported.
 
     Args:
-        key - key provided by user - list of type int
+        sbox - byte substition table - a list of type int
 
     Returns:
-        output - True if key was suitable, otherwise False
+        t_tables - eight tables of 256 words - tuple of lists of type int
     """
-    if len(provided_key) == 16:
-        with open("data/key.txt", "w") as file:
-            for counter, char in enumerate(provided_key, 1):
-                file.write("0x{:02x} ".format(ord(char)))
-                if counter % 4 == 0:
-                    file.write("\n")
-        return True
-    return False
+
+    mul2 = gf_table(2)
+    mul3 = gf_table(3)
+    t0, t1, t2, t3 = [], [], [], []
+    for x in range(256):
+        s = sbox[x]
+        t0.append(mul2[s] << 24 | s << 16 | s << 8 | mul3[s])
+        t1.append(mul3[s] << 24 | mul2[s] << 16 | s << 8 | s)
+        t2.append(s << 24 | mul3[s] << 16 | mul2[s] << 8 | s)
+        t3.append(s << 24 | s << 16 | mul3[s] << 8 | mul2[s])
+    final = [[sbox[x] << shift for x in range(256)] for shift in (24, 16, 8, 0)]
+    return (t0, t1, t2, t3, *final)
+
+
+def generate_inv_t_tables(inv_sbox):
+    """
+    Generates decryption lookup tables for the equivalent inverse \n
+    cipher, which merge Inverted Sub Bytes and Inverted Mix       \n
+    Columns into one 32-bit word per byte, ex. for x = IS[x]:      \n
+
+    inv_t_tables[0][x] = 14*IS[x] 09*IS[x] 13*IS[x] 11*IS[x]       \n
+    inv_t_tables[1][x] = 11*IS[x] 14*IS[x] 09*IS[x] 13*IS[x]       \n
+    inv_t_tables[2][x] = 13*IS[x] 11*IS[x] 14*IS[x] 09*IS[x]       \n
+    inv_t_tables[3][x] = 09*IS[x] 13*IS[x] 11*IS[x] 14*IS[x]       \n
+
+    inv_t_tables[4..7] hold inv_sbox[x] alone on every byte position,
+    they are used by the last round, which has no Inverted Mix Columns.
+
+    Args:
+        inv_sbox - inversed byte substition table - a list of type int
+
+    Returns:
+        inv_t_tables - eight tables of 256 words - tuple of lists of type int
+    """
+
+    mul9 = gf_table(9)
+    mul11 = gf_table(11)
+    mul13 = gf_table(13)
+    mul14 = gf_table(14)
+    t0, t1, t2, t3 = [], [], [], []
+    for x in range(256):
+        s = inv_sbox[x]
+        t0.append(mul14[s] << 24 | mul9[s] << 16 | mul13[s] << 8 | mul11[s])
+        t1.append(mul11[s] << 24 | mul14[s] << 16 | mul9[s] << 8 | mul13[s])
+        t2.append(mul13[s] << 24 | mul11[s] << 16 | mul14[s] << 8 | mul9[s])
+        t3.append(mul9[s] << 24 | mul13[s] << 16 | mul11[s] << 8 | mul14[s])
+    final = [[inv_sbox[x] << shift for x in range(256)] for shift in (24, 16, 8, 0)]
+    return (t0, t1, t2, t3, *final)
+
+
+def round_key_words(round_keys):
+    """
+    Packs every round key into four 32-bit words (one word for each row)
+
+    Args:
+        round_keys - keys generated by key_schedule for all rounds - list of lists of type int
+
+    Returns:
+        words - round keys as words - List of tuples of type int
+    """
+
+    return [struct.unpack(">4I", bytes(round_key)) for round_key in round_keys]
+
+
+def inverse_key_words(round_keys):
+    """
+    Packs round keys for the equivalent inverse cipher (FIPS 197 5.3.5). \n
+    decoder adds round key before Inverted Mix Columns, it is linear,  \n
+    so InvMix(x ^ k) = InvMix(x) ^ InvMix(k) and keys of middle rounds  \n
+    multiplied once by Inverted Mix Columns let inverse rounds be       \n
+    looked up the same way as encryption rounds
+
+    Args:
+        round_keys - keys generated by key_schedule for all rounds - list of lists of type int
+
+    Returns:
+        words - round keys as words, middle ones after Inverted Mix Columns - List of tuples of type int
+    """
+
+    tables = [load_gf_table(factor) for factor in (9, 11, 13, 14)]
+    middle_keys = [
+        inv_mix_columns_in_place(list(round_key), *tables)
+        for round_key in round_keys[1:-1]
+    ]
+    return round_key_words([round_keys[0], *middle_keys, round_keys[-1]])
+
+
+def table_shifts(rotate_rows_schema, inverse=False):
+    """
+    Calculates bit shifts which pick bytes from the row words  \n
+    in order given by (inverted) rotate rows
+
+    Args:
+        rotate_rows_schema - four digit one for each row in a tuple ex. (0,1,2,3)
+        inverse - True for Inverted Rotate Rows - type bool
+
+    Returns:
+        shifts - 16 shifts, four for each row - tuple of type int
+    """
+
+    shifts = []
+    for row_rotates in rotate_rows_schema:
+        for i in range(4):
+            if inverse:
+                shifts.append(24 - 8 * ((i - row_rotates) % 4))
+            else:
+                shifts.append(24 - 8 * ((i + row_rotates) % 4))
+    return tuple(shifts)
+
+
+def table_encrypt_blocks(src, dst, rotate_rows_schema, t_tables, key_words):
+    """
+    Encrypts whole 16-byte blocks with lookup tables, every round is \n
+    16 table lookups and XORs instead of Sub Bytes, Rotate Rows and  \n
+    Mix Columns. Results are the same as produced by encoder.
+
+    Args:
+        src - blocks to encrypt, length divisible by 16 - bytes-like object
+        dst - buffer for encrypted blocks, may be src itself - bytearray
+        rotate_rows_schema - four digit one for each row in a tuple ex. (0,1,2,3)
+        t_tables - tables generated by generate_t_tables
+        key_words - round keys packed by round_key_words
+
+    Returns:
+        dst - encrypted blocks - bytearray
+    """
+
+    t0, t1, t2, t3, f0, f1, f2, f3 = t_tables
+    (a0, a1, a2, a3, b0, b1, b2, b3, c0, c1, c2, c3, d0, d1, d2, d3) = table_shifts(
+        rotate_rows_schema
+    )
+    k0, k1, k2, k3 = key_words[0]
+    middle_keys = key_words[1:-1]
+    l0, l1, l2, l3 = key_words[-1]
+    unpack_from = struct.Struct(">4I").unpack_from
+    pack_into = struct.Struct(">4I").pack_into
+
+    for offset in range(0, len(src) - len(src) % 16, 16):
+        w0, w1, w2, w3 = unpack_from(src, offset)
+        w0 ^= k0
+        w1 ^= k1
+        w2 ^= k2
+        w3 ^= k3
+        for r0, r1, r2, r3 in middle_keys:
+            w0, w1, w2, w3 = (
+                t0[w0 >> a0 & 255]
+                ^ t1[w0 >> a1 & 255]
+                ^ t2[w0 >> a2 & 255]
+                ^ t3[w0 >> a3 & 255]
+                ^ r0,
+                t0[w1 >> b0 & 255]
+                ^ t1[w1 >> b1 & 255]
+                ^ t2[w1 >> b2 & 255]
+                ^ t3[w1 >> b3 & 255]
+                ^ r1,
+                t0[w2 >> c0 & 255]
+                ^ t1[w2 >> c1 & 255]
+                ^ t2[w2 >> c2 & 255]
+                ^ t3[w2 >> c3 & 255]
+                ^ r2,
+                t0[w3 >> d0 & 255]
+                ^ t1[w3 >> d1 & 255]
+                ^ t2[w3 >> d2 & 255]
+                ^ t3[w3 >> d3 & 255]
+                ^ r3,
+            )
+        pack_into(
+            dst,
+            offset,
+            f0[w0 >> a0 & 255]
+            ^ f1[w0 >> a1 & 255]
+            ^ f2[w0 >> a2 & 255]
+            ^ f3[w0 >> a3 & 255]
+            ^ l0,
+            f0[w1 >> b0 & 255]
+            ^ f1[w1 >> b1 & 255]
+            ^ f2[w1 >> b2 & 255]
+            ^ f3[w1 >> b3 & 255]
+            ^ l1,
+            f0[w2 >> c0 & 255]
+            ^ f1[w2 >> c1 & 255]
+            ^ f2[w2 >> c2 & 255]
+            ^ f3[w2 >> c3 & 255]
+            ^ l2,
+            f0[w3 >> d0 & 255]
+            ^ f1[w3 >> d1 & 255]
+            ^ f2[w3 >> d2 & 255]
+            ^ f3[w3 >> d3 & 255]
+            ^ l3,
+        )
+    return dst
+
+
+def table_decrypt_blocks(src, dst, rotate_rows_schema, inv_t_tables, key_words):
+    """
+    Decrypts whole 16-byte blocks with lookup tables as the equivalent  \n
+    inverse cipher, every round is 16 table lookups and XORs instead of \n
+    Inverted Rotate Rows, Inverted Sub Bytes and Inverted Mix Columns,  \n
+    the same work as in table_encrypt_blocks. Results are the same as   \n
+    produced by decoder.
+
+    Args:
+        src - blocks to decrypt, length divisible by 16 - bytes-like object
+        dst - buffer for decrypted blocks, may be src itself - bytearray
+        rotate_rows_schema - four digit one for each row in a tuple ex. (0,1,2,3)
+        inv_t_tables - tables generated by generate_inv_t_tables
+        key_words - round keys packed by inverse_key_words
+
+    Returns:
+        dst - decrypted blocks - bytearray
+    """
+
+    t0, t1, t2, t3, f0, f1, f2, f3 = inv_t_tables
+    (a0, a1, a2, a3, b0, b1, b2, b3, c0, c1, c2, c3, d0, d1, d2, d3) = table_shifts(
+        rotate_rows_schema, inverse=True
+    )
+    k0, k1, k2, k3 = key_words[-1]
+    middle_keys = key_words[-2:0:-1]
+    l0, l1, l2, l3 = key_words[0]
+    unpack_from = struct.Struct(">4I").unpack_from
+    pack_into = struct.Struct(">4I").pack_into
+
+    for offset in range(0, len(src) - len(src) % 16, 16):
+        w0, w1, w2, w3 = unpack_from(src, offset)
+        w0 ^= k0
+        w1 ^= k1
+        w2 ^= k2
+        w3 ^= k3
+        for r0, r1, r2, r3 in middle_keys:
+            w0, w1, w2, w3 = (
+                t0[w0 >> a0 & 255]
+                ^ t1[w0 >> a1 & 255]
+                ^ t2[w0 >> a2 & 255]
+                ^ t3[w0 >> a3 & 255]
+                ^ r0,
+                t0[w1 >> b0 & 255]
+                ^ t1[w1 >> b1 & 255]
+                ^ t2[w1 >> b2 & 255]
+                ^ t3[w1 >> b3 & 255]
+                ^ r1,
+                t0[w2 >> c0 & 255]
+                ^ t1[w2 >> c1 & 255]
+                ^ t2[w2 >> c2 & 255]
+                ^ t3[w2 >> c3 & 255]
+                ^ r2,
+                t0[w3 >> d0 & 255]
+                ^ t1[w3 >> d1 & 255]
+                ^ t2[w3 >> d2 & 255]
+                ^ t3[w3 >> d3 & 255]
+                ^ r3,
+            )
+        pack_into(
+            dst,
+            offset,
+            f0[w0 >> a0 & 255]
+            ^ f1[w0 >> a1 & 255]
+            ^ f2[w0 >> a2 & 255]
+            ^ f3[w0 >> a3 & 255]
+            ^ l0,
+            f0[w1 >> b0 & 255]
+            ^ f1[w1 >> b1 & 255]
+            ^ f2[w1 >> b2 & 255]
+            ^ f3[w1 >> b3 & 255]
+            ^ l1,
+            f0[w2 >> c0 & 255]
+            ^ f1[w2 >> c1 & 255]
+            ^ f2[w2 >> c2 & 255]
+            ^ f3[w2 >> c3 & 255]
+            ^ l2,
+            f0[w3 >> d0 & 255]
+            ^ f1[w3 >> d1 & 255]
+            ^ f2[w3 >> d2 & 255]
+            ^ f3[w3 >> d3 & 255]
+            ^ l3,
+        )
+    return dst
+
+
+def padded_length(length, size):
+    """
+    Calculates length of binary data after PKCS#7 filling, \n
+    1 to size bytes are always added
+
+    Args:
+        length - length of data of type int
+        size - amount of columns/rows - number of type int
+
+    Returns:
+        length - length divisible by size of type int
+    """
+
+    return length + size - length % size
+
+
+def unfilled_length(data, size):
+    """
+    Checks PKCS#7 filling at the end of decrypted data
+
+    Args:
+        data - decrypted data with filling - bytes-like object
+        size - amount of columns/rows - number of type int
+
+    Returns:
+        length - length of data without filling of type int
+    """
+
+    length = len(data)
+    filling = data[length - 1] if length else 0
+    if not 1 <= filling <= size or any(
+        value != filling for value in data[length - filling : length]
+    ):
+        raise ValueError("Incorrect filling, wrong key or damaged data")
+    return length - filling
+
+
+def text_to_blocks(string_text, size):
+    """
+    Converts text to bytes of ASCII values, the last block \n
+    is filled with 3rd element of ASCII table (end_of_text)
+
+    Args:
+        string_text - delivered by user text to be encrypted of type string
+        size - amount of columns/rows - number of type int
+
+    Returns:
+        data - ASCII values divisible into blocks - bytearray
+    """
+
+    if len(string_text) % size:
+        string_text += chr(3) * (size - len(string_text) % size)
+    return bytearray(string_text, "latin-1")
+
+
+def format_ciphertext(data, ciphertext_format="decimal"):
+    """
+    Converts encrypted bytes to one of CIPHERTEXT_FORMATS, ex. \n
+
+    decimal - "207 97 215 47"                                  \n
+    hex     - "cf61d72f"                                       \n
+    base64  - "z2HXLw=="                                       \n
+    raw     - b"\\xcfa\\xd7/"
+
+    Args:
+        data - encrypted values - bytes-like object
+        ciphertext_format - one of CIPHERTEXT_FORMATS of type string
+
+    Returns:
+        output - encrypted text of type string (bytes for raw format)
+    """
+
+    if ciphertext_format == "decimal":
+        return " ".join(map(str, data))
+    elif ciphertext_format == "hex":
+        return data.hex()
+    elif ciphertext_format == "base64":
+        return base64.b64encode(data).decode("ascii")
+    elif ciphertext_format == "raw":
+        return bytes(data)
+    raise ValueError("Unknown ciphertext format {!r}".format(ciphertext_format))
+
+
+def parse_ciphertext(string_text, size, ciphertext_format="decimal"):
+    """
+    Converts encrypted text in one of CIPHERTEXT_FORMATS to bytes, \n
+    the last block is filled with 3rd element of ASCII table
+
+    Args:
+        string_text - delivered by user text to be decrypted of type string (bytes for raw format)
+        size - amount of columns/rows - number of type int
+        ciphertext_format - one of CIPHERTEXT_FORMATS of type string
+
+    Returns:
+        data - encrypted values divisible into blocks - bytearray
+    """
+
+    if ciphertext_format == "decimal":
+        data = bytearray(map(int, string_text.split()))
+    elif ciphertext_format == "hex":
+        data = bytearray.fromhex(string_text)
+    elif ciphertext_format == "base64":
+        data = bytearray(base64.b64decode(string_text, validate=True))
+    elif ciphertext_format == "raw":
+        data = bytearray(string_text)
+    else:
+        raise ValueError("Unknown ciphertext format {!r}".format(ciphertext_format))
+    if len(data) % size:
+        data += bytes([3]) * (size - len(data) % size)
+    return data
+
+
+def table_encoder(
+    string_text,
+    size,
+    rotate_rows_schema,
+    t_tables,
+    round_keys,
+    ciphertext_format="decimal",
+):
+    """
+    Rijndael encryption scheme running on lookup tables, \n
+    gives the same output as encoder
+
+    Args:
+        string_text - delivered by user text to be encrypted of type string
+        size - amount of columns/rows - number of type int
+        rotate_rows_schema - four digit one for each row in a tuple ex. (0,1,2,3)
+        t_tables - tables generated by generate_t_tables
+        round_keys - keys generated by key_schedule for all rounds - list of lists of type int
+        ciphertext_format - one of CIPHERTEXT_FORMATS of type string
+
+    Returns:
+        output - encrypted text of type string
+    """
+
+    data = text_to_blocks(string_text, size)
+    table_encrypt_blocks(
+        data, data, rotate_rows_schema, t_tables, round_key_words(round_keys)
+    )
+    return format_ciphertext(data, ciphertext_format)
+
+
+def table_decoder(
+    string_text,
+    size,
+    rotate_rows_schema,
+    inv_t_tables,
+    round_keys,
+    ciphertext_format="decimal",
+):
+    """
+    Rijndael decryption scheme running on lookup tables, \n
+    gives the same output as decoder
+
+    Args:
+        string_text - delivered by user text to be decrypted of type string (bytes for raw format)
+        size - amount of columns/rows - number of type int
+        rotate_rows_schema - four digit one for each row in a tuple ex. (0,1,2,3)
+        inv_t_tables - tables generated by generate_inv_t_tables
+        round_keys - keys generated by key_schedule for all rounds - list of lists of type int
+        ciphertext_format - one of CIPHERTEXT_FORMATS of type string
+
+    Returns:
+        output - decrypted text of type string
+    """
+
+    data = parse_ciphertext(string_text, size, ciphertext_format)
+    table_decrypt_blocks(
+        data, data, rotate_rows_schema, inv_t_tables, inverse_key_words(round_keys)
+    )
+    return data.replace(b"\x03", b"").decode("latin-1")
+
+
+def rotate_rows_permutation(rotate_rows_schema, inverse=False):
+    """
+    Calculates for every position of the block the position \n
+    from which (inverted) rotate rows takes its value
+
+    Args:
+        rotate_rows_schema - four digit one for each row in a tuple ex. (0,1,2,3)
+        inverse - True for Inverted Rotate Rows - type bool
+
+    Returns:
+        permutation - 16 positions - list of type int
+    """
+
+    permutation = []
+    for row, row_rotates in enumerate(rotate_rows_schema):
+        for i in range(4):
+            if inverse:
+                permutation.append(row * 4 + (i - row_rotates) % 4)
+            else:
+                permutation.append(row * 4 + (i + row_rotates) % 4)
+    return permutation
+
+
+@functools.lru_cache(maxsize=None)
+def numpy_gf_tables():
+    """
+    Precomputes Galois multiplication tables as numpy array, \n
+    row n holds GF(n, x) for x in 0..255
+
+    Args:
+        None
+
+    Returns:
+        tables - array of shape (15, 256) of type uint8
+    """
+
+    return numpy.array([gf_table(factor) for factor in range(15)], dtype=numpy.uint8)
+
+
+def numpy_encrypt_blocks(src, dst, rotate_rows_schema, sbox, round_keys):
+    """
+    Encrypts whole 16-byte blocks with numpy, all blocks of a chunk \n
+    are kept in one (N,16) array, so every step of a round is a     \n
+    single array operation. Results are the same as produced by encoder.
+
+    Args:
+        src - blocks to encrypt, length divisible by 16 - bytes-like object
+        dst - buffer for encrypted blocks, may be src itself - bytearray
+        rotate_rows_schema - four digit one for each row in a tuple ex. (0,1,2,3)
+        sbox - byte substition table - bytes or list of type int
+        round_keys - keys generated by key_schedule for all rounds - list of lists of type int
+
+    Returns:
+        dst - encrypted blocks - bytearray
+    """
+
+    sbox = numpy.frombuffer(bytes(sbox), dtype=numpy.uint8)
+    keys = numpy.frombuffer(b"".join(map(bytes, round_keys)), dtype=numpy.uint8)
+    keys = keys.reshape(-1, 16)
+    permutation = rotate_rows_permutation(rotate_rows_schema)
+    mul2, mul3 = numpy_gf_tables()[2], numpy_gf_tables()[3]
+    output = numpy.frombuffer(dst, dtype=numpy.uint8)
+
+    length = len(src) - len(src) % 16
+    for start in range(0, length, NUMPY_CHUNK):
+        count = min(NUMPY_CHUNK, length - start)
+        state = numpy.frombuffer(src, dtype=numpy.uint8, count=count, offset=start)
+        state = state.reshape(-1, 16) ^ keys[0]
+        for round_key in keys[1:-1]:
+            columns = sbox[state[:, permutation]].reshape(-1, 4, 4)
+            state = (
+                mul2[columns]
+                ^ numpy.roll(mul3[columns], -1, axis=2)
+                ^ numpy.roll(columns, -2, axis=2)
+                ^ numpy.roll(columns, -3, axis=2)
+            ).reshape(-1, 16)
+            state ^= round_key
+        state = sbox[state[:, permutation]] ^ keys[-1]
+        output[start : start + count] = state.reshape(-1)
+    return dst
+
+
+def numpy_decrypt_blocks(src, dst, rotate_rows_schema, inv_sbox, round_keys):
+    """
+    Decrypts whole 16-byte blocks with numpy, all blocks of a chunk \n
+    are kept in one (N,16) array. Results are the same as produced  \n
+    by decoder.
+
+    Args:
+        src - blocks to decrypt, length divisible by 16 - bytes-like object
+        dst - buffer for decrypted blocks, may be src itself - bytearray
+        rotate_rows_schema - four digit one for each row in a tuple ex. (0,1,2,3)
+        inv_sbox - inversed byte substition table - bytes or list of type int
+        round_keys - keys generated by key_schedule for all rounds - list of lists of type int
+
+    Returns:
+        dst - decrypted blocks - bytearray
+    """
+
+    inv_sbox = numpy.frombuffer(bytes(inv_sbox), dtype=numpy.uint8)
+    keys = numpy.frombuffer(b"".join(map(bytes, round_keys)), dtype=numpy.uint8)
+    keys = keys.reshape(-1, 16)
+    permutation = rotate_rows_permutation(rotate_rows_schema, inverse=True)
+    gf_tables = numpy_gf_tables()
+    mul9, mul11, mul13, mul14 = (
+        gf_tables[9],
+        gf_tables[11],
+        gf_tables[13],
+        gf_tables[14],
+    )
+    output = numpy.frombuffer(dst, dtype=numpy.uint8)
+
+    length = len(src) - len(src) % 16
+    for start in range(0, length, NUMPY_CHUNK):
+        count = min(NUMPY_CHUNK, length - start)
+        state = numpy.frombuffer(src, dtype=numpy.uint8, count=count, offset=start)
+        state = inv_sbox[(state.reshape(-1, 16) ^ keys[-1])[:, permutation]]
+        for round_key in keys[-2:0:-1]:
+            columns = (state ^ round_key).reshape(-1, 4, 4)
+            state = (
+                mul14[columns]
+                ^ numpy.roll(mul11[columns], -1, axis=2)
+                ^ numpy.roll(mul13[columns], -2, axis=2)
+                ^ numpy.roll(mul9[columns], -3, axis=2)
+            ).reshape(-1, 16)
+            state = inv_sbox[state[:, permutation]]
+        state ^= keys[0]
+        output[start : start + count] = state.reshape(-1)
+    return dst
+
+
+BITSLICE_ZEROS = bytes.maketrans(b"01", b"\x00\x00")
+
+
+@functools.lru_cache(maxsize=None)
+def bitslice_tables():
+    """
+    Prepares translation tables used for packing and unpacking \n
+    bits of bytes, table j of bits translates every byte to its \n
+    bit j as "0"/"1" character, table j of planes translates    \n
+    "0"/"1" characters back to 0/2**j
+
+    Args:
+        None
+
+    Returns:
+        bits, planes - 8 translation tables each - tuples of type bytes
+    """
+
+    bits = tuple(bytes(b"01"[(x >> j) & 1] for x in range(256)) for j in range(8))
+    planes = tuple(
+        BITSLICE_ZEROS[: ord("1")] + bytes([1 << j]) + BITSLICE_ZEROS[ord("1") + 1 :]
+        for j in range(8)
+    )
+    return bits, planes
+
+
+def bitslice_pack(data):
+    """
+    Transposes bytes to 8 bit planes, bit n*16+p of plane j \n
+    is bit j of byte p of block n
+
+    Args:
+        data - blocks, length divisible by 16 - bytes
+
+    Returns:
+        planes - 8 values of type int
+    """
+
+    bits = bitslice_tables()[0]
+    reversed_data = data[::-1]
+    return [int(reversed_data.translate(bits[j]), 2) for j in range(8)]
+
+
+def bitslice_unpack(planes, length):
+    """
+    Transposes 8 bit planes back to bytes
+
+    Args:
+        planes - 8 values of type int
+        length - number of bytes of type int
+
+    Returns:
+        data - blocks of type bytes
+    """
+
+    tables = bitslice_tables()[1]
+    value = 0
+    for j, plane in enumerate(planes):
+        bits = format(plane, "0{}b".format(length)).encode("ascii")[::-1]
+        value |= int.from_bytes(bits.translate(tables[j]), "little")
+    return value.to_bytes(length, "little")
+
+
+@functools.lru_cache(maxsize=None)
+def bitslice_shifts(permutation):
+    """
+    Groups positions of a permutation of the block by distance, \n
+    positions moved by the same distance are moved together
+
+    Args:
+        permutation - for every position the source position - tuple of type int
+
+    Returns:
+        shifts - distance and 16-bit pattern of positions - tuple of tuples of type int
+    """
+
+    patterns = {}
+    for position, source in enumerate(permutation):
+        distance = source - position
+        patterns[distance] = patterns.get(distance, 0) | 1 << position
+    return tuple(sorted(patterns.items()))
+
+
+def bitslice_permute(planes, shifts):
+    """
+    Moves bytes inside every block of all planes
+
+    Args:
+        planes - 8 values of type int
+        shifts - distance and mask of positions - list of tuples of type int
+
+    Returns:
+        planes - 8 values of type int
+    """
+
+    output = []
+    for plane in planes:
+        value = 0
+        for distance, mask in shifts:
+            if distance >= 0:
+                value |= (plane >> distance) & mask
+            else:
+                value |= (plane << -distance) & mask
+        output.append(value)
+    return output
+
+
+@functools.lru_cache(maxsize=None)
+def bitslice_circuit(sbox):
+    """
+    Derives logic circuit of a substitution table, output bit j \n
+    is xor of minterms (products of all 8 input bits or their   \n
+    negations) of values x for which bit j of sbox[x] is set.   \n
+    When bit is set for more than half of values, negation of   \n
+    xor of the other minterms is shorter
+
+    Args:
+        sbox - byte substition table of type bytes
+
+    Returns:
+        circuit - negation flag and minterm numbers for each output bit - tuple
+    """
+
+    circuit = []
+    for j in range(8):
+        ones = tuple(x for x in range(256) if sbox[x] >> j & 1)
+        zeros = tuple(x for x in range(256) if not sbox[x] >> j & 1)
+        circuit.append((False, ones) if len(ones) <= len(zeros) else (True, zeros))
+    return tuple(circuit)
+
+
+def bitslice_minterms(planes, ones):
+    """
+    Calculates all 16 products of 4 planes or their negations
+
+    Args:
+        planes - 4 values of type int
+        ones - all lanes set of type int
+
+    Returns:
+        minterms - value x at bit positions where planes hold x - list of type int
+    """
+
+    minterms = [planes[0] ^ ones, planes[0]]
+    for j, plane in enumerate(planes[1:], 1):
+        negation = plane ^ ones
+        minterms = [minterm & negation for minterm in minterms] + [
+            minterm & plane for minterm in minterms
+        ]
+    return minterms
+
+
+def bitslice_sub_bytes(planes, circuit, ones):
+    """
+    Substitutes every byte of all planes with the circuit, \n
+    the same operations are made whatever the data is
+
+    Args:
+        planes - 8 values of type int
+        circuit - circuit prepared by bitslice_circuit
+        ones - all lanes set of type int
+
+    Returns:
+        planes - 8 values of type int
+    """
+
+    low = bitslice_minterms(planes[:4], ones)
+    high = bitslice_minterms(planes[4:], ones)
+    minterms = [high_term & low_term for high_term in high for low_term in low]
+    output = []
+    for negation, numbers in circuit:
+        value = ones if negation else 0
+        for number in numbers:
+            value ^= minterms[number]
+        output.append(value)
+    return output
+
+
+def bitslice_xtime(planes):
+    """
+    Galois multiplication of every byte of all planes by 2
+
+    Args:
+        planes - 8 values of type int
+
+    Returns:
+        planes - 8 values of type int
+    """
+
+    b0, b1, b2, b3, b4, b5, b6, b7 = planes
+    return [b7, b0 ^ b7, b1, b2 ^ b7, b3 ^ b7, b4, b5, b6]
+
+
+@functools.lru_cache(maxsize=None)
+def bitslice_column_shifts():
+    """
+    Prepares shifts of positions which rotate every group of 4 bytes \n
+    (mixed together by Mix Columns) by 1, 2 and 3 positions
+
+    Args:
+        None
+
+    Returns:
+        shifts - bitslice_shifts for every rotation - tuple
+    """
+
+    return tuple(
+        bitslice_shifts(
+            tuple(
+                group * 4 + (i + rotation) % 4 for group in range(4) for i in range(4)
+            )
+        )
+        for rotation in (1, 2, 3)
+    )
+
+
+def bitslice_mix_columns(planes, column_shifts):
+    """
+    Mix Columns of every block of all planes, ex. for the first byte \n
+    2*a0 ^ 3*a1 ^ a2 ^ a3 = 2*(a0 ^ a1) ^ a1 ^ a2 ^ a3
+
+    Args:
+        planes - 8 values of type int
+        column_shifts - shifts rotating groups by 1, 2, 3 with masks
+
+    Returns:
+        planes - 8 values of type int
+    """
+
+    rotated_1, rotated_2, rotated_3 = (
+        bitslice_permute(planes, shifts) for shifts in column_shifts
+    )
+    doubled = bitslice_xtime([a ^ b for a, b in zip(planes, rotated_1)])
+    return [
+        values[0] ^ values[1] ^ values[2] ^ values[3]
+        for values in zip(doubled, rotated_1, rotated_2, rotated_3)
+    ]
+
+
+def bitslice_inv_mix_columns(planes, column_shifts):
+    """
+    Inverted Mix Columns of every block of all planes, values are \n
+    prepared as a0 ^ 4*(a0 ^ a2), a1 ^ 4*(a1 ^ a3), ... and then  \n
+    Mix Columns gives the same result as multiplication by        \n
+    14 11 13 09 matrix
+
+    Args:
+        planes - 8 values of type int
+        column_shifts - shifts rotating groups by 1, 2, 3 with masks
+
+    Returns:
+        planes - 8 values of type int
+    """
+
+    rotated_2 = bitslice_permute(planes, column_shifts[1])
+    quadrupled = bitslice_xtime(
+        bitslice_xtime([a ^ b for a, b in zip(planes, rotated_2)])
+    )
+    planes = [a ^ b for a, b in zip(planes, quadrupled)]
+    return bitslice_mix_columns(planes, column_shifts)
+
+
+def bitslice_masks(shifts, lanes):
+    """
+    Repeats 16-bit patterns of positions for all blocks
+
+    Args:
+        shifts - distance and 16-bit pattern - tuple of tuples of type int
+        lanes - value with bit 0 of every block set of type int
+
+    Returns:
+        shifts - distance and mask for all blocks - list of tuples of type int
+    """
+
+    return [(distance, pattern * lanes) for distance, pattern in shifts]
+
+
+def bitslice_round_keys(round_keys, lanes):
+    """
+    Transposes round keys to planes repeated for all blocks
+
+    Args:
+        round_keys - keys generated by key_schedule for all rounds - list of lists of type int
+        lanes - value with bit 0 of every block set of type int
+
+    Returns:
+        keys - 8 planes of every round key - list of lists of type int
+    """
+
+    return [
+        [plane * lanes for plane in bitslice_pack(bytes(round_key))]
+        for round_key in round_keys
+    ]
+
+
+def bitslice_prepare(count, rotate_rows_schema, inverse):
+    """
+    Prepares masks for a chunk of count blocks
+
+    Args:
+        count - number of blocks of type int
+        rotate_rows_schema - four digit one for each row in a tuple ex. (0,1,2,3)
+        inverse - True for decryption - type bool
+
+    Returns:
+        lanes, ones, rows, columns - repeated masks for the chunk
+    """
+
+    lanes = ((1 << 16 * count) - 1) // 0xFFFF
+    ones = lanes * 0xFFFF
+    permutation = tuple(rotate_rows_permutation(rotate_rows_schema, inverse))
+    rows = bitslice_masks(bitslice_shifts(permutation), lanes)
+    columns = [bitslice_masks(shifts, lanes) for shifts in bitslice_column_shifts()]
+    return lanes, ones, rows, columns
+
+
+def bitslice_encrypt_blocks(src, dst, rotate_rows_schema, sbox, round_keys):
+    """
+    Encrypts whole 16-byte blocks bitsliced: bit j of every byte   \n
+    of a chunk is kept in one big int (plane), so every step of a  \n
+    round is a few bitwise operations on all blocks together. The  \n
+    sbox is computed by a logic circuit instead of lookups, so no  \n
+    memory access or branch depends on data (CPython may still     \n
+    store an int shorter when its top bits are zero). Results are  \n
+    the same as produced by encoder.
+
+    Args:
+        src - blocks to encrypt, length divisible by 16 - bytes-like object
+        dst - buffer for encrypted blocks, may be src itself - bytearray
+        rotate_rows_schema - four digit one for each row in a tuple ex. (0,1,2,3)
+        sbox - byte substition table - bytes or list of type int
+        round_keys - keys generated by key_schedule for all rounds - list of lists of type int
+
+    Returns:
+        dst - encrypted blocks - bytearray
+    """
+
+    circuit = bitslice_circuit(bytes(sbox))
+    length = len(src) - len(src) % 16
+    for start in range(0, length, BITSLICE_CHUNK):
+        count = min(BITSLICE_CHUNK, length - start)
+        lanes, ones, rows, columns = bitslice_prepare(
+            count // 16, rotate_rows_schema, False
+        )
+        keys = bitslice_round_keys(round_keys, lanes)
+        planes = bitslice_pack(bytes(src[start : start + count]))
+        planes = [a ^ b for a, b in zip(planes, keys[0])]
+        for round_key in keys[1:-1]:
+            planes = bitslice_sub_bytes(planes, circuit, ones)
+            planes = bitslice_permute(planes, rows)
+            planes = bitslice_mix_columns(planes, columns)
+            planes = [a ^ b for a, b in zip(planes, round_key)]
+        planes = bitslice_sub_bytes(planes, circuit, ones)
+        planes = bitslice_permute(planes, rows)
+        planes = [a ^ b for a, b in zip(planes, keys[-1])]
+        dst[start : start + count] = bitslice_unpack(planes, count)
+    return dst
+
+
+def bitslice_decrypt_blocks(src, dst, rotate_rows_schema, inv_sbox, round_keys):
+    """
+    Decrypts whole 16-byte blocks bitsliced, as in            \n
+    bitslice_encrypt_blocks the inv_sbox is computed by a     \n
+    logic circuit. Results are the same as produced by decoder.
+
+    Args:
+        src - blocks to decrypt, length divisible by 16 - bytes-like object
+        dst - buffer for decrypted blocks, may be src itself - bytearray
+        rotate_rows_schema - four digit one for each row in a tuple ex. (0,1,2,3)
+        inv_sbox - inversed byte substition table - bytes or list of type int
+        round_keys - keys generated by key_schedule for all rounds - list of lists of type int
+
+    Returns:
+        dst - decrypted blocks - bytearray
+    """
+
+    circuit = bitslice_circuit(bytes(inv_sbox))
+    length = len(src) - len(src) % 16
+    for start in range(0, length, BITSLICE_CHUNK):
+        count = min(BITSLICE_CHUNK, length - start)
+        lanes, ones, rows, columns = bitslice_prepare(
+            count // 16, rotate_rows_schema, True
+        )
+        keys = bitslice_round_keys(round_keys, lanes)
+        planes = bitslice_pack(bytes(src[start : start + count]))
+        planes = [a ^ b for a, b in zip(planes, keys[-1])]
+        planes = bitslice_permute(planes, rows)
+        planes = bitslice_sub_bytes(planes, circuit, ones)
+        for round_key in keys[-2:0:-1]:
+            planes = [a ^ b for a, b in zip(planes, round_key)]
+            planes = bitslice_inv_mix_columns(planes, columns)
+            planes = bitslice_permute(planes, rows)
+            planes = bitslice_sub_bytes(planes, circuit, ones)
+        planes = [a ^ b for a, b in zip(planes, keys[0])]
+        dst[start : start + count] = bitslice_unpack(planes, count)
+    return dst
+
+
+def reference_engine_encrypt(context, src, dst):
+    """
+    Engine built on encrypt_rounds (Sub Bytes, Rotate Rows, Mix Columns, Add Round Key)
+
+    Args:
+        context - RijndaelContext prepared for the key
+        src - blocks to encrypt, length divisible by 16 - bytes-like object
+        dst - buffer for encrypted blocks, may be src itself - bytearray
+
+    Returns:
+        dst - encrypted blocks - bytearray
+    """
+
+    for offset in range(0, len(src) - len(src) % 16, 16):
+        blocks = encrypt_rounds(
+            [list(src[offset : offset + 16])],
+            context.size,
+            context.rotate_rows_schema,
+            context.sbox,
+            context.round_keys,
+        )
+        dst[offset : offset + 16] = bytes(blocks[0])
+    return dst
+
+
+def reference_engine_decrypt(context, src, dst):
+    """
+    Engine built on decrypt_rounds (Inverted Sub Bytes, Rotate Rows, Mix Columns)
+
+    Args:
+        context - RijndaelContext prepared for the key
+        src - blocks to decrypt, length divisible by 16 - bytes-like object
+        dst - buffer for decrypted blocks, may be src itself - bytearray
+
+    Returns:
+        dst - decrypted blocks - bytearray
+    """
+
+    for offset in range(0, len(src) - len(src) % 16, 16):
+        blocks = decrypt_rounds(
+            [list(src[offset : offset + 16])],
+            context.size,
+            context.rotate_rows_schema,
+            context.inv_sbox,
+            context.round_keys,
+        )
+        dst[offset : offset + 16] = bytes(blocks[0])
+    return dst
+
+
+def tables_engine_encrypt(context, src, dst):
+    """Engine built on table_encrypt_blocks, arguments as in reference_engine_encrypt"""
+
+    return table_encrypt_blocks(
+        src, dst, context.rotate_rows_schema, context.t_tables, context.key_words
+    )
+
+
+def tables_engine_decrypt(context, src, dst):
+    """Engine built on table_decrypt_blocks, arguments as in reference_engine_decrypt"""
+
+    return table_decrypt_blocks(
+        src,
+        dst,
+        context.rotate_rows_schema,
+        context.inv_t_tables,
+        context.inv_key_words,
+    )
+
+
+def numpy_engine_encrypt(context, src, dst):
+    """Engine built on numpy_encrypt_blocks, arguments as in reference_engine_encrypt"""
+
+    return numpy_encrypt_blocks(
+        src, dst, context.rotate_rows_schema, context.sbox, context.round_keys
+    )
+
+
+def numpy_engine_decrypt(context, src, dst):
+    """Engine built on numpy_decrypt_blocks, arguments as in reference_engine_decrypt"""
+
+    return numpy_decrypt_blocks(
+        src, dst, context.rotate_rows_schema, context.inv_sbox, context.round_keys
+    )
+
+
+def bitslice_engine_encrypt(context, src, dst):
+    """Engine built on bitslice_encrypt_blocks, arguments as in reference_engine_encrypt"""
+
+    return bitslice_encrypt_blocks(
+        src, dst, context.rotate_rows_schema, context.sbox, context.round_keys
+    )
+
+
+def bitslice_engine_decrypt(context, src, dst):
+    """Engine built on bitslice_decrypt_blocks, arguments as in reference_engine_decrypt"""
+
+    return bitslice_decrypt_blocks(
+        src, dst, context.rotate_rows_schema, context.inv_sbox, context.round_keys
+    )
+
+
+def pipeline_engine_encrypt(context, src, dst):
+    """Engine built on pipeline_encrypt_blocks, arguments as in reference_engine_encrypt"""
+
+    return pipeline_encrypt_blocks(
+        src, dst, context.rotate_rows_schema, context.sbox, context.round_keys
+    )
+
+
+def pipeline_engine_decrypt(context, src, dst):
+    """Engine built on pipeline_decrypt_blocks, arguments as in reference_engine_decrypt"""
+
+    return pipeline_decrypt_blocks(
+        src, dst, context.rotate_rows_schema, context.inv_sbox, context.round_keys
+    )
+
+
+ENGINES = {}
+AUTO_ENGINE = "auto"
+SELFTEST_KEY = bytes(range(16))
+SELFTEST_DATA = bytes(range(256))
+SELECT_SAMPLE = 16 * 1024
+logger = logging.getLogger(__name__)
+
+
+def register_engine(name, encrypt, decrypt):
+    """
+    Adds engine to ENGINES. Engine is a pair of functions taking   \n
+    (context, src, dst): RijndaelContext, whole 16-byte blocks and  \n
+    buffer of the same length (may be src itself), returning dst.  \n
+    All fields of the context are prepared for every engine
+
+    Args:
+        name - name of the engine of type string
+        encrypt - function encrypting blocks
+        decrypt - function decrypting blocks
+
+    Returns:
+        None
+    """
+
+    if name == AUTO_ENGINE:
+        raise ValueError("{!r} is reserved for automatic selection".format(name))
+    if not callable(encrypt) or not callable(decrypt):
+        raise TypeError("encrypt and decrypt of engine must be callable")
+    ENGINES[name] = (encrypt, decrypt)
+    auto_engine.cache_clear()
+
+
+def self_test(name, context=None, expected=None):
+    """
+    Known-answer test of the engine, SELFTEST_DATA encrypted with  \n
+    the engine must be identical to the result of the reference  \n
+    engine and must be decrypted back
+
+    Args:
+        name - one of ENGINES keys of type string
+        context - RijndaelContext for SELFTEST_KEY, made when omitted
+        expected - SELFTEST_DATA encrypted by the reference engine, \n
+                   calculated when omitted - bytes-like object
+
+    Returns:
+        passed - True when the engine gives correct results of type bool
+    """
+
+    if context is None:
+        context = RijndaelContext(SELFTEST_KEY, engine="reference")
+    if expected is None:
+        expected = reference_engine_encrypt(
+            context, SELFTEST_DATA, bytearray(len(SELFTEST_DATA))
+        )
+    encrypt, decrypt = ENGINES[name]
+    try:
+        encrypted = encrypt(context, SELFTEST_DATA, bytearray(len(SELFTEST_DATA)))
+        decrypted = decrypt(context, encrypted, bytearray(len(SELFTEST_DATA)))
+    except Exception:
+        logger.exception("Engine %s raised an exception in self-test", name)
+        return False
+    return encrypted == expected and decrypted == SELFTEST_DATA
+
+
+def select_engine(sample_size=SELECT_SAMPLE, candidates=None):
+    """
+    Runs a short benchmark of engines which passed self_test and \n
+    picks the fastest one. The reference engine is only used to  \n
+    check the others, unless it is given in candidates
+
+    Args:
+        sample_size - bytes encrypted and decrypted by every engine of type int
+        candidates - names of engines to compare - list of type string, \n
+                     all engines except reference when omitted
+
+    Returns:
+        name - name of the fastest engine of type string
+    """
+
+    if candidates is None:
+        candidates = [name for name in ENGINES if name != "reference"]
+    context = RijndaelContext(SELFTEST_KEY, engine="reference")
+    expected = reference_engine_encrypt(
+        context, SELFTEST_DATA, bytearray(len(SELFTEST_DATA))
+    )
+    sample = bytes(i * 7 % 256 for i in range(sample_size - sample_size % 16))
+    output = bytearray(len(sample))
+
+    timings = {}
+    for name in candidates:
+        if not self_test(name, context, expected):
+            logger.warning("Engine %s failed self-test and is skipped", name)
+            continue
+        encrypt, decrypt = ENGINES[name]
+        start = time.perf_counter()
+        encrypt(context, sample, output)
+        decrypt(context, output, output)
+        timings[name] = time.perf_counter() - start
+    if not timings:
+        raise ValueError("No engine passed self-test")
+
+    name = min(timings, key=timings.get)
+    logger.info(
+        "Selected engine %s (%s)",
+        name,
+        ", ".join(
+            "{} {:.1f} ms".format(engine, seconds * 1000)
+            for engine, seconds in sorted(timings.items(), key=lambda item: item[1])
+        ),
+    )
+    return name
+
+
+@functools.lru_cache(maxsize=None)
+def auto_engine():
+    """
+    Engine selected by select_engine, the benchmark runs once per process
+
+    Args:
+        None
+
+    Returns:
+        name - name of the fastest engine of type string
+    """
+
+    return select_engine()
+
+
+register_engine("reference", reference_engine_encrypt, reference_engine_decrypt)
+register_engine("pipeline", pipeline_engine_encrypt, pipeline_engine_decrypt)
+register_engine("tables", tables_engine_encrypt, tables_engine_decrypt)
+register_engine("bitslice", bitslice_engine_encrypt, bitslice_engine_decrypt)
+if numpy is not None:
+    register_engine("numpy", numpy_engine_encrypt, numpy_engine_decrypt)
+
+# "auto" selects the fastest engine when it is needed for the first time
+DEFAULT_ENGINE = os.environ.get("RIJNDAEL_ENGINE", "tables")
+
+
+def get_engine(name=None):
+    """
+    Checks name of the engine, engine selected by \n
+    set_default_engine (or RIJNDAEL_ENGINE environment \n
+    variable) is used when name is not given, "auto" \n
+    means the fastest engine chosen by select_engine
+
+    Args:
+        name - one of ENGINES keys, "auto" or None - type string
+
+    Returns:
+        name - name of available engine of type string
+    """
+
+    if name is None:
+        name = DEFAULT_ENGINE
+    if name == AUTO_ENGINE:
+        name = auto_engine()
+    if name not in ENGINES:
+        raise ValueError(
+            "Engine {!r} is not available, choose one of: {}".format(
+                name, ", ".join([*ENGINES, AUTO_ENGINE])
+            )
+        )
+    return name
+
+
+def set_default_engine(name):
+    """
+    Selects engine used by RijndaelContext, encode_message \n
+    and decode_message when engine is not given explicitly
+
+    Args:
+        name - one of ENGINES keys or "auto" of type string
+
+    Returns:
+        None
+    """
+
+    global DEFAULT_ENGINE
+    DEFAULT_ENGINE = get_engine(name)
+
+
+def tables_checksum(sbox, inv_sbox, rcon):
+    """
+    Calculates checksum of all tables
+
+    Args:
+        sbox, inv_sbox, rcon - values of type bytes
+
+    Returns:
+        checksum - SHA-256 hex digest of type string
+    """
+
+    return hashlib.sha256(sbox + inv_sbox + rcon).hexdigest()
+
+
+def compile_tables(path=TABLES_MODULE + ".py", size=16):
+    """
+    Saves tables parsed from data/*.txt as a module of bytes \n
+    constants with their checksum, it has to be run again    \n
+    after data/*.txt files are changed
+
+    Args:
+        path - path of the generated module of type string
+        size - amount of columns/rows - number of type int
+
+    Returns:
+        None
+    """
+
+    tables = {
+        "SBOX": bytes(read_sbox(size)),
+        "INV_SBOX": bytes(read_inv_sbox(size)),
+        "RCON": bytes(read_rcon(size)),
+    }
+    lines = [
+        '"""',
+        "Tables from data/*.txt compiled by cipher.compile_tables, do not edit",
+        '"""',
+        "",
+        "SIZE = {}".format(size),
+        'CHECKSUM = "{}"'.format(tables_checksum(*tables.values())),
+    ]
+    for name, values in tables.items():
+        lines.append("{} = (".format(name))
+        for start in range(0, len(values), 16):
+            row = "".join(
+                "\\x{:02x}".format(item) for item in values[start : start + 16]
+            )
+            lines.append('    b"{}"'.format(row))
+        lines.append(")")
+    with atomic_open(path) as file:
+        file.write(("\n".join(lines) + "\n").encode())
+
+
+def load_compiled_tables(size):
+    """
+    Imports tables compiled by compile_tables and checks their \n
+    checksum, ValueError when the module is damaged
+
+    Args:
+        size - amount of columns/rows - number of type int
+
+    Returns:
+        sbox, inv_sbox, rcon - values of type bytes, \n
+        None when there is no compiled module for the size
+    """
+
+    try:
+        module = __import__(TABLES_MODULE)
+    except ImportError:
+        return None
+    if module.SIZE != size:
+        return None
+    tables = module.SBOX, module.INV_SBOX, module.RCON
+    if tables_checksum(*tables) != module.CHECKSUM:
+        raise ValueError(
+            "{} is damaged, generate it again with compile_tables".format(TABLES_MODULE)
+        )
+    return tables
+
+
+@functools.lru_cache(maxsize=None)
+def load_tables(size):
+    """
+    Loads sbox, inv_sbox and rcon only once per process, \n
+    on first use. Compiled tables are imported when they  \n
+    exist, otherwise data/*.txt files are parsed
+
+    Args:
+        size - amount of columns/rows - number of type int
+
+    Returns:
+        sbox, inv_sbox, rcon - values of type bytes
+    """
+
+    tables = load_compiled_tables(size)
+    if tables is not None:
+        return tables
+    return bytes(read_sbox(size)), bytes(read_inv_sbox(size)), bytes(read_rcon(size))
+
+
+@functools.lru_cache(maxsize=None)
+def load_t_tables(sbox):
+    """
+    Generates encryption lookup tables once for each sbox
+
+    Args:
+        sbox - byte substition table of type bytes
+
+    Returns:
+        t_tables - tables generated by generate_t_tables - tuple of tuples of type int
+    """
+
+    return tuple(tuple(table) for table in generate_t_tables(sbox))
+
+
+@functools.lru_cache(maxsize=None)
+def load_inv_t_tables(inv_sbox):
+    """
+    Generates decryption lookup tables once for each inv_sbox
+
+    Args:
+        inv_sbox - inversed byte substition table of type bytes
+
+    Returns:
+        inv_t_tables - tables generated by generate_inv_t_tables - tuple of tuples of type int
+    """
+
+    return tuple(tuple(table) for table in generate_inv_t_tables(inv_sbox))
+
+
+class Metrics:
+    """
+    Counters and latency histograms exported in Prometheus  \n
+    text format. Disabled by default, then the hot path only \n
+    checks the enabled attribute and nothing is recorded
+
+    Args:
+        enabled - record values when True of type bool
+        buckets - upper bounds of histogram buckets in seconds - tuple of type float
+    """
+
+    def __init__(self, enabled=False, buckets=LATENCY_BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self.descriptions = {}
+        self.counters = {}
+        self.histograms = {}
+
+    def describe(self, name, kind, text):
+        """
+        Registers metric, only registered metrics are rendered
+
+        Args:
+            name - metric name of type string
+            kind - "counter" or "histogram" of type string
+            text - help text of type string
+
+        Returns:
+            None
+        """
+
+        self.descriptions[name] = (kind, text)
+
+    def inc(self, name, amount=1, labels=()):
+        """
+        Increases counter
+
+        Args:
+            name - metric name of type string
+            amount - value added to the counter of type int
+            labels - pairs (label, value) - tuple of tuples of type string
+
+        Returns:
+            None
+        """
+
+        with self.lock:
+            self.counters[name, labels] = self.counters.get((name, labels), 0) + amount
+
+    def observe(self, name, seconds, labels=()):
+        """
+        Adds measured time to histogram
+
+        Args:
+            name - metric name of type string
+            seconds - measured time of type float
+            labels - pairs (label, value) - tuple of tuples of type string
+
+        Returns:
+            None
+        """
+
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self.lock:
+            histogram = self.histograms.get((name, labels))
+            if histogram is None:
+                histogram = self.histograms[name, labels] = [
+                    [0] * (len(self.buckets) + 1),
+                    0.0,
+                ]
+            histogram[0][index] += 1
+            histogram[1] += seconds
+
+    def reset(self):
+        """
+        Removes all recorded values
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def render(self):
+        """
+        Renders all registered metrics in Prometheus text format
+
+        Args:
+            None
+
+        Returns:
+            text - metrics exposition of type string
+        """
+
+        def series(name, labels, extra=()):
+            pairs = ",".join('{}="{}"'.format(*pair) for pair in labels + extra)
+            return "{}{{{}}}".format(name, pairs) if pairs else name
+
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {
+                key: (list(counts), total)
+                for key, (counts, total) in self.histograms.items()
+            }
+
+        lines = []
+        for name, (kind, text) in self.descriptions.items():
+            lines.append("# HELP {} {}".format(name, text))
+            lines.append("# TYPE {} {}".format(name, kind))
+            for (metric, labels), value in counters.items():
+                if metric == name:
+                    lines.append("{} {}".format(series(name, labels), value))
+            for (metric, labels), (counts, total) in histograms.items():
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += count
+                    lines.append(
+                        "{} {}".format(
+                            series(name + "_bucket", labels, (("le", bound),)),
+                            cumulative,
+                        )
+                    )
+                lines.append("{} {}".format(series(name + "_sum", labels), total))
+                lines.append(
+                    "{} {}".format(series(name + "_count", labels), cumulative)
+                )
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics(os.environ.get("RIJNDAEL_METRICS", "0") == "1")
+METRICS.describe(
+    "rijndael_blocks_encrypted_total", "counter", "Number of encrypted blocks"
+)
+METRICS.describe(
+    "rijndael_blocks_decrypted_total", "counter", "Number of decrypted blocks"
+)
+METRICS.describe(
+    "rijndael_key_schedule_seconds", "histogram", "Time of key schedule expansion"
+)
+METRICS.describe(
+    "rijndael_encrypt_seconds", "histogram", "Time of encrypt_blocks calls"
+)
+METRICS.describe(
+    "rijndael_decrypt_seconds", "histogram", "Time of decrypt_blocks calls"
+)
+
+
+def enable_metrics(enabled=True):
+    """
+    Turns recording of METRICS on or off
+
+    Args:
+        enabled - record values when True of type bool
+
+    Returns:
+        None
+    """
+
+    METRICS.enabled = enabled
+
+
+class RijndaelContext:
+    """
+    Rijndael cipher prepared for one key. Tables are parsed \n
+    and the key schedule is generated only once, in the     \n
+    constructor, encrypt/decrypt do not touch any files.
+
+    Args:
+        key - key provided by user - list of type int
+        size - amount of columns/rows - number of type int
+        rotate_rows_schema - four digit one for each row in a tuple ex. (0,1,2,3)
+        engine - one of ENGINES keys, default engine when omitted - type string
+    """
+
+    def __init__(self, key, size=16, rotate_rows_schema=(0, 1, 2, 3), engine=None):
+        sbox, inv_sbox, rcon = load_tables(size)
+        self.engine = get_engine(engine)
+        self.key = bytes(key)
+        self.size = size
+        self.rotate_rows_schema = tuple(rotate_rows_schema)
+        self.sbox = sbox
+        self.inv_sbox = inv_sbox
+        start = time.perf_counter()
+        self.round_keys = tuple(
+            bytes(round_key) for round_key in key_schedule(list(key), rcon, sbox)
+        )
+        self.key_words = tuple(round_key_words(self.round_keys))
+        self.inv_key_words = tuple(inverse_key_words(self.round_keys))
+        if METRICS.enabled:
+            METRICS.observe(
+                "rijndael_key_schedule_seconds", time.perf_counter() - start
+            )
+        self.t_tables = load_t_tables(sbox)
+        self.inv_t_tables = load_inv_t_tables(inv_sbox)
+        # filled by modes.ghash_tables when the key is first used with GCM
+        self.ghash_tables = None
+
+    def encrypt_blocks(self, src, dst):
+        """
+        Encrypts whole 16-byte blocks with the selected engine
+
+        Args:
+            src - blocks to encrypt, length divisible by 16 - bytes-like object
+            dst - buffer for encrypted blocks, may be src itself - bytearray
+
+        Returns:
+            dst - encrypted blocks - bytearray
+        """
+
+        if not METRICS.enabled:
+            return ENGINES[self.engine][0](self, src, dst)
+        start = time.perf_counter()
+        ENGINES[self.engine][0](self, src, dst)
+        METRICS.observe("rijndael_encrypt_seconds", time.perf_counter() - start)
+        METRICS.inc("rijndael_blocks_encrypted_total", len(src) // self.size)
+        return dst
+
+    def decrypt_blocks(self, src, dst):
+        """
+        Decrypts whole 16-byte blocks with the selected engine
+
+        Args:
+            src - blocks to decrypt, length divisible by 16 - bytes-like object
+            dst - buffer for decrypted blocks, may be src itself - bytearray
+
+        Returns:
+            dst - decrypted blocks - bytearray
+        """
+
+        if not METRICS.enabled:
+            return ENGINES[self.engine][1](self, src, dst)
+        start = time.perf_counter()
+        ENGINES[self.engine][1](self, src, dst)
+        METRICS.observe("rijndael_decrypt_seconds", time.perf_counter() - start)
+        METRICS.inc("rijndael_blocks_decrypted_total", len(src) // self.size)
+        return dst
+
+    def encrypt_into(self, src, dst):
+        """
+        Encrypts any bytes-like object straight into dst. Data is   \n
+        filled with PKCS#7 (n bytes of value n, 1 <= n <= 16), so   \n
+        any data, also ending with 3rd element of ASCII table, can  \n
+        be restored exactly. Only the last block is prepared in a   \n
+        temporary 16-byte buffer
+
+        Args:
+            src - data to encrypt - bytes-like object
+            dst - buffer at least padded_length(len(src)) long, may be src itself - writable bytes-like object
+
+        Returns:
+            length - number of bytes written to dst of type int
+        """
+
+        src = memoryview(src).cast("B")
+        dst = memoryview(dst).cast("B")
+        length = padded_length(len(src), self.size)
+        if len(dst) < length:
+            raise ValueError("dst must have at least {} bytes".format(length))
+
+        whole = len(src) - len(src) % self.size
+        last_block = bytearray(src[whole:])
+        filling = self.size - len(last_block)
+        last_block += bytes([filling]) * filling
+        if whole:
+            self.encrypt_blocks(src[:whole], dst[:whole])
+        self.encrypt_blocks(last_block, last_block)
+        dst[whole:length] = last_block
+        return length
+
+    def decrypt_into(self, src, dst):
+        """
+        Decrypts any bytes-like object straight into dst, \n
+        PKCS#7 filling of the last block is checked and   \n
+        not counted
+
+        Args:
+            src - encrypted data, length divisible by 16 - bytes-like object
+            dst - buffer at least len(src) long, may be src itself - writable bytes-like object
+
+        Returns:
+            length - number of decrypted bytes without filling of type int
+        """
+
+        src = memoryview(src).cast("B")
+        dst = memoryview(dst).cast("B")
+        if not src or len(src) % self.size:
+            raise ValueError(
+                "src length must be a positive multiple of {}".format(self.size)
+            )
+        if len(dst) < len(src):
+            raise ValueError("dst must have at least {} bytes".format(len(src)))
+
+        self.decrypt_blocks(src, dst[: len(src)])
+        return unfilled_length(dst[: len(src)], self.size)
+
+    def encrypt_bytes(self, data):
+        """
+        Encrypts any bytes-like object
+
+        Args:
+            data - data to encrypt - bytes-like object
+
+        Returns:
+            output - encrypted data - bytearray
+        """
+
+        output = bytearray(padded_length(len(memoryview(data).cast("B")), self.size))
+        self.encrypt_into(data, output)
+        return output
+
+    def decrypt_bytes(self, data):
+        """
+        Decrypts any bytes-like object
+
+        Args:
+            data - encrypted data, length divisible by 16 - bytes-like object
+
+        Returns:
+            output - decrypted data - bytearray
+        """
+
+        output = bytearray(len(memoryview(data).cast("B")))
+        del output[self.decrypt_into(data, output) :]
+        return output
+
+    def encrypt(self, message, ciphertext_format="decimal"):
+        """
+        Recreates the entire Rijndael encryption scheme
+
+        Args:
+            message - delivered by user text to be encrypted of type string
+            ciphertext_format - one of CIPHERTEXT_FORMATS of type string
+
+        Returns:
+            output - encrypted text of type string
+        """
+
+        data = text_to_blocks(message, self.size)
+        self.encrypt_blocks(data, data)
+        return format_ciphertext(data, ciphertext_format)
+
+    def decrypt(self, message, ciphertext_format="decimal"):
+        """
+        Recreates the entire Rijndael decryption scheme
+
+        Args:
+            message - delivered by user text to be decrypted of type string
+            ciphertext_format - one of CIPHERTEXT_FORMATS of type string
+
+        Returns:
+            output - decrypted text of type string
+        """
+
+        data = parse_ciphertext(message, self.size, ciphertext_format)
+        self.decrypt_blocks(data, data)
+        return data.replace(b"\x03", b"").decode("latin-1")
+
+    def encrypt_many(self, messages, ciphertext_format="decimal"):
+        """
+        Encrypts many messages with a single encrypt_blocks call, \n
+        blocks of all messages are joined and split back after
+
+        Args:
+            messages - texts to be encrypted - list of type string
+            ciphertext_format - one of CIPHERTEXT_FORMATS of type string
+
+        Returns:
+            output - encrypted texts, one for each message - list of type string
+        """
+
+        data = bytearray()
+        bounds = [0]
+        for message in messages:
+            data += text_to_blocks(message, self.size)
+            bounds.append(len(data))
+        self.encrypt_blocks(data, data)
+        view = memoryview(data)
+        return [
+            format_ciphertext(view[start:end], ciphertext_format)
+            for start, end in zip(bounds, bounds[1:])
+        ]
+
+    def decrypt_many(self, messages, ciphertext_format="decimal"):
+        """
+        Decrypts many messages with a single decrypt_blocks call, \n
+        blocks of all messages are joined and split back after
+
+        Args:
+            messages - texts to be decrypted - list of type string
+            ciphertext_format - one of CIPHERTEXT_FORMATS of type string
+
+        Returns:
+            output - decrypted texts, one for each message - list of type string
+        """
+
+        data = bytearray()
+        bounds = [0]
+        for message in messages:
+            data += parse_ciphertext(message, self.size, ciphertext_format)
+            bounds.append(len(data))
+        self.decrypt_blocks(data, data)
+        return [
+            data[start:end].replace(b"\x03", b"").decode("latin-1")
+            for start, end in zip(bounds, bounds[1:])
+        ]
+
+
+class KeyScheduleCache:
+    """
+    Bounded, thread-safe LRU cache of RijndaelContext objects, \n
+    so the key schedule of a key used again is not generated   \n
+    once more. Entries are found by SHA-256 of the key, the    \n
+    least recently used entry is evicted when capacity is      \n
+    exceeded. Capacity 0 disables caching.
+
+    Args:
+        capacity - maximal number of cached contexts of type int
+    """
+
+    def __init__(self, capacity=KEY_CACHE_CAPACITY):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_hash(key):
+        """
+        Calculates hash identifying the key in the cache
+
+        Args:
+            key - key prepared by parse_key - list of type int
+
+        Returns:
+            SHA-256 of the key of type bytes
+        """
+
+        return hashlib.sha256(bytes(key)).digest()
+
+    def get(self, key, engine=None):
+        """
+        Returns context for the key, creates it when missing
+
+        Args:
+            key - key prepared by parse_key - list of type int
+            engine - one of ENGINES keys, default engine when omitted - type string
+
+        Returns:
+            context - RijndaelContext prepared for the key
+        """
+
+        entry = (self.key_hash(key), get_engine(engine))
+        with self._lock:
+            context = self._entries.get(entry)
+            if context is not None:
+                self._entries.move_to_end(entry)
+                self.hits += 1
+                return context
+            self.misses += 1
+
+        # key schedule is generated outside the lock, other keys are not blocked
+        context = RijndaelContext(key, engine=entry[1])
+        with self._lock:
+            if self.capacity > 0:
+                self._entries[entry] = context
+                self._entries.move_to_end(entry)
+                self._shrink()
+        return context
+
+    def evict(self, key):
+        """
+        Removes the key (for every engine), ex. after key rotation
+
+        Args:
+            key - key prepared by parse_key - list of type int
+
+        Returns:
+            True if the key was cached, otherwise False
+        """
+
+        key_hash = self.key_hash(key)
+        with self._lock:
+            entries = [entry for entry in self._entries if entry[0] == key_hash]
+            for entry in entries:
+                del self._entries[entry]
+            self.evictions += len(entries)
+        return bool(entries)
+
+    def clear(self):
+        """
+        Removes all cached keys, counters are kept
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+
+        with self._lock:
+            self.evictions += len(self._entries)
+            self._entries.clear()
+
+    def resize(self, capacity):
+        """
+        Changes capacity, the least recently used entries are evicted
+
+        Args:
+            capacity - maximal number of cached contexts of type int
+
+        Returns:
+            None
+        """
+
+        with self._lock:
+            self.capacity = capacity
+            self._shrink()
+
+    def _shrink(self):
+        while len(self._entries) > max(self.capacity, 0):
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        """
+        Counters used for sizing the cache
+
+        Args:
+            None
+
+        Returns:
+            dict with hits, misses, evictions, size and capacity
+        """
+
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "capacity": self.capacity,
+            }
+
+
+KEY_CACHE = KeyScheduleCache()
+
+
+def get_context(key, engine=None):
+    """
+    Returns RijndaelContext for the key from KEY_CACHE
+
+    Args:
+        key - key prepared by parse_key - list of type int
+        engine - one of ENGINES keys, default engine when omitted - type string
+
+    Returns:
+        context - RijndaelContext prepared for the key
+    """
+
+    return KEY_CACHE.get(key, engine)
+
+
+def parse_key(provided_key):
+    """
+    Converts key provided by user to values of ASCII table
+
+    Args:
+        provided_key - key provided by user of type string
+
+    Returns:
+        key - 16 values of type int, None if key is not suitable
+    """
+
+    if len(provided_key) != 16:
+        return None
+    key = [ord(char) for char in provided_key]
+    if max(key) > 255:
+        return None
+    return key
+
+
+def encode_message(message, key=None, engine=None, ciphertext_format="decimal"):
+    """
+    Preparing all needed data and run function that \n
+    recreate the entire Rijndael encryption scheme
+    Args:
+        message - delivered by user text to be encrypted of type string
+        key - key prepared by parse_key - list of type int, \n
+              when omitted the key saved by add_key is used
+        engine - one of ENGINES keys, default engine when omitted - type string
+        ciphertext_format - one of CIPHERTEXT_FORMATS of type string
+    Returns:
+        output - encrypted text of type string
+    """
+
+    if key is not None:
+        return get_context(key, engine).encrypt(message, ciphertext_format)
+
+    if not os.path.exists("data/key.txt"):
+        return None
+
+    encoded_message = get_context(read_user_key(), engine).encrypt(
+        message, ciphertext_format
+    )
+
+    if os.path.exists("data/key.txt"):
+        os.remove("data/key.txt")
+
+    return encoded_message
+
+
+def decode_message(message, key=None, engine=None, ciphertext_format="decimal"):
+    """
+    Preparing all needed data and run function that \n
+    recreate the entire Rijndael decryption scheme
+    Args:
+        message - delivered by user text to be decrypted of type string
+        key - key prepared by parse_key - list of type int, \n
+              when omitted the key saved by add_key is used
+        engine - one of ENGINES keys, default engine when omitted - type string
+        ciphertext_format - one of CIPHERTEXT_FORMATS of type string
+    Returns:
+        output - decrypted text of type string
+    """
+
+    if key is not None:
+        return get_context(key, engine).decrypt(message, ciphertext_format)
+
+    if not os.path.exists("data/key.txt"):
+        return None
+
+    decoded_message = get_context(read_user_key(), engine).decrypt(
+        message, ciphertext_format
+    )
+
+    if os.path.exists("data/key.txt"):
+        os.remove("data/key.txt")
+
+    return decoded_message
+
+
+def encode_batch(messages, key, engine=None, ciphertext_format="decimal"):
+    """
+    Encrypts many messages with the same key, the key schedule \n
+    is prepared once and all blocks are encrypted in one pass
+
+    Args:
+        messages - texts to be encrypted - list of type string
+        key - key prepared by parse_key - list of type int
+        engine - one of ENGINES keys, default engine when omitted - type string
+        ciphertext_format - one of CIPHERTEXT_FORMATS of type string
+
+    Returns:
+        output - encrypted texts - list of type string
+    """
+
+    return get_context(key, engine).encrypt_many(messages, ciphertext_format)
+
+
+def decode_batch(messages, key, engine=None, ciphertext_format="decimal"):
+    """
+    Decrypts many messages with the same key, the key schedule \n
+    is prepared once and all blocks are decrypted in one pass
+
+    Args:
+        messages - texts to be decrypted - list of type string
+        key - key prepared by parse_key - list of type int
+        engine - one of ENGINES keys, default engine when omitted - type string
+        ciphertext_format - one of CIPHERTEXT_FORMATS of type string
+
+    Returns:
+        output - decrypted texts - list of type string
+    """
+
+    return get_context(key, engine).decrypt_many(messages, ciphertext_format)
+
+
+def encrypt_into(src, dst, key, engine=None):
+    """
+    Encrypts any bytes-like object into a buffer provided by caller
+
+    Args:
+        src - data to encrypt - bytes-like object
+        dst - buffer at least padded_length(len(src), 16) long - writable bytes-like object
+        key - key prepared by parse_key - list of type int
+        engine - one of ENGINES keys, default engine when omitted - type string
+
+    Returns:
+        length - number of bytes written to dst of type int
+    """
+
+    return get_context(key, engine).encrypt_into(src, dst)
+
+
+def decrypt_into(src, dst, key, engine=None):
+    """
+    Decrypts any bytes-like object into a buffer provided by caller
+
+    Args:
+        src - encrypted data, length divisible by 16 - bytes-like object
+        dst - buffer at least len(src) long - writable bytes-like object
+        key - key prepared by parse_key - list of type int
+        engine - one of ENGINES keys, default engine when omitted - type string
+
+    Returns:
+        length - number of decrypted bytes of type int
+    """
+
+    return get_context(key, engine).decrypt_into(src, dst)
+
+
+def read_chunks(file, chunk_size=STREAM_CHUNK):
+    """
+    Reads binary file piece by piece, only one chunk is kept in memory
+
+    Args:
+        file - file opened in binary mode
+        chunk_size - number of bytes read at once of type int
+
+    Returns:
+        generator of chunks of type bytes
+    """
+
+    return iter(functools.partial(file.read, chunk_size), b"")
+
+
+@contextlib.contextmanager
+def atomic_open(path):
+    """
+    Opens a temporary file next to path for binary writing, \n
+    the temporary file replaces path only if the block inside \n
+    "with" finished without an exception, otherwise it is removed
+
+    Args:
+        path - path of the final file of type string
+
+    Returns:
+        context manager giving file opened in binary mode
+    """
+
+    directory = os.path.dirname(os.path.abspath(path))
+    descriptor, temp_path = tempfile.mkstemp(
+        dir=directory, prefix="." + os.path.basename(path) + ".", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            yield file
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class StreamEncryptor:
+    """
+    Incremental encryption of data delivered in chunks of any \n
+    length, whole blocks are encrypted as soon as they arrive, \n
+    finalize adds PKCS#7 filling exactly as                    \n
+    RijndaelContext.encrypt_bytes
+
+    Args:
+        context - RijndaelContext prepared for the key
+    """
+
+    def __init__(self, context):
+        self.context = context
+        self.pending = b""
+
+    def update(self, chunk):
+        """
+        Encrypts whole blocks available after adding chunk
+
+        Args:
+            chunk - next part of data - bytes-like object
+
+        Returns:
+            output - encrypted blocks, may be empty - bytearray
+        """
+
+        size = self.context.size
+        data = self.pending + chunk if self.pending else memoryview(chunk).cast("B")
+        whole = len(data) - len(data) % size
+        output = bytearray(whole)
+        if whole:
+            self.context.encrypt_blocks(data[:whole], output)
+        self.pending = bytes(data[whole:])
+        return output
+
+    def finalize(self):
+        """
+        Encrypts the rest of data with filling
+
+        Args:
+            None
+
+        Returns:
+            output - the last encrypted block - bytearray
+        """
+
+        output = self.context.encrypt_bytes(self.pending)
+        self.pending = b""
+        return output
+
+
+class StreamDecryptor:
+    """
+    Incremental decryption of data delivered in chunks of any \n
+    length, the last block is held back until finalize, so    \n
+    filling can be removed from it
+
+    Args:
+        context - RijndaelContext prepared for the key
+    """
+
+    def __init__(self, context):
+        self.context = context
+        self.pending = b""
+
+    def update(self, chunk):
+        """
+        Decrypts whole blocks available after adding chunk, \n
+        except the last one
+
+        Args:
+            chunk - next part of encrypted data - bytes-like object
+
+        Returns:
+            output - decrypted blocks, may be empty - bytearray
+        """
+
+        size = self.context.size
+        data = self.pending + chunk if self.pending else memoryview(chunk).cast("B")
+        whole = max(0, (len(data) - 1) // size * size)
+        output = bytearray(whole)
+        if whole:
+            self.context.decrypt_blocks(data[:whole], output)
+        self.pending = bytes(data[whole:])
+        return output
+
+    def finalize(self):
+        """
+        Decrypts the last block and removes filling, \n
+        ValueError when data was damaged or not divisible by 16
+
+        Args:
+            None
+
+        Returns:
+            output - the last decrypted bytes - bytearray
+        """
+
+        output = self.context.decrypt_bytes(self.pending)
+        self.pending = b""
+        return output
+
+
+def encrypt_stream(chunks, context):
+    """
+    Encrypts data delivered in chunks of any length with StreamEncryptor
+
+    Args:
+        chunks - iterable of bytes-like objects
+        context - RijndaelContext prepared for the key
+
+    Returns:
+        generator of encrypted chunks of type bytearray
+    """
+
+    encryptor = StreamEncryptor(context)
+    for chunk in chunks:
+        output = encryptor.update(chunk)
+        if output:
+            yield output
+    yield encryptor.finalize()
+
+
+def decrypt_stream(chunks, context):
+    """
+    Decrypts data delivered in chunks of any length with StreamDecryptor
+
+    Args:
+        chunks - iterable of bytes-like objects
+        context - RijndaelContext prepared for the key
+
+    Returns:
+        generator of decrypted chunks of type bytearray
+    """
+
+    decryptor = StreamDecryptor(context)
+    for chunk in chunks:
+        output = decryptor.update(chunk)
+        if output:
+            yield output
+    output = decryptor.finalize()
+    if output:
+        yield output
+
+
+def encrypt_file(src_path, dst_path, context, chunk_size=STREAM_CHUNK):
+    """
+    Encrypts file of any size, memory usage depends only on chunk_size. \n
+    dst_path is replaced only when the whole file was encrypted, \n
+    so it can be also the same file as src_path
+
+    Args:
+        src_path - path of file to encrypt of type string
+        dst_path - path of encrypted file of type string
+        context - RijndaelContext prepared for the key
+        chunk_size - number of bytes read at once of type int
+
+    Returns:
+        None
+    """
+
+    with open(src_path, "rb") as src, atomic_open(dst_path) as dst:
+        for chunk in encrypt_stream(read_chunks(src, chunk_size), context):
+            dst.write(chunk)
+
+
+def decrypt_file(src_path, dst_path, context, chunk_size=STREAM_CHUNK):
+    """
+    Decrypts file of any size, memory usage depends only on chunk_size. \n
+    dst_path is replaced only when the whole file was decrypted, \n
+    damaged data never leaves a half-written file
+
+    Args:
+        src_path - path of encrypted file of type string
+        dst_path - path of decrypted file of type string
+        context - RijndaelContext prepared for the key
+        chunk_size - number of bytes read at once of type int
+
+    Returns:
+        None
+    """
+
+    with open(src_path, "rb") as src, atomic_open(dst_path) as dst:
+        for chunk in decrypt_stream(read_chunks(src, chunk_size), context):
+            dst.write(chunk)
+
+
+class CiphertextReader(io.RawIOBase):
+    """
+    Read-only file object giving decrypted content of a file     \n
+    encrypted by encrypt_file. Blocks are decrypted independently, \n
+    so seek/read decrypt only blocks covering the requested range. \n
+    The file is memory-mapped and recently decrypted blocks are    \n
+    kept in a LRU cache
+
+    Args:
+        path - path of encrypted file of type string
+        context - RijndaelContext prepared for the key
+        cache_blocks - maximal number of cached blocks of type int
+    """
+
+    def __init__(self, path, context, cache_blocks=READER_CACHE_BLOCKS):
+        super().__init__()
+        self.context = context
+        self.cache_blocks = cache_blocks
+        self.cache = collections.OrderedDict()
+        self.position = 0
+        with open(path, "rb") as file:
+            length = os.fstat(file.fileno()).st_size
+            if not length or length % context.size:
+                raise ValueError(
+                    "file length must be a positive multiple of {}".format(context.size)
+                )
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        blocks = length // context.size
+        last_block = self.read_blocks(blocks - 1, blocks)
+        self.length = length - context.size + unfilled_length(last_block, context.size)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        """
+        Changes position in decrypted content
+
+        Args:
+            offset - position relative to whence of type int
+            whence - io.SEEK_SET, io.SEEK_CUR or io.SEEK_END
+
+        Returns:
+            position - new position of type int
+        """
+
+        if self.closed:
+            raise ValueError("I/O operation on closed file")
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self.position + offset
+        elif whence == io.SEEK_END:
+            position = self.length + offset
+        else:
+            raise ValueError("invalid whence {!r}".format(whence))
+        if position < 0:
+            raise ValueError("negative seek position {}".format(position))
+        self.position = position
+        return position
+
+    def read_blocks(self, first, last):
+        """
+        Decrypts blocks [first, last), blocks missing in the cache \n
+        are decrypted in runs by single decrypt_blocks calls
+
+        Args:
+            first - number of the first block of type int
+            last - number of the block after the last one of type int
+
+        Returns:
+            output - decrypted blocks - bytearray
+        """
+
+        size = self.context.size
+        output = bytearray((last - first) * size)
+        index = first
+        while index < last:
+            block = self.cache.get(index)
+            if block is not None:
+                self.cache.move_to_end(index)
+                start = (index - first) * size
+                output[start : start + size] = block
+                index += 1
+                continue
+            end = index + 1
+            while end < last and end not in self.cache:
+                end += 1
+            start, stop = (index - first) * size, (end - first) * size
+            self.context.decrypt_blocks(
+                self.data[index * size : end * size], memoryview(output)[start:stop]
+            )
+            for cached in range(max(index, end - self.cache_blocks), end):
+                offset = (cached - first) * size
+                self.cache[cached] = bytes(output[offset : offset + size])
+            while len(self.cache) > self.cache_blocks:
+                self.cache.popitem(last=False)
+            index = end
+        return output
+
+    def readinto(self, buffer):
+        """
+        Reads decrypted content from the current position into buffer
+
+        Args:
+            buffer - writable bytes-like object
+
+        Returns:
+            length - number of bytes read, 0 at the end of content of type int
+        """
+
+        if self.closed:
+            raise ValueError("I/O operation on closed file")
+        buffer = memoryview(buffer).cast("B")
+        end = min(self.position + len(buffer), self.length)
+        if end <= self.position:
+            return 0
+        size = self.context.size
+        first, last = self.position // size, (end + size - 1) // size
+        output = self.read_blocks(first, last)
+        start = self.position - first * size
+        length = end - self.position
+        buffer[:length] = output[start : start + length]
+        self.position = end
+        return length
+
+    def readall(self):
+        return self.read(max(self.length - self.position, 0))
+
+    def close(self):
+        if not self.closed:
+            self.data.close()
+            self.cache.clear()
+        super().close()
+
+
+def add_key(provided_key):
+    """
+    Save key provided by user to file "KEY.txt". \n
+    Key would be ready for next operation, after \n
+    will be deleted. Key can be also passed directly \n
+    to encode_message/decode_message without any file
+
+    Args:
+        key - key provided by user - list of type int
+
+    Returns:
+        output - True if key was suitable, otherwise False
+    """
+    key = parse_key(provided_key)
+    if key is not None:
+        with open("data/key.txt", "w") as file:
+            for counter, value in enumerate(key, 1):
+                file.write("0x{:02x} ".format(value))
+                if counter % 4 == 0:
+                    file.write("\n")
+        return True
+    return False
+
+
+def main(argv=None):
+    """
+    Command line interface, ex.                          \n
+    python -m cipher encrypt message.txt message.enc --key 0123456789abcdef \n
+    python -m cipher decrypt message.enc message.txt --key 0123456789abcdef \n
+    key can be also given by RIJNDAEL_KEY environment variable
+
+    Args:
+        argv - command line arguments - list of type string
+
+    Returns:
+        exit code of type int
+    """
+
+    parser = argparse.ArgumentParser(prog="cipher", description="Rijndael cipher")
+    parser.add_argument("command", choices=("encrypt", "decrypt"))
+    parser.add_argument("src", help="input file")
+    parser.add_argument("dst", help="output file")
+    parser.add_argument("--key", default=os.environ.get("RIJNDAEL_KEY", ""))
+    parser.add_argument("--engine", choices=tuple(ENGINES), default=None)
+    parser.add_argument("--chunk-size", type=int, default=STREAM_CHUNK)
+    args = parser.parse_args(argv)
+
+    key = parse_key(args.key)
+    if key is None:
+        parser.error("KEY not accepted, it must consist of 16 characters")
+    if args.chunk_size <= 0:
+        parser.error("chunk size must be positive")
+
+    context = RijndaelContext(key, engine=args.engine)
+    try:
+        if args.command == "encrypt":
+            encrypt_file(args.src, args.dst, context, args.chunk_size)
+        else:
+            decrypt_file(args.src, args.dst, context, args.chunk_size)
+    except (OSError, ValueError) as error:
+        parser.error("{} failed: {}".format(args.command, error))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
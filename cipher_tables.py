@@ -0,0 +1,60 @@
+"""
+Tables from data/*.txt compiled by cipher.compile_tables, do not edit
+"""
+
+SIZE = 16
+CHECKSUM = "55c366fc4fedf6eadc64d4afb4ad2ade5c93c0ab4c28a4557945b2711de6e64f"
+SBOX = (
+    b"\x61\x1d\xa6\x9e\x36\x16\x51\x8a\x03\x18\x85\x8c\x25\xaf\xd7\x02"
+    b"\x33\x26\x4f\x92\xb2\x8f\x11\xf0\x7f\x2a\x69\x4b\x07\xb3\x67\x63"
+    b"\x32\xdf\x0b\x2b\xd4\x9f\x87\xba\x38\x5c\x80\x9a\xc2\x53\x35\xe5"
+    b"\xb7\xcf\xee\x99\xf7\xa8\x24\x13\xd9\x74\x22\xce\x4d\xb6\x58\x83"
+    b"\x78\x57\x71\x95\x2f\x64\x9c\x60\x68\xa4\x27\x5b\x20\x6a\x52\x7c"
+    b"\xca\xf4\x05\x0a\x37\x50\x73\xbc\x76\xfd\x65\x45\x12\xcb\x1b\x5d"
+    b"\xe8\x34\xc8\x79\xdb\x46\x82\xe1\x98\x9b\xfa\x97\x6c\xa2\xaa\xc7"
+    b"\x5e\x0d\xe6\x3a\xae\x17\xd2\xd1\xb9\x62\xbe\xa0\xa7\x75\x10\xa1"
+    b"\x28\xef\x4a\x48\x3e\x43\x1c\x3c\xd6\xc9\x93\x39\x94\x54\x7e\x42"
+    b"\x2e\xe0\xfb\x0c\xfe\x44\xc4\x19\x30\xab\xcd\x31\x0e\xdc\xff\x96"
+    b"\x90\xec\xbb\xdd\xc6\xb0\xea\x1f\x2d\x8d\x6d\x29\xd3\x6f\x7a\xa3"
+    b"\x49\x77\xac\xc0\x06\xf8\x86\xbd\x81\xa9\x5f\xc1\x00\xf3\xcc\x1e"
+    b"\xc3\x89\xfc\x4e\x3b\x9d\xda\xf2\xe4\xd0\xf1\x4c\x84\x08\x8b\x59"
+    b"\xc5\x5a\xf9\xe3\xd5\xbf\xd8\x72\xad\xe7\x6b\xf6\x8e\x0f\x21\x1a"
+    b"\x40\xe2\x14\x88\x41\x7b\x7d\x01\xb4\xb5\x3d\xa5\x04\xb8\x6e\xb1"
+    b"\x15\xeb\x23\xf5\xde\xe9\xed\x70\x3f\x2c\x47\x66\x55\x09\x56\x91"
+)
+INV_SBOX = (
+    b"\xbc\xe7\x0f\x08\xec\x52\xb4\x1c\xcd\xfd\x53\x22\x93\x71\x9c\xdd"
+    b"\x7e\x16\x5c\x37\xe2\xf0\x05\x75\x09\x97\xdf\x5e\x86\x01\xbf\xa7"
+    b"\x4c\xde\x3a\xf2\x36\x0c\x11\x4a\x80\xab\x19\x23\xf9\xa8\x90\x44"
+    b"\x98\x9b\x20\x10\x61\x2e\x04\x54\x28\x8b\x73\xc4\x87\xea\x84\xf8"
+    b"\xe0\xe4\x8f\x85\x95\x5b\x65\xfa\x83\xb0\x82\x1b\xcb\x3c\xc3\x12"
+    b"\x55\x06\x4e\x2d\x8d\xfc\xfe\x41\x3e\xcf\xd1\x4b\x29\x5f\x70\xba"
+    b"\x47\x00\x79\x1f\x45\x5a\xfb\x1e\x48\x1a\x4d\xda\x6c\xaa\xee\xad"
+    b"\xf7\x42\xd7\x56\x39\x7d\x58\xb1\x40\x63\xae\xe5\x4f\xe6\x8e\x18"
+    b"\x2a\xb8\x66\x3f\xcc\x0a\xb6\x26\xe3\xc1\x07\xce\x0b\xa9\xdc\x15"
+    b"\xa0\xff\x13\x8a\x8c\x43\x9f\x6b\x68\x33\x2b\x69\x46\xc5\x03\x25"
+    b"\x7b\x7f\x6d\xaf\x49\xeb\x02\x7c\x35\xb9\x6e\x99\xb2\xd8\x74\x0d"
+    b"\xa5\xef\x14\x1d\xe8\xe9\x3d\x30\xed\x78\x27\xa2\x57\xb7\x7a\xd5"
+    b"\xb3\xbb\x2c\xc0\x96\xd0\xa4\x6f\x62\x89\x50\x5d\xbe\x9a\x3b\x31"
+    b"\xc9\x77\x76\xac\x24\xd4\x88\x0e\xd6\x38\xc6\x64\x9d\xa3\xf4\x21"
+    b"\x91\x67\xe1\xd3\xc8\x2f\x72\xd9\x60\xf5\xa6\xf1\xa1\xf6\x32\x81"
+    b"\x17\xca\xc7\xbd\x51\xf3\xdb\x34\xb5\xd2\x6a\x92\xc2\x59\x94\x9e"
+)
+RCON = (
+    b"\x00\x01\x02\x04\x08\x10\x20\x40\x80\x1b\x36\x6c\xd8\xab\x4d\x9a"
+    b"\x2f\x5e\xbc\x63\xc6\x97\x35\x6a\xd4\xb3\x7d\xfa\xef\xc5\x91\x39"
+    b"\x72\xe4\xd3\xbd\x61\xc2\x9f\x25\x4a\x94\x33\x66\xcc\x83\x1d\x3a"
+    b"\x74\xe8\xcb\x8d\x01\x02\x04\x08\x10\x20\x40\x80\x1b\x36\x6c\xd8"
+    b"\xab\x4d\x9a\x2f\x5e\xbc\x63\xc6\x97\x35\x6a\xd4\xb3\x7d\xfa\xef"
+    b"\xc5\x91\x39\x72\xe4\xd3\xbd\x61\xc2\x9f\x25\x4a\x94\x33\x66\xcc"
+    b"\x83\x1d\x3a\x74\xe8\xcb\x8d\x01\x02\x04\x08\x10\x20\x40\x80\x1b"
+    b"\x36\x6c\xd8\xab\x4d\x9a\x2f\x5e\xbc\x63\xc6\x97\x35\x6a\xd4\xb3"
+    b"\x7d\xfa\xef\xc5\x91\x39\x72\xe4\xd3\xbd\x61\xc2\x9f\x25\x4a\x94"
+    b"\x33\x66\xcc\x83\x1d\x3a\x74\xe8\xcb\x8d\x01\x02\x04\x08\x10\x20"
+    b"\x40\x80\x1b\x36\x6c\xd8\xab\x4d\x9a\x2f\x5e\xbc\x63\xc6\x97\x35"
+    b"\x6a\xd4\xb3\x7d\xfa\xef\xc5\x91\x39\x72\xe4\xd3\xbd\x61\xc2\x9f"
+    b"\x25\x4a\x94\x33\x66\xcc\x83\x1d\x3a\x74\xe8\xcb\x8d\x01\x02\x04"
+    b"\x08\x10\x20\x40\x80\x1b\x36\x6c\xd8\xab\x4d\x9a\x2f\x5e\xbc\x63"
+    b"\xc6\x97\x35\x6a\xd4\xb3\x7d\xfa\xef\xc5\x91\x39\x72\xe4\xd3\xbd"
+    b"\x61\xc2\x9f\x25\x4a\x94\x33\x66\xcc\x83\x1d\x3a\x74\xe8\xcb\x8d"
+)
@@ -0,0 +1,477 @@
+"""
+# ---------------------------------------------------------------
+# Program:    loadtest.py
+# Purpose:    Load testing of the FastAPI service from main.py
+#
+# Description:
+# Sends /encode and /decode requests from many concurrent
+# clients for a given time, messages of different lengths are
+# mixed with given weights. Reports requests per second, error
+# rate and latency percentiles for every kind of request and
+# saves them as JSON, so builds can be compared. Without --url
+# the application is called in this process through ASGI (no
+# network, cipher work shares the event loop with the clients),
+# with --url requests are sent over HTTP/1.1 to a running server
+# ---------------------------------------------------------------
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import string
+import sys
+import time
+import urllib.parse
+
+import cipher
+import main
+from benchmark import parse_size
+
+LOAD_SIZES = "16:8,1K:4,16K:1"
+LOAD_ENDPOINTS = "encode:1,decode:1"
+LOAD_KEY = "0123456789abcdef"
+PERCENTILES = (50, 90, 99)
+
+
+def parse_mix(text, parse=str):
+    """
+    Converts comma separated values with optional weights, ex. \n
+    "16:8,1K:4,16K" gives [(16, 8), (1024, 4), (16384, 1)]
+
+    Args:
+        text - values of type string
+        parse - function converting a value, ex. parse_size
+
+    Returns:
+        mix - value and weight - list of tuples
+    """
+
+    mix = []
+    for item in text.split(","):
+        value, _, weight = item.strip().partition(":")
+        mix.append((parse(value), float(weight or 1)))
+    return mix
+
+
+def build_requests(sizes, endpoints, key=LOAD_KEY, ciphertext_format="decimal"):
+    """
+    Prepares query strings of every kind of request, random text \n
+    of each size is encrypted once for /decode requests
+
+    Args:
+        sizes - text lengths and weights - list of tuples
+        endpoints - "encode"/"decode" and weights - list of tuples
+        key - key of 16 characters of type string
+        ciphertext_format - one of main.CiphertextFormat values of type string
+
+    Returns:
+        requests - name, path, query string and weight - list of tuples
+    """
+
+    alphabet = string.ascii_letters + string.digits + " "
+    requests = []
+    for size, size_weight in sizes:
+        text = "".join(random.choice(alphabet) for _ in range(size))
+        for endpoint, endpoint_weight in endpoints:
+            if endpoint == "encode":
+                message = text
+            elif endpoint == "decode":
+                message = cipher.encode_message(
+                    text, cipher.parse_key(key), None, ciphertext_format
+                )
+            else:
+                raise ValueError("Unknown endpoint {!r}".format(endpoint))
+            query = urllib.parse.urlencode(
+                {"message": message, "key": key, "format": ciphertext_format}
+            )
+            requests.append(
+                (
+                    "{}/{}".format(endpoint, size),
+                    "/" + endpoint,
+                    query,
+                    size_weight * endpoint_weight,
+                )
+            )
+    return requests
+
+
+class AsgiClient:
+    """
+    Calls an ASGI application directly, without network
+
+    Args:
+        app - ASGI application
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, path, query):
+        """
+        Sends GET request
+
+        Args:
+            path - path of the endpoint of type string
+            query - query string of type string
+
+        Returns:
+            status, body - HTTP status of type int and response body of type bytes
+        """
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": [(b"host", b"loadtest")],
+            "client": ("127.0.0.1", 0),
+            "server": ("loadtest", 80),
+        }
+        response = {"status": None, "body": []}
+        finished = asyncio.Event()
+        requested = False
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await finished.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    finished.set()
+
+        await self.app(scope, receive, send)
+        finished.set()
+        return response["status"], b"".join(response["body"])
+
+    async def close(self):
+        pass
+
+
+class HttpClient:
+    """
+    Minimal HTTP/1.1 client keeping one connection alive, \n
+    the connection is opened again after an error
+
+    Args:
+        url - address of the server, ex. http://localhost:8000
+    """
+
+    def __init__(self, url):
+        url = urllib.parse.urlsplit(url)
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.prefix = url.path.rstrip("/")
+        self.reader = None
+        self.writer = None
+
+    async def request(self, path, query):
+        """
+        Sends GET request
+
+        Args:
+            path - path of the endpoint of type string
+            query - query string of type string
+
+        Returns:
+            status, body - HTTP status of type int and response body of type bytes
+        """
+
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+        try:
+            self.writer.write(
+                "GET {}{}?{} HTTP/1.1\r\nHost: {}\r\n\r\n".format(
+                    self.prefix, path, query, self.host
+                ).encode()
+            )
+            status = int((await self.reader.readline()).split()[1])
+            headers = {}
+            while True:
+                line = await self.reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            if "content-length" in headers:
+                body = await self.reader.readexactly(int(headers["content-length"]))
+            else:
+                body = await self.reader.read()
+                headers["connection"] = "close"
+            if headers.get("connection", "").lower() == "close":
+                await self.close()
+            return status, body
+        except BaseException:
+            await self.close()
+            raise
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+def percentile(values, percent):
+    """
+    Nearest-rank percentile
+
+    Args:
+        values - sorted values - list of type float
+        percent - percentile from 0 to 100 of type float
+
+    Returns:
+        value - value of the percentile of type float, 0 for no values
+    """
+
+    if not values:
+        return 0.0
+    rank = max(1, -(-len(values) * percent // 100))
+    return values[int(rank) - 1]
+
+
+def summarize(latencies, errors, elapsed):
+    """
+    Builds single result entry
+
+    Args:
+        latencies - seconds of successful requests - list of type float
+        errors - number of failed requests of type int
+        elapsed - seconds of the whole test of type float
+
+    Returns:
+        result - requests/s, error rate and latency in milliseconds - dict
+    """
+
+    latencies = sorted(latencies)
+    requests = len(latencies) + errors
+    latency = {
+        "p{}".format(percent): percentile(latencies, percent) * 1000
+        for percent in PERCENTILES
+    }
+    latency["mean"] = sum(latencies) / len(latencies) * 1000 if latencies else 0.0
+    latency["max"] = latencies[-1] * 1000 if latencies else 0.0
+    return {
+        "requests": requests,
+        "errors": errors,
+        "error_rate": errors / requests if requests else 0.0,
+        "requests_per_s": requests / elapsed,
+        "latency_ms": latency,
+    }
+
+
+async def run_load(clients, requests, duration, total=0, seed=0):
+    """
+    Sends requests from every client at the same time until \n
+    duration passes or total requests are sent, each client  \n
+    waits for its response before sending the next request
+
+    Args:
+        clients - AsgiClient or HttpClient objects - list
+        requests - prepared by build_requests - list of tuples
+        duration - seconds of the test of type float
+        total - maximal number of requests, 0 for no limit - type int
+        seed - seed of the random choice of requests of type int
+
+    Returns:
+        results - summarize result for each kind of request and "total" - dict
+    """
+
+    names = [name for name, path, query, weight in requests]
+    weights = [weight for name, path, query, weight in requests]
+    latencies = {name: [] for name in names}
+    errors = dict.fromkeys(names, 0)
+    remaining = total or float("inf")
+
+    async def client_loop(client, rng):
+        nonlocal remaining
+        while remaining > 0 and time.perf_counter() < deadline:
+            remaining -= 1
+            name, path, query, weight = rng.choices(requests, weights)[0]
+            start = time.perf_counter()
+            try:
+                status, body = await client.request(path, query)
+                failed = status != 200 or b'"Response"' not in body
+            except (OSError, ValueError, IndexError, asyncio.IncompleteReadError):
+                failed = True
+            if failed:
+                errors[name] += 1
+            else:
+                latencies[name].append(time.perf_counter() - start)
+        await client.close()
+
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(
+        *(
+            client_loop(client, random.Random(seed + number))
+            for number, client in enumerate(clients)
+        )
+    )
+    elapsed = time.perf_counter() - start
+
+    results = {
+        name: summarize(latencies[name], errors[name], elapsed) for name in names
+    }
+    results["total"] = summarize(
+        [latency for name in names for latency in latencies[name]],
+        sum(errors.values()),
+        elapsed,
+    )
+    return results
+
+
+async def load_test(
+    url=None,
+    concurrency=32,
+    duration=10.0,
+    total=0,
+    sizes=LOAD_SIZES,
+    endpoints=LOAD_ENDPOINTS,
+    ciphertext_format="decimal",
+    seed=0,
+):
+    """
+    Runs the whole load test, in process when url is omitted
+
+    Args:
+        url - address of a running server of type string
+        concurrency - number of clients of type int
+        duration, total, seed - as in run_load
+        sizes - text lengths with weights, ex. "16:8,1K:4,16K:1" - type string
+        endpoints - endpoints with weights, ex. "encode:1,decode:1" - type string
+        ciphertext_format - one of main.CiphertextFormat values of type string
+
+    Returns:
+        report - environment description and results - dict
+    """
+
+    random.seed(seed)
+    requests = build_requests(
+        parse_mix(sizes, parse_size),
+        parse_mix(endpoints),
+        ciphertext_format=ciphertext_format,
+    )
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "target": url or "in-process",
+        "concurrency": concurrency,
+        "sizes": sizes,
+        "endpoints": endpoints,
+        "format": ciphertext_format,
+    }
+
+    if url:
+        clients = [HttpClient(url) for _ in range(concurrency)]
+        report["results"] = await run_load(clients, requests, duration, total, seed)
+        return report
+
+    async with main.lifespan(main.app):
+        report["engine"] = cipher.get_engine()
+        report["batch_window"] = main.BATCH_WINDOW
+        clients = [AsgiClient(main.app) for _ in range(concurrency)]
+        report["results"] = await run_load(clients, requests, duration, total, seed)
+    return report
+
+
+def print_report(results):
+    """
+    Prints results of run_load as a table
+
+    Args:
+        results - result for each kind of request - dict
+
+    Returns:
+        None
+    """
+
+    columns = ["p{}".format(percent) for percent in PERCENTILES] + ["max"]
+    print(
+        ("{:<16}{:>10}{:>10}{:>8}" + "{:>10}" * len(columns)).format(
+            "request", "requests", "req/s", "errors", *(c + " ms" for c in columns)
+        )
+    )
+    for name, result in results.items():
+        print(
+            ("{:<16}{:>10}{:>10.1f}{:>8.1%}" + "{:>10.2f}" * len(columns)).format(
+                name,
+                result["requests"],
+                result["requests_per_s"],
+                result["error_rate"],
+                *(result["latency_ms"][column] for column in columns),
+            )
+        )
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Rijndael API load test")
+    parser.add_argument(
+        "--url", help="running server, ex. http://localhost:8000, in process if omitted"
+    )
+    parser.add_argument("--concurrency", type=int, default=32, help="clients")
+    parser.add_argument(
+        "--duration", type=float, default=10.0, help="seconds of the test"
+    )
+    parser.add_argument(
+        "--requests", type=int, default=0, help="stop after this many requests"
+    )
+    parser.add_argument(
+        "--sizes",
+        default=LOAD_SIZES,
+        help="text lengths with weights, ex. 16:8,1K:4,16K:1",
+    )
+    parser.add_argument(
+        "--endpoints",
+        default=LOAD_ENDPOINTS,
+        help="endpoints with weights, ex. encode:3,decode:1",
+    )
+    parser.add_argument(
+        "--format",
+        default="decimal",
+        choices=[
+            ciphertext_format.value for ciphertext_format in main.CiphertextFormat
+        ],
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="save the report as JSON")
+    args = parser.parse_args()
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+
+    report = asyncio.run(
+        load_test(
+            args.url,
+            args.concurrency,
+            args.duration,
+            args.requests,
+            args.sizes,
+            args.endpoints,
+            args.format,
+            args.seed,
+        )
+    )
+    print_report(report["results"])
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    return 1 if report["results"]["total"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
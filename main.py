@@ -1,20 +1,462 @@
-from fastapi import FastAPI
+import asyncio
+import contextlib
+import functools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from enum import Enum
+
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 import cipher
+import modes
+
+# messages longer than OFFLOAD_SIZE characters are processed in a worker process
+OFFLOAD_SIZE = int(os.environ.get("RIJNDAEL_OFFLOAD_SIZE", str(64 * 1024)))
+POOL_WORKERS = int(os.environ.get("RIJNDAEL_POOL_WORKERS", str(os.cpu_count() or 1)))
+# /encode and /decode requests with the same key arriving within BATCH_WINDOW
+# seconds are processed together, 0 turns batching off
+BATCH_WINDOW = float(os.environ.get("RIJNDAEL_BATCH_WINDOW", "0.001"))
+BATCH_SIZE = int(os.environ.get("RIJNDAEL_BATCH_SIZE", "256"))
+
+executor = None
+
+# blocks processed in worker processes are not counted by cipher.METRICS,
+# request metrics below cover them
+cipher.enable_metrics(os.environ.get("RIJNDAEL_METRICS", "1") != "0")
+cipher.METRICS.describe(
+    "rijndael_request_seconds", "histogram", "Time of handling HTTP requests"
+)
+cipher.METRICS.describe(
+    "rijndael_request_bytes_total", "counter", "Bytes of messages and request bodies"
+)
+
+
+def init_worker():
+    """
+    Parses sbox, inv_sbox, rcon, generates lookup tables and selects \n
+    the engine once, when a worker process starts, not during the    \n
+    first request
+    """
+
+    sbox, inv_sbox, rcon = cipher.load_tables(16)
+    cipher.load_t_tables(sbox)
+    cipher.load_inv_t_tables(inv_sbox)
+    cipher.get_engine()
+
+
+def get_executor():
+    """
+    Returns process pool for large messages, started on first use
+    """
+
+    global executor
+    if executor is None:
+        executor = ProcessPoolExecutor(POOL_WORKERS, initializer=init_worker)
+    return executor
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # with RIJNDAEL_ENGINE=auto the engine is benchmarked before the first request
+    cipher.get_engine()
+    yield
+    global executor
+    if executor is not None:
+        executor.shutdown()
+        executor = None
+
+
+async def run_cipher(size, function, *args, **kwargs):
+    """
+    Runs small messages inline, large ones in the process pool, \n
+    so the event loop is never blocked by a long encryption
+    """
+
+    if size <= OFFLOAD_SIZE:
+        return function(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(), functools.partial(function, *args, **kwargs)
+    )
+
+
+def count_bytes(endpoint, amount):
+    """
+    Adds amount of received bytes to metrics of the endpoint
+    """
+
+    if cipher.METRICS.enabled:
+        cipher.METRICS.inc(
+            "rijndael_request_bytes_total", amount, (("endpoint", endpoint),)
+        )
+
+
+class MicroBatcher:
+    """
+    Collects messages arriving within window seconds, groups them by   \n
+    key and format and processes every group with one batch call       \n
+    (cipher.encode_batch/decode_batch), results are given back to the  \n
+    waiting requests. A group is sent earlier when it has max_size      \n
+    messages, so the added latency is never longer than window
+    """
+
+    def __init__(self, function, window=None, max_size=None):
+        self.function = function
+        self.window = window
+        self.max_size = max_size
+        self.pending = {}
+        self.tasks = set()
+
+    async def submit(self, message, key, ciphertext_format):
+        """
+        Adds message to the group of its key and waits for the result, \n
+        ValueError of the message is raised here
+        """
+
+        window = BATCH_WINDOW if self.window is None else self.window
+        if window <= 0:
+            results = await run_cipher(
+                len(message),
+                self.function,
+                [message],
+                key,
+                ciphertext_format=ciphertext_format,
+            )
+            return results[0]
+
+        loop = asyncio.get_running_loop()
+        group = (loop, bytes(key), ciphertext_format)
+        batch = self.pending.get(group)
+        if batch is None:
+            batch = self.pending[group] = []
+            loop.call_later(window, self.flush, group, batch)
+        future = loop.create_future()
+        batch.append((message, future))
+        if len(batch) >= (BATCH_SIZE if self.max_size is None else self.max_size):
+            self.flush(group, batch)
+        return await future
+
+    def flush(self, group, batch):
+        """
+        Starts processing of the batch unless it was already started
+        """
+
+        if self.pending.get(group) is batch:
+            del self.pending[group]
+            task = group[0].create_task(self.run(group, batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def run(self, group, batch):
+        """
+        Processes all messages of the batch with one call, when one of \n
+        them is not accepted, messages are processed one by one, so    \n
+        only the wrong one gets ValueError
+        """
+
+        loop, key, ciphertext_format = group
+        messages = [message for message, future in batch]
+        try:
+            results = await run_cipher(
+                sum(map(len, messages)),
+                self.function,
+                messages,
+                list(key),
+                ciphertext_format=ciphertext_format,
+            )
+        except ValueError:
+            results = []
+            for message in messages:
+                try:
+                    result = await run_cipher(
+                        len(message),
+                        self.function,
+                        [message],
+                        list(key),
+                        ciphertext_format=ciphertext_format,
+                    )
+                    results.append(result[0])
+                except ValueError as error:
+                    results.append(error)
+        except Exception as error:
+            results = [error] * len(batch)
+
+        for (message, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+encode_batcher = MicroBatcher(cipher.encode_batch)
+decode_batcher = MicroBatcher(cipher.decode_batch)
+
+
+async def process_body(chunks, processor, endpoint):
+    """
+    Passes request body chunks through StreamEncryptor/StreamDecryptor, \n
+    every chunk is processed in a thread, so the event loop stays free
+    """
+
+    async for chunk in chunks:
+        count_bytes(endpoint, len(chunk))
+        output = await run_in_threadpool(processor.update, chunk)
+        if output:
+            yield bytes(output)
+    output = await run_in_threadpool(processor.finalize)
+    if output:
+        yield bytes(output)
+
+
+class BodyStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse for content made from the request body, \n
+    the base class listens for disconnect on the same receive  \n
+    channel and would take body messages away from request.stream()
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+class MetricsMiddleware:
+    """
+    Measures time of every request until the whole response is sent, \n
+    paths not served by the app are counted together as "other"
+    """
 
-app = FastAPI()
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not cipher.METRICS.enabled:
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            paths = {route.path for route in app.routes}
+            endpoint = scope["path"] if scope["path"] in paths else "other"
+            cipher.METRICS.observe(
+                "rijndael_request_seconds",
+                time.perf_counter() - start,
+                (("endpoint", endpoint),),
+            )
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+
+
+class CiphertextFormat(str, Enum):
+    # raw bytes cannot be placed in a JSON response, so only text formats are offered
+    decimal = "decimal"
+    hex = "hex"
+    base64 = "base64"
 
 
 @app.get("/encode")
-def encode(message: str, key: str):
-    if cipher.add_key(key) == True:
-        return {"Response": cipher.encode_message(message)}
-    else:
+async def encode(
+    message: str, key: str, format: CiphertextFormat = CiphertextFormat.decimal
+):
+    count_bytes("/encode", len(message))
+    key = cipher.parse_key(key)
+    if key is None:
         return {"KEY not accepted"}
+    try:
+        return {"Response": await encode_batcher.submit(message, key, format.value)}
+    except ValueError:
+        return {"Message not accepted"}
 
 
 @app.get("/decode")
-def decode(message: str, key: str):
-    if cipher.add_key(key) == True:
-        return {"Response": cipher.decode_message(message)}
-    else:
+async def decode(
+    message: str, key: str, format: CiphertextFormat = CiphertextFormat.decimal
+):
+    count_bytes("/decode", len(message))
+    key = cipher.parse_key(key)
+    if key is None:
+        return {"KEY not accepted"}
+    try:
+        return {"Response": await decode_batcher.submit(message, key, format.value)}
+    except ValueError:
+        return {"Message not accepted"}
+
+
+class Batch(BaseModel):
+    messages: list[str]
+    key: str
+    format: CiphertextFormat = CiphertextFormat.decimal
+
+
+async def process_batch(batch, endpoint, function):
+    """
+    Processes all messages of the batch with one key schedule
+    """
+
+    size = sum(map(len, batch.messages))
+    count_bytes(endpoint, size)
+    key = cipher.parse_key(batch.key)
+    if key is None:
         return {"KEY not accepted"}
+    try:
+        return {
+            "Response": await run_cipher(
+                size,
+                function,
+                batch.messages,
+                key,
+                ciphertext_format=batch.format.value,
+            )
+        }
+    except ValueError:
+        return {"Message not accepted"}
+
+
+@app.post("/encode/batch")
+async def encode_batch(batch: Batch):
+    return await process_batch(batch, "/encode/batch", cipher.encode_batch)
+
+
+@app.post("/decode/batch")
+async def decode_batch(batch: Batch):
+    return await process_batch(batch, "/decode/batch", cipher.decode_batch)
+
+
+class GcmMessage(BaseModel):
+    message: str
+    key: str
+    # random nonce is generated when omitted, it is returned with the tag
+    nonce: str | None = None
+    aad: str = ""
+    format: CiphertextFormat = CiphertextFormat.base64
+
+
+class GcmCiphertext(BaseModel):
+    message: str
+    key: str
+    nonce: str
+    tag: str
+    aad: str = ""
+    format: CiphertextFormat = CiphertextFormat.base64
+
+
+def gcm_encode(message, key, nonce, aad, ciphertext_format):
+    """
+    Encrypts UTF-8 text in GCM, returns ciphertext and tag in the format
+    """
+
+    ciphertext, tag = modes.gcm_encrypt(
+        cipher.get_context(key), message.encode(), nonce, aad.encode()
+    )
+    return (
+        cipher.format_ciphertext(ciphertext, ciphertext_format),
+        cipher.format_ciphertext(tag, ciphertext_format),
+    )
+
+
+def gcm_decode(message, key, nonce, tag, aad, ciphertext_format):
+    """
+    Checks the tag and decrypts ciphertext given in the format to UTF-8 text
+    """
+
+    return modes.gcm_decrypt(
+        cipher.get_context(key),
+        cipher.parse_ciphertext(message, 1, ciphertext_format),
+        cipher.parse_ciphertext(nonce, 1, ciphertext_format),
+        cipher.parse_ciphertext(tag, 1, ciphertext_format),
+        aad.encode(),
+    ).decode()
+
+
+@app.post("/encode/gcm")
+async def encode_gcm(message: GcmMessage):
+    count_bytes("/encode/gcm", len(message.message))
+    key = cipher.parse_key(message.key)
+    if key is None:
+        return {"KEY not accepted"}
+    try:
+        if message.nonce is None:
+            nonce = os.urandom(modes.GCM_NONCE_SIZE)
+        else:
+            nonce = cipher.parse_ciphertext(message.nonce, 1, message.format.value)
+        response, tag = await run_cipher(
+            len(message.message),
+            gcm_encode,
+            message.message,
+            key,
+            bytes(nonce),
+            message.aad,
+            message.format.value,
+        )
+    except ValueError:
+        return {"Message not accepted"}
+    return {
+        "Response": response,
+        "Nonce": cipher.format_ciphertext(nonce, message.format.value),
+        "Tag": tag,
+    }
+
+
+@app.post("/decode/gcm")
+async def decode_gcm(message: GcmCiphertext):
+    # a wrong tag means damaged message, aad, nonce or a wrong key
+    count_bytes("/decode/gcm", len(message.message))
+    key = cipher.parse_key(message.key)
+    if key is None:
+        return {"KEY not accepted"}
+    try:
+        return {
+            "Response": await run_cipher(
+                len(message.message),
+                gcm_decode,
+                message.message,
+                key,
+                message.nonce,
+                message.tag,
+                message.aad,
+                message.format.value,
+            )
+        }
+    except ValueError:
+        return {"Message not accepted"}
+
+
+@app.post("/encode/stream")
+async def encode_stream(request: Request, key: str):
+    key = cipher.parse_key(key)
+    if key is None:
+        return {"KEY not accepted"}
+    encryptor = cipher.StreamEncryptor(cipher.get_context(key))
+    return BodyStreamingResponse(
+        process_body(request.stream(), encryptor, "/encode/stream"),
+        media_type="application/octet-stream",
+    )
+
+
+@app.post("/decode/stream")
+async def decode_stream(request: Request, key: str):
+    # damaged data can be detected only at the end, then the response is cut off
+    key = cipher.parse_key(key)
+    if key is None:
+        return {"KEY not accepted"}
+    decryptor = cipher.StreamDecryptor(cipher.get_context(key))
+    return BodyStreamingResponse(
+        process_body(request.stream(), decryptor, "/decode/stream"),
+        media_type="application/octet-stream",
+    )
+
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(
+        cipher.METRICS.render(), media_type="text/plain; version=0.0.4"
+    )
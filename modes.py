@@ -0,0 +1,500 @@
+"""
+# ---------------------------------------------------------------
+# Program:    modes.py
+# Purpose:    Block cipher modes of operation
+#
+# Description:
+# Modes built on the Rijndael block encryption from cipher.py.
+# encode_message encrypts every block independently, so identical
+# blocks of text give identical ciphertext. Modes below chain
+# blocks (CBC) or turn the cipher into a stream cipher (CTR).
+# GCM adds an authentication tag to counter mode (GHASH).
+# Work for large data is split across worker processes (CTR in
+# both directions, CBC only when decrypting).
+# ---------------------------------------------------------------
+"""
+import hmac
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
+import cipher
+
+BLOCK_SIZE = 16
+NONCE_SIZE = 8
+PARALLEL_MIN = 64 * 1024
+GCM_NONCE_SIZE = 12
+TAG_SIZE = 16
+# GCM counter has 32 bits, the first value is used for the tag
+GCM_MAX_BLOCKS = 2**32 - 2
+# reduction polynomial of GF(2^128) in GCM bit order
+GHASH_R = 0xE1 << 120
+
+
+def split_segments(length, parts):
+    """
+    Splits data into at most parts segments of whole blocks, \n
+    only the last segment can end with an incomplete block
+
+    Args:
+        length - length of data of type int
+        parts - number of segments of type int
+
+    Returns:
+        segments - (start, end) offsets - list of tuples of type int
+    """
+
+    blocks = -(-length // BLOCK_SIZE)
+    per_part = -(-blocks // max(1, parts)) * BLOCK_SIZE
+    return [
+        (start, min(start + per_part, length))
+        for start in range(0, length, max(per_part, BLOCK_SIZE))
+    ]
+
+
+def xor_bytes(first, second):
+    """
+    Processes two byte strings of the same length using "bitwise \n
+    exclusive or", both are treated as one big number
+
+    Args:
+        first - bytes-like object
+        second - bytes-like object of the same length
+
+    Returns:
+        result - values after xor of type bytes
+    """
+
+    length = len(first)
+    return (int.from_bytes(first, "big") ^ int.from_bytes(second, "big")).to_bytes(
+        length, "big"
+    )
+
+
+def counter_blocks(nonce, start, count):
+    """
+    Creates counter blocks: 8-byte nonce followed by \n
+    8-byte block number (big endian), ex.            \n
+
+    nonce 0001020304050607, start 5                  \n
+    00 01 02 03 04 05 06 07 00 00 00 00 00 00 00 05  \n
+
+    Args:
+        nonce - 8 values of type bytes
+        start - number of the first block of type int
+        count - number of blocks of type int
+
+    Returns:
+        blocks - counter blocks - bytearray
+    """
+
+    blocks = bytearray(count * BLOCK_SIZE)
+    pack_into = struct.Struct(">8sQ").pack_into
+    for i in range(count):
+        pack_into(blocks, i * BLOCK_SIZE, nonce, start + i)
+    return blocks
+
+
+def ctr_segment(context, data, nonce, start):
+    """
+    Encrypts (or decrypts) one segment in counter mode: \n
+    counter blocks are encrypted to a keystream, which  \n
+    is xored with data
+
+    Args:
+        context - RijndaelContext prepared for the key
+        data - data of the segment - bytes-like object
+        nonce - 8 values of type bytes
+        start - number of the first block of the segment of type int
+
+    Returns:
+        output - processed data of type bytes
+    """
+
+    keystream = counter_blocks(nonce, start, -(-len(data) // BLOCK_SIZE))
+    context.encrypt_blocks(keystream, keystream)
+    return xor_bytes(data, memoryview(keystream)[: len(data)])
+
+
+def ctr_worker(key, engine, data, nonce, start):
+    """
+    ctr_segment running in a worker process
+
+    Args:
+        key - key as 16 values of type bytes, expanded once per process (cipher.KEY_CACHE)
+        engine - one of cipher.ENGINES keys of type string
+        data, nonce, start - as in ctr_segment
+
+    Returns:
+        output - processed data of type bytes
+    """
+
+    return ctr_segment(cipher.get_context(key, engine), data, nonce, start)
+
+
+def ctr_crypt(context, data, nonce, workers=1, executor=None):
+    """
+    Counter mode (CTR). Encryption and decryption are the same  \n
+    operation. Keystream of disjoint counter ranges is generated \n
+    in parallel by worker processes, data shorter than           \n
+    PARALLEL_MIN is processed in the calling process. No filling \n
+    is needed, output has the length of data.                    \n
+    Never use the same nonce twice with the same key.
+
+    Args:
+        context - RijndaelContext prepared for the key
+        data - data to process - bytes-like object
+        nonce - 8 values of type bytes
+        workers - number of worker processes of type int
+        executor - ProcessPoolExecutor to reuse, created for the call when omitted
+
+    Returns:
+        output - processed data of type bytes
+    """
+
+    nonce = bytes(nonce)
+    if len(nonce) != NONCE_SIZE:
+        raise ValueError("nonce must have {} bytes".format(NONCE_SIZE))
+    data = memoryview(data).cast("B")
+
+    if executor is None and (workers <= 1 or len(data) < PARALLEL_MIN):
+        return ctr_segment(context, data, nonce, 0)
+
+    if executor is None:
+        with ProcessPoolExecutor(workers) as executor:
+            return ctr_crypt(context, data, nonce, workers, executor)
+
+    segments = split_segments(len(data), workers)
+    results = executor.map(
+        ctr_worker,
+        [context.key] * len(segments),
+        [context.engine] * len(segments),
+        [bytes(data[start:end]) for start, end in segments],
+        [nonce] * len(segments),
+        [start // BLOCK_SIZE for start, end in segments],
+    )
+    return b"".join(results)
+
+
+def cbc_encrypt(context, data, iv):
+    """
+    Cipher block chaining mode (CBC) encryption, every block is \n
+    xored with the previous ciphertext block (iv for the first) \n
+    before encryption, so it is sequential. Data is filled with \n
+    PKCS#7 as by RijndaelContext.encrypt_bytes
+
+    Args:
+        context - RijndaelContext prepared for the key
+        data - data to encrypt - bytes-like object
+        iv - initialization vector, 16 values of type bytes
+
+    Returns:
+        output - encrypted data of type bytes
+    """
+
+    previous = bytes(iv)
+    if len(previous) != BLOCK_SIZE:
+        raise ValueError("iv must have {} bytes".format(BLOCK_SIZE))
+    data = memoryview(data).cast("B")
+
+    output = bytearray(cipher.padded_length(len(data), BLOCK_SIZE))
+    whole = len(data) - len(data) % BLOCK_SIZE
+    output[:whole] = data[:whole]
+    filling = len(output) - len(data)
+    output[whole:] = bytes(data[whole:]) + bytes([filling]) * filling
+
+    view = memoryview(output)
+    for offset in range(0, len(output), BLOCK_SIZE):
+        block = view[offset : offset + BLOCK_SIZE]
+        block[:] = xor_bytes(block, previous)
+        context.encrypt_blocks(block, block)
+        previous = block
+    return bytes(output)
+
+
+def cbc_decrypt_segment(context, data, previous):
+    """
+    Decrypts a segment of whole blocks in CBC mode, the segment \n
+    needs only its blocks and the ciphertext block before it
+
+    Args:
+        context - RijndaelContext prepared for the key
+        data - encrypted blocks - bytes-like object
+        previous - ciphertext block before the segment (or iv) of type bytes
+
+    Returns:
+        output - decrypted blocks still with filling of type bytes
+    """
+
+    decrypted = bytearray(len(data))
+    context.decrypt_blocks(data, decrypted)
+    chain = bytes(previous) + bytes(data[: len(data) - BLOCK_SIZE])
+    return xor_bytes(decrypted, chain)
+
+
+def cbc_worker(key, engine, data, previous):
+    """
+    cbc_decrypt_segment running in a worker process
+
+    Args:
+        key - key as 16 values of type bytes, expanded once per process (cipher.KEY_CACHE)
+        engine - one of cipher.ENGINES keys of type string
+        data, previous - as in cbc_decrypt_segment
+
+    Returns:
+        output - decrypted blocks still with filling of type bytes
+    """
+
+    return cbc_decrypt_segment(cipher.get_context(key, engine), data, previous)
+
+
+def cbc_decrypt(context, data, iv, workers=1, executor=None):
+    """
+    Cipher block chaining mode (CBC) decryption. Plaintext block i \n
+    depends only on ciphertext blocks i and i-1, so ciphertext is  \n
+    split into segments decrypted by worker processes at the same  \n
+    time. Data shorter than PARALLEL_MIN is decrypted in the       \n
+    calling process. PKCS#7 filling is checked and removed.
+
+    Args:
+        context - RijndaelContext prepared for the key
+        data - encrypted data, length divisible by 16 - bytes-like object
+        iv - initialization vector, 16 values of type bytes
+        workers - number of worker processes of type int
+        executor - ProcessPoolExecutor to reuse, created for the call when omitted
+
+    Returns:
+        output - decrypted data of type bytes
+    """
+
+    iv = bytes(iv)
+    if len(iv) != BLOCK_SIZE:
+        raise ValueError("iv must have {} bytes".format(BLOCK_SIZE))
+    data = memoryview(data).cast("B")
+    if not data or len(data) % BLOCK_SIZE:
+        raise ValueError("data length must be a positive multiple of 16")
+
+    if executor is None and (workers <= 1 or len(data) < PARALLEL_MIN):
+        output = cbc_decrypt_segment(context, data, iv)
+    elif executor is None:
+        with ProcessPoolExecutor(workers) as executor:
+            return cbc_decrypt(context, data, iv, workers, executor)
+    else:
+        segments = split_segments(len(data), workers)
+        results = executor.map(
+            cbc_worker,
+            [context.key] * len(segments),
+            [context.engine] * len(segments),
+            [bytes(data[start:end]) for start, end in segments],
+            [
+                bytes(data[start - BLOCK_SIZE : start]) if start else iv
+                for start, end in segments
+            ],
+        )
+        output = b"".join(results)
+    return output[: cipher.unfilled_length(output, BLOCK_SIZE)]
+
+
+def gf128_mul_x(value):
+    """
+    Multiplies element of GF(2^128) by x, in GCM bit order \n
+    the first bit is the coefficient of x^0, so it is a    \n
+    shift right, reduced by GHASH_R
+
+    Args:
+        value - element as 128-bit number of type int
+
+    Returns:
+        value - element multiplied by x of type int
+    """
+
+    return (value >> 1) ^ (GHASH_R if value & 1 else 0)
+
+
+def generate_ghash_tables(subkey):
+    """
+    Precomputes multiplication by the hash subkey H, 8-bit tables: \n
+    table i holds every byte value placed at byte i of a block     \n
+    multiplied by H, so X * H is the xor of 16 lookups, one per    \n
+    byte of X
+
+    Args:
+        subkey - hash subkey H, 16 values of type bytes
+
+    Returns:
+        tables - 16 tables of 256 elements - tuple of tuples of type int
+    """
+
+    powers = []
+    value = int.from_bytes(subkey, "big")
+    for _ in range(128):
+        powers.append(value)
+        value = gf128_mul_x(value)
+
+    tables = []
+    for position in range(BLOCK_SIZE):
+        table = [0] * 256
+        for bit in range(8):
+            table[0x80 >> bit] = powers[position * 8 + bit]
+        for byte in range(1, 256):
+            lowest = byte & -byte
+            if byte != lowest:
+                table[byte] = table[lowest] ^ table[byte ^ lowest]
+        tables.append(tuple(table))
+    return tuple(tables)
+
+
+def ghash_tables(context):
+    """
+    Returns GHASH tables of the key, created on first use and kept \n
+    in the context next to the round keys, so contexts cached by   \n
+    cipher.get_context keep them as well
+
+    Args:
+        context - RijndaelContext prepared for the key
+
+    Returns:
+        tables - tables made by generate_ghash_tables for H = E(K, 0^128)
+    """
+
+    if context.ghash_tables is None:
+        subkey = bytearray(BLOCK_SIZE)
+        context.encrypt_blocks(subkey, subkey)
+        context.ghash_tables = generate_ghash_tables(subkey)
+    return context.ghash_tables
+
+
+def ghash(tables, aad, data):
+    """
+    GHASH of additional data and ciphertext: both are filled with \n
+    zeros to whole blocks and followed by a block with their      \n
+    lengths in bits, every block is xored into the result which   \n
+    is then multiplied by H
+
+    Args:
+        tables - tables made by generate_ghash_tables
+        aad - additional authenticated data - bytes-like object
+        data - ciphertext - bytes-like object
+
+    Returns:
+        result - 16 values of type bytes
+    """
+
+    result = 0
+    from_bytes = int.from_bytes
+    for part in (aad, data):
+        part = bytes(part)
+        part += bytes(-len(part) % BLOCK_SIZE)
+        for offset in range(0, len(part), BLOCK_SIZE):
+            block = (
+                result ^ from_bytes(part[offset : offset + BLOCK_SIZE], "big")
+            ).to_bytes(BLOCK_SIZE, "big")
+            result = 0
+            for table, byte in zip(tables, block):
+                result ^= table[byte]
+
+    block = struct.pack(">QQ", len(aad) * 8, len(data) * 8)
+    block = (result ^ from_bytes(block, "big")).to_bytes(BLOCK_SIZE, "big")
+    result = 0
+    for table, byte in zip(tables, block):
+        result ^= table[byte]
+    return result.to_bytes(BLOCK_SIZE, "big")
+
+
+def gcm_counter_blocks(nonce, start, count):
+    """
+    Creates GCM counter blocks: 12-byte nonce followed by \n
+    4-byte block number (big endian), number 1 is used   \n
+    for the tag and data starts from 2
+
+    Args:
+        nonce - 12 values of type bytes
+        start - number of the first block of type int
+        count - number of blocks of type int
+
+    Returns:
+        blocks - counter blocks - bytearray
+    """
+
+    blocks = bytearray(count * BLOCK_SIZE)
+    pack_into = struct.Struct(">12sI").pack_into
+    for i in range(count):
+        pack_into(blocks, i * BLOCK_SIZE, nonce, start + i)
+    return blocks
+
+
+def gcm_keystream(context, nonce, length):
+    """
+    Counter part of GCM, encrypts the tag block together with \n
+    the keystream of data
+
+    Args:
+        context - RijndaelContext prepared for the key
+        nonce - 12 values of type bytes
+        length - length of data of type int
+
+    Returns:
+        mask - encrypted first counter block, xored with the tag - bytes
+        keystream - length values - memoryview of bytearray
+    """
+
+    nonce = bytes(nonce)
+    if len(nonce) != GCM_NONCE_SIZE:
+        raise ValueError("nonce must have {} bytes".format(GCM_NONCE_SIZE))
+    count = -(-length // BLOCK_SIZE)
+    if count > GCM_MAX_BLOCKS:
+        raise ValueError("data is too long for GCM")
+
+    keystream = gcm_counter_blocks(nonce, 1, count + 1)
+    context.encrypt_blocks(keystream, keystream)
+    mask = bytes(keystream[:BLOCK_SIZE])
+    return mask, memoryview(keystream)[BLOCK_SIZE : BLOCK_SIZE + length]
+
+
+def gcm_encrypt(context, data, nonce, aad=b""):
+    """
+    Galois/Counter mode (GCM) encryption: data is encrypted in  \n
+    counter mode and the tag authenticates both ciphertext and  \n
+    additional data (aad), which is not encrypted. No filling   \n
+    is needed. Never use the same nonce twice with the same key.
+
+    Args:
+        context - RijndaelContext prepared for the key
+        data - data to encrypt - bytes-like object
+        nonce - 12 values of type bytes
+        aad - additional authenticated data - bytes-like object
+
+    Returns:
+        output - encrypted data of type bytes
+        tag - 16 values of type bytes
+    """
+
+    data = memoryview(data).cast("B")
+    mask, keystream = gcm_keystream(context, nonce, len(data))
+    output = xor_bytes(data, keystream)
+    tag = xor_bytes(ghash(ghash_tables(context), aad, output), mask)
+    return output, tag
+
+
+def gcm_decrypt(context, data, nonce, tag, aad=b""):
+    """
+    Galois/Counter mode (GCM) decryption, ValueError is raised \n
+    when the tag does not match data, aad, nonce or key, then  \n
+    nothing is decrypted
+
+    Args:
+        context - RijndaelContext prepared for the key
+        data - encrypted data - bytes-like object
+        nonce - 12 values of type bytes
+        tag - tag given by gcm_encrypt, 16 values of type bytes
+        aad - additional authenticated data given to gcm_encrypt - bytes-like object
+
+    Returns:
+        output - decrypted data of type bytes
+    """
+
+    data = memoryview(data).cast("B")
+    mask, keystream = gcm_keystream(context, nonce, len(data))
+    expected = xor_bytes(ghash(ghash_tables(context), aad, data), mask)
+    if not hmac.compare_digest(expected, bytes(tag)):
+        raise ValueError("tag does not match")
+    return xor_bytes(data, keystream)
@@ -1,5 +1,13 @@
+import asyncio
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
 from fastapi.testclient import TestClient
+
+import cipher
+import main
+import modes
 from main import app
 
 
@@ -8,6 +16,12 @@ class TestCipherAPI(unittest.TestCase):
     def setUpClass(cls):
         cls.client = TestClient(app)
 
+    @classmethod
+    def tearDownClass(cls):
+        if main.executor is not None:
+            main.executor.shutdown()
+            main.executor = None
+
     def test_encode_with_valid_key(self):
         key = "0123456789abcdef"
         response = self.client.get(f"/encode?message=Hello&key={key}")
@@ -36,6 +50,256 @@ class TestCipherAPI(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json(), ["KEY not accepted"])
 
+    def test_round_trip(self):
+        key = "0123456789abcdef"
+        encoded = self.client.get("/encode", params={"message": "python", "key": key})
+        decoded = self.client.get(
+            "/decode", params={"message": encoded.json()["Response"], "key": key}
+        )
+        self.assertEqual(decoded.json(), {"Response": "python"})
+
+    def test_concurrent_requests_with_different_keys(self):
+        # Keys are kept in memory, so parallel requests cannot overwrite each other
+        def round_trip(number):
+            key = "{:016d}".format(number)
+            text = "request {}".format(number)
+            encoded = self.client.get("/encode", params={"message": text, "key": key})
+            decoded = self.client.get(
+                "/decode", params={"message": encoded.json()["Response"], "key": key}
+            )
+            return decoded.json() == {"Response": text}
+
+        with ThreadPoolExecutor(max_workers=32) as executor:
+            results = list(executor.map(round_trip, range(300)))
+        self.assertTrue(all(results))
+
+    def test_formats(self):
+        key = "0123456789abcdef"
+        for format in ("decimal", "hex", "base64"):
+            encoded = self.client.get(
+                "/encode", params={"message": "python", "key": key, "format": format}
+            )
+            decoded = self.client.get(
+                "/decode",
+                params={
+                    "message": encoded.json()["Response"],
+                    "key": key,
+                    "format": format,
+                },
+            )
+            self.assertEqual(decoded.json(), {"Response": "python"}, format)
+
+    def test_hex_shorter_than_decimal(self):
+        key = "0123456789abcdef"
+        params = {"message": "python language", "key": key}
+        decimal = self.client.get("/encode", params=params).json()["Response"]
+        params["format"] = "hex"
+        hexadecimal = self.client.get("/encode", params=params).json()["Response"]
+        self.assertLess(len(hexadecimal), len(decimal))
+
+    def test_unknown_format(self):
+        key = "0123456789abcdef"
+        response = self.client.get(
+            "/encode", params={"message": "python", "key": key, "format": "octal"}
+        )
+        self.assertEqual(response.status_code, 422)
+
+    def test_malformed_message(self):
+        key = "0123456789abcdef"
+        response = self.client.get(
+            "/decode", params={"message": "zz", "key": key, "format": "hex"}
+        )
+        self.assertEqual(response.json(), ["Message not accepted"])
+
+    def test_message_outside_latin1(self):
+        key = "0123456789abcdef"
+        response = self.client.get("/encode", params={"message": "\u0100", "key": key})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), ["Message not accepted"])
+
+    def test_large_messages_in_process_pool(self):
+        key = "0123456789abcdef"
+        with mock.patch.object(main, "OFFLOAD_SIZE", 0):
+            encoded = self.client.get(
+                "/encode", params={"message": "python", "key": key}
+            )
+            decoded = self.client.get(
+                "/decode", params={"message": encoded.json()["Response"], "key": key}
+            )
+            malformed = self.client.get(
+                "/decode", params={"message": "zz", "key": key, "format": "hex"}
+            )
+        self.assertIsNotNone(main.executor)
+        self.assertEqual(decoded.json(), {"Response": "python"})
+        self.assertEqual(malformed.json(), ["Message not accepted"])
+
+        inline = self.client.get("/encode", params={"message": "python", "key": key})
+        self.assertEqual(inline.json(), encoded.json())
+
+    def test_stream_round_trip(self):
+        key = "0123456789abcdef"
+        data = bytes(i % 251 for i in range(200000)) + b"\x03"
+
+        def chunks(data, size=7000):
+            for start in range(0, len(data), size):
+                yield data[start : start + size]
+
+        encoded = self.client.post(
+            "/encode/stream", params={"key": key}, content=chunks(data)
+        )
+        self.assertEqual(encoded.status_code, 200)
+        self.assertEqual(encoded.headers["content-type"], "application/octet-stream")
+        context = cipher.RijndaelContext(cipher.parse_key(key))
+        self.assertEqual(encoded.content, context.encrypt_bytes(data))
+
+        decoded = self.client.post(
+            "/decode/stream", params={"key": key}, content=chunks(encoded.content)
+        )
+        self.assertEqual(decoded.content, data)
+
+    def test_stream_invalid_key(self):
+        response = self.client.post(
+            "/encode/stream", params={"key": "short"}, content=b"data"
+        )
+        self.assertEqual(response.json(), ["KEY not accepted"])
+
+    def test_metrics(self):
+        self.client.get(
+            "/encode", params={"message": "python", "key": "0123456789abcdef"}
+        )
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain"))
+        self.assertIn(
+            'rijndael_request_seconds_count{endpoint="/encode"}', response.text
+        )
+        self.assertIn('rijndael_request_bytes_total{endpoint="/encode"}', response.text)
+        self.assertIn("rijndael_blocks_encrypted_total", response.text)
+
+    def test_batch_round_trip(self):
+        key = "0123456789abcdef"
+        messages = ["python", "", "x" * 33, "ab\x03"]
+        encoded = self.client.post(
+            "/encode/batch", json={"messages": messages, "key": key, "format": "hex"}
+        ).json()["Response"]
+        self.assertEqual(
+            encoded,
+            [
+                cipher.encode_message(message, cipher.parse_key(key), None, "hex")
+                for message in messages
+            ],
+        )
+        decoded = self.client.post(
+            "/decode/batch", json={"messages": encoded, "key": key, "format": "hex"}
+        ).json()["Response"]
+        self.assertEqual(decoded, ["python", "", "x" * 33, "ab"])
+
+    def test_batch_errors(self):
+        response = self.client.post(
+            "/encode/batch", json={"messages": ["python"], "key": "short"}
+        )
+        self.assertEqual(response.json(), ["KEY not accepted"])
+        response = self.client.post(
+            "/decode/batch", json={"messages": ["1 2 x"], "key": "0123456789abcdef"}
+        )
+        self.assertEqual(response.json(), ["Message not accepted"])
+
+    def test_gcm_round_trip(self):
+        key = "0123456789abcdef"
+        encoded = self.client.post(
+            "/encode/gcm", json={"message": "python", "key": key, "aad": "header"}
+        ).json()
+        self.assertEqual(set(encoded), {"Response", "Nonce", "Tag"})
+        request = {
+            "message": encoded["Response"],
+            "key": key,
+            "nonce": encoded["Nonce"],
+            "tag": encoded["Tag"],
+            "aad": "header",
+        }
+        decoded = self.client.post("/decode/gcm", json=request)
+        self.assertEqual(decoded.json(), {"Response": "python"})
+        decoded = self.client.post("/decode/gcm", json=dict(request, aad="other"))
+        self.assertEqual(decoded.json(), ["Message not accepted"])
+
+    def test_gcm_given_nonce(self):
+        key = "0123456789abcdef"
+        nonce = bytes(range(12))
+        encoded = self.client.post(
+            "/encode/gcm",
+            json={
+                "message": "python",
+                "key": key,
+                "nonce": nonce.hex(),
+                "format": "hex",
+            },
+        ).json()
+        ciphertext, tag = modes.gcm_encrypt(
+            cipher.get_context(cipher.parse_key(key)), b"python", nonce
+        )
+        self.assertEqual(
+            encoded,
+            {"Response": ciphertext.hex(), "Nonce": nonce.hex(), "Tag": tag.hex()},
+        )
+        response = self.client.post(
+            "/encode/gcm", json={"message": "python", "key": key, "nonce": "00"}
+        )
+        self.assertEqual(response.json(), ["Message not accepted"])
+
+
+class TestMicroBatcher(unittest.TestCase):
+    def setUp(self):
+        self.key = cipher.parse_key("0123456789abcdef")
+        self.other_key = cipher.parse_key("fedcba9876543210")
+
+    def submit_all(self, batcher, requests):
+        async def submit_all():
+            return await asyncio.gather(
+                *(batcher.submit(*request) for request in requests),
+                return_exceptions=True,
+            )
+
+        return asyncio.run(asyncio.wait_for(submit_all(), 5))
+
+    def test_requests_grouped_by_key(self):
+        function = mock.Mock(wraps=cipher.encode_batch)
+        batcher = main.MicroBatcher(function, window=0.05, max_size=100)
+        requests = [("message {}".format(i), self.key, "hex") for i in range(20)]
+        requests += [("other {}".format(i), self.other_key, "hex") for i in range(5)]
+        results = self.submit_all(batcher, requests)
+        self.assertEqual(function.call_count, 2)
+        self.assertEqual(
+            results,
+            [
+                cipher.encode_message(message, key, None, "hex")
+                for message, key, ciphertext_format in requests
+            ],
+        )
+        self.assertEqual(batcher.pending, {})
+
+    def test_max_size_sends_early(self):
+        function = mock.Mock(wraps=cipher.encode_batch)
+        batcher = main.MicroBatcher(function, window=60, max_size=3)
+        requests = [("message {}".format(i), self.key, "decimal") for i in range(6)]
+        self.submit_all(batcher, requests)
+        self.assertEqual(function.call_count, 2)
+
+    def test_wrong_message_does_not_fail_others(self):
+        batcher = main.MicroBatcher(cipher.decode_batch, window=0.01, max_size=100)
+        encoded = cipher.encode_message("python", self.key, None, "hex")
+        results = self.submit_all(
+            batcher, [(encoded, self.key, "hex"), ("zz", self.key, "hex")]
+        )
+        self.assertEqual(results[0], "python")
+        self.assertIsInstance(results[1], ValueError)
+
+    def test_batching_off(self):
+        function = mock.Mock(wraps=cipher.encode_batch)
+        batcher = main.MicroBatcher(function, window=0)
+        requests = [("message {}".format(i), self.key, "decimal") for i in range(3)]
+        self.submit_all(batcher, requests)
+        self.assertEqual(function.call_count, 3)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+
+import benchmark
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+    def test_parse_size(self):
+        self.assertEqual(benchmark.parse_size("16"), 16)
+        self.assertEqual(benchmark.parse_size("64k"), 64 * 1024)
+        self.assertEqual(benchmark.parse_size("100M"), 100 * benchmark.MEGABYTE)
+
+    def test_compare_flags_only_slower_results(self):
+        baseline = {
+            "GF": {"ops_per_s": 1000.0, "mb_per_s": 0.1},
+            "sub_bytes": {"ops_per_s": 1000.0, "mb_per_s": 0.1},
+            "mix_columns": {"ops_per_s": 1000.0, "mb_per_s": 0.1},
+        }
+        results = {
+            "GF": {"ops_per_s": 950.0, "mb_per_s": 0.1},
+            "sub_bytes": {"ops_per_s": 500.0, "mb_per_s": 0.05},
+            "mix_columns": {"ops_per_s": 2000.0, "mb_per_s": 0.2},
+            "key_schedule": {"ops_per_s": 1.0, "mb_per_s": 0.1},
+        }
+        self.assertEqual(
+            benchmark.compare(results, baseline, 0.1), [("sub_bytes", 1000.0, 500.0)]
+        )
+
+    def test_run_suite_reports_every_stage(self):
+        report = benchmark.run_suite([16, 100], 0.001)
+        results = report["results"]
+        for name in (
+            "GF",
+            "sub_bytes",
+            "rotate_rows",
+            "mix_columns",
+            "inv_mix_columns",
+            "key_schedule",
+            "create_blocks",
+            "encode_message/16",
+            "decode_message/100",
+        ):
+            self.assertGreater(results[name]["ops_per_s"], 0)
+            self.assertGreater(results[name]["mb_per_s"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import bulk
+import cipher
+
+
+class TestBulk(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.key = cipher.parse_key("0123456789abcdef")
+        self.src = os.path.join(self.directory, "src")
+        self.files = {
+            "empty": b"",
+            "small": b"python",
+            os.path.join("a", "medium"): bytes(i % 251 for i in range(5000)),
+            os.path.join("a", "b", "large"): bytes(i % 241 for i in range(20000)),
+        }
+        for name, data in self.files.items():
+            path = os.path.join(self.src, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as file:
+                file.write(data)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read_tree(self, directory):
+        tree = {}
+        for name in self.files:
+            with open(os.path.join(directory, name), "rb") as file:
+                tree[name] = file.read()
+        return tree
+
+    def test_largest_first(self):
+        files = bulk.collect_files(self.src, os.path.join(self.directory, "dst"))
+        sizes = [size for src_path, dst_path, size in files]
+        self.assertEqual(sizes, [20000, 5000, 6, 0])
+        self.assertEqual(
+            files[0][1],
+            os.path.join(self.directory, "dst", "a", "b", "large"),
+        )
+
+    def test_output_inside_input_is_not_walked(self):
+        dst = os.path.join(self.src, "encrypted")
+        bulk.process_tree("encrypt", self.src, dst, self.key)
+        files = bulk.collect_files(self.src, dst)
+        self.assertEqual(len(files), len(self.files))
+
+    def test_round_trip(self):
+        for workers in (1, 2):
+            encrypted = os.path.join(self.directory, "enc{}".format(workers))
+            decrypted = os.path.join(self.directory, "dec{}".format(workers))
+            report = bulk.process_tree(
+                "encrypt", self.src, encrypted, self.key, workers, chunk_size=1000
+            )
+            self.assertEqual(report["files"], len(self.files))
+            self.assertEqual(report["bytes"], sum(map(len, self.files.values())))
+            context = cipher.get_context(self.key)
+            for name, data in self.read_tree(encrypted).items():
+                self.assertEqual(data, context.encrypt_bytes(self.files[name]))
+            bulk.process_tree("decrypt", encrypted, decrypted, self.key, workers)
+            self.assertEqual(self.read_tree(decrypted), self.files)
+
+    def test_resume(self):
+        dst = os.path.join(self.directory, "dst")
+        bulk.process_tree("encrypt", self.src, dst, self.key)
+        report = bulk.process_tree("encrypt", self.src, dst, self.key)
+        self.assertEqual((report["files"], report["skipped"]), (0, len(self.files)))
+
+        # a changed input is processed again
+        changed = os.path.join(self.src, "small")
+        os.utime(changed, (0, os.path.getmtime(changed) + 10))
+        report = bulk.process_tree("encrypt", self.src, dst, self.key)
+        self.assertEqual((report["files"], report["skipped"]), (1, len(self.files) - 1))
+
+        report = bulk.process_tree("encrypt", self.src, dst, self.key, force=True)
+        self.assertEqual(report["files"], len(self.files))
+
+    def test_failed_file_leaves_no_output(self):
+        encrypted = os.path.join(self.directory, "enc")
+        decrypted = os.path.join(self.directory, "dec")
+        bulk.process_tree("encrypt", self.src, encrypted, self.key)
+        with open(os.path.join(encrypted, "small"), "ab") as file:
+            file.write(b"damaged")
+
+        report = bulk.process_tree("decrypt", encrypted, decrypted, self.key)
+        self.assertEqual(report["files"], len(self.files) - 1)
+        self.assertEqual(list(report["failed"]), [os.path.join(encrypted, "small")])
+        self.assertFalse(os.path.exists(os.path.join(decrypted, "small")))
+        self.assertEqual(sorted(os.listdir(decrypted)), ["a", "empty"])
+
+    def test_command_line(self):
+        dst = os.path.join(self.directory, "dst")
+        self.assertEqual(
+            bulk.main(["encrypt", self.src, dst, "--key", "0123456789abcdef"]), 0
+        )
+        with self.assertRaises(SystemExit):
+            bulk.main(["encrypt", self.src, self.src, "--key", "0123456789abcdef"])
+        with self.assertRaises(SystemExit):
+            bulk.main(["encrypt", self.src, dst, "--key", "short"])
+
+
+if __name__ == "__main__":
+    unittest.main()
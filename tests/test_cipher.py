@@ -1,4 +1,13 @@
+import base64
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 import cipher  # Podmień to na właściwą nazwę modułu zawierającego implementację Cipher
 
 
@@ -86,5 +95,777 @@ class TestCipherFunctions(unittest.TestCase):
         self.assertNotEqual(decoded_message, text)
 
 
+class TestTableEngine(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.size = 16
+        cls.schema = (0, 1, 2, 3)
+        cls.sbox = cipher.read_sbox(cls.size)
+        cls.inv_sbox = cipher.read_inv_sbox(cls.size)
+        cls.rcon = cipher.read_rcon(cls.size)
+        cls.key = [ord(char) for char in "0123456789abcdef"]
+        cls.t_tables = cipher.generate_t_tables(cls.sbox)
+        cls.inv_t_tables = cipher.generate_inv_t_tables(cls.inv_sbox)
+
+    def round_keys(self):
+        return cipher.key_schedule(list(self.key), self.rcon, self.sbox)
+
+    def test_matches_encoder(self):
+        # Table-driven encryption must give byte-identical output
+        text = "".join(chr(i) for i in range(256) if i != 3) * 2
+        for length in (1, 15, 16, 17, 100, len(text)):
+            expected = cipher.encoder(
+                text[:length], self.size, self.schema, self.sbox, self.round_keys()
+            )
+            result = cipher.table_encoder(
+                text[:length], self.size, self.schema, self.t_tables, self.round_keys()
+            )
+            self.assertEqual(result, expected)
+
+    def test_matches_decoder(self):
+        text = "table driven rijndael"
+        encoded = cipher.encoder(
+            text, self.size, self.schema, self.sbox, self.round_keys()
+        )
+        expected = cipher.decoder(
+            encoded, self.size, self.schema, self.inv_sbox, self.round_keys()
+        )
+        result = cipher.table_decoder(
+            encoded, self.size, self.schema, self.inv_t_tables, self.round_keys()
+        )
+        self.assertEqual(result, expected)
+        self.assertEqual(result, text)
+
+    def test_other_rotate_schema(self):
+        schema = (3, 0, 2, 1)
+        text = "python language"
+        expected = cipher.encoder(text, self.size, schema, self.sbox, self.round_keys())
+        result = cipher.table_encoder(
+            text, self.size, schema, self.t_tables, self.round_keys()
+        )
+        self.assertEqual(result, expected)
+        decoded = cipher.table_decoder(
+            result, self.size, schema, self.inv_t_tables, self.round_keys()
+        )
+        self.assertEqual(decoded, text)
+
+    def test_t_tables_merge_mix_columns(self):
+        # One column of table words equals Sub Bytes followed by Mix Columns
+        block = [0x10, 0x20, 0x30, 0x40]
+        word = 0
+        for position, value in enumerate(block):
+            word ^= self.t_tables[position][value]
+        mixed = cipher.mix_columns([self.sbox[value] for value in block] * 4)[:4]
+        self.assertEqual(word.to_bytes(4, "big"), bytes(mixed))
+
+    def test_inv_t_tables_merge_inv_mix_columns(self):
+        # Equivalent inverse cipher: Inverted Sub Bytes followed by Inverted Mix Columns
+        block = [0x10, 0x20, 0x30, 0x40]
+        word = 0
+        for position, value in enumerate(block):
+            word ^= self.inv_t_tables[position][value]
+        mixed = cipher.inv_mix_columns([self.inv_sbox[value] for value in block] * 4)
+        self.assertEqual(word.to_bytes(4, "big"), bytes(mixed[:4]))
+
+    def test_inverse_key_words(self):
+        round_keys = self.round_keys()
+        words = cipher.inverse_key_words(round_keys)
+        self.assertEqual(words[0], cipher.round_key_words(round_keys)[0])
+        self.assertEqual(words[-1], cipher.round_key_words(round_keys)[-1])
+        for round_key, word in zip(round_keys[1:-1], words[1:-1]):
+            mixed = cipher.inv_mix_columns(round_key)
+            self.assertEqual(word, cipher.round_key_words([mixed])[0])
+
+
+class TestRijndaelContext(unittest.TestCase):
+    def setUp(self):
+        self.key = "0123456789abcdef"
+        self.context = cipher.RijndaelContext([ord(char) for char in self.key])
+
+    def test_matches_encode_message(self):
+        text = "Hello, World!"
+        cipher.add_key(self.key)
+        self.assertEqual(self.context.encrypt(text), cipher.encode_message(text))
+
+    def test_reused_for_many_messages(self):
+        for text in ("python", "python language", "x" * 100):
+            self.assertEqual(self.context.decrypt(self.context.encrypt(text)), text)
+
+    def test_no_file_access(self):
+        # Encryption and decryption must run without reading any file
+        with mock.patch("builtins.open", side_effect=AssertionError("file read")):
+            encoded_message = self.context.encrypt("python")
+            self.assertEqual(self.context.decrypt(encoded_message), "python")
+
+    def test_round_keys_immutable(self):
+        self.assertEqual(len(self.context.round_keys), 11)
+        self.assertIsInstance(self.context.round_keys[0], bytes)
+
+
+class TestInMemoryKey(unittest.TestCase):
+    def test_parse_key(self):
+        self.assertEqual(
+            cipher.parse_key("0123456789abcdef"), list(b"0123456789abcdef")
+        )
+        self.assertIsNone(cipher.parse_key("0123456789abcde"))
+        self.assertIsNone(cipher.parse_key("0123456789abcde\u0100"))
+
+    def test_key_file_not_used(self):
+        key = cipher.parse_key("0123456789abcdef")
+        # Tables are read once per process, only the key must not touch files
+        cipher.load_tables(16)
+        with mock.patch("builtins.open", side_effect=AssertionError("file access")):
+            encoded_message = cipher.encode_message("python", key)
+            self.assertEqual(cipher.decode_message(encoded_message, key), "python")
+
+    def test_matches_key_file(self):
+        cipher.add_key("0123456789abcdef")
+        expected = cipher.encode_message("python")
+        key = cipher.parse_key("0123456789abcdef")
+        self.assertEqual(cipher.encode_message("python", key), expected)
+
+    def test_concurrent_keys(self):
+        # Every thread uses its own key, results must never be mixed up
+        def round_trip(number):
+            key = [(number * 7 + i) % 256 for i in range(16)]
+            text = "message number {}".format(number)
+            encoded_message = cipher.encode_message(text, key)
+            return cipher.decode_message(encoded_message, key) == text
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            results = list(executor.map(round_trip, range(300)))
+        self.assertTrue(all(results))
+
+
+class TestEngines(unittest.TestCase):
+    def setUp(self):
+        self.key = cipher.parse_key("0123456789abcdef")
+        self.text = "".join(chr(i) for i in range(256) if i != 3) * 3
+
+    def tearDown(self):
+        cipher.set_default_engine("tables")
+
+    def test_engines_identical(self):
+        expected = cipher.encode_message(self.text, self.key, engine="reference")
+        for engine in cipher.ENGINES:
+            encoded_message = cipher.encode_message(self.text, self.key, engine=engine)
+            self.assertEqual(encoded_message, expected, engine)
+            decoded_message = cipher.decode_message(expected, self.key, engine=engine)
+            self.assertEqual(decoded_message, self.text, engine)
+
+    def test_set_default_engine(self):
+        cipher.set_default_engine("reference")
+        self.assertEqual(cipher.RijndaelContext(self.key).engine, "reference")
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            cipher.set_default_engine("gpu")
+        with self.assertRaises(ValueError):
+            cipher.RijndaelContext(self.key, engine="gpu")
+
+    def test_register_engine(self):
+        def broken_encrypt(context, src, dst):
+            dst[:] = bytes(len(src))
+            return dst
+
+        self.addCleanup(cipher.ENGINES.pop, "broken")
+        cipher.register_engine("broken", broken_encrypt, cipher.ENGINES["tables"][1])
+        self.assertEqual(
+            cipher.RijndaelContext(self.key, engine="broken").engine, "broken"
+        )
+        self.assertFalse(cipher.self_test("broken"))
+        for name in cipher.ENGINES:
+            if name != "broken":
+                self.assertTrue(cipher.self_test(name), name)
+        with self.assertRaises(TypeError):
+            cipher.register_engine("none", None, None)
+        with self.assertRaises(ValueError):
+            cipher.register_engine("auto", broken_encrypt, broken_encrypt)
+
+    def test_select_engine_skips_failed_self_test(self):
+        self.addCleanup(cipher.ENGINES.pop, "broken")
+        cipher.register_engine(
+            "broken", lambda context, src, dst: dst, lambda context, src, dst: dst
+        )
+        with self.assertLogs("cipher", "INFO") as logs:
+            name = cipher.select_engine(1024, ["broken", "tables", "pipeline"])
+        self.assertEqual(name, "tables")
+        self.assertIn("broken failed self-test", logs.output[0])
+        self.assertIn("Selected engine tables", logs.output[1])
+        with self.assertRaises(ValueError):
+            cipher.select_engine(1024, ["broken"])
+
+    def test_engine_from_environment(self):
+        output = subprocess.run(
+            [sys.executable, "-c", "import cipher; print(cipher.get_engine())"],
+            env=dict(os.environ, RIJNDAEL_ENGINE="pipeline"),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        self.assertEqual(output.stdout.strip(), "pipeline")
+
+    def test_auto_engine(self):
+        cipher.auto_engine.cache_clear()
+        self.addCleanup(cipher.auto_engine.cache_clear)
+        with mock.patch.object(cipher, "DEFAULT_ENGINE", "auto"), mock.patch.object(
+            cipher, "select_engine", return_value="pipeline"
+        ) as select_engine:
+            self.assertEqual(cipher.RijndaelContext(self.key).engine, "pipeline")
+            self.assertEqual(cipher.get_engine(), "pipeline")
+        select_engine.assert_called_once()
+
+    @unittest.skipUnless(cipher.numpy, "numpy is not installed")
+    def test_numpy_many_chunks(self):
+        with mock.patch.object(cipher, "NUMPY_CHUNK", 64):
+            reference = cipher.RijndaelContext(self.key, engine="tables")
+            context = cipher.RijndaelContext(self.key, engine="numpy")
+            encoded_message = context.encrypt(self.text)
+            self.assertEqual(encoded_message, reference.encrypt(self.text))
+            self.assertEqual(context.decrypt(encoded_message), self.text)
+
+    def test_bitslice_many_chunks(self):
+        with mock.patch.object(cipher, "BITSLICE_CHUNK", 64):
+            context = cipher.RijndaelContext(
+                self.key, rotate_rows_schema=(1, 0, 3, 2), engine="bitslice"
+            )
+            reference = cipher.RijndaelContext(
+                self.key, rotate_rows_schema=(1, 0, 3, 2), engine="tables"
+            )
+            encoded_message = context.encrypt(self.text)
+            self.assertEqual(encoded_message, reference.encrypt(self.text))
+            self.assertEqual(context.decrypt(encoded_message), self.text)
+
+    def test_bitslice_circuit(self):
+        # every byte value goes through the circuit once
+        sbox, inv_sbox, rcon = cipher.load_tables(16)
+        data = bytes(range(256))
+        planes = cipher.bitslice_pack(data)
+        self.assertEqual(cipher.bitslice_unpack(planes, 256), data)
+        ones = (1 << 256) - 1
+        for table in (sbox, inv_sbox):
+            planes = cipher.bitslice_sub_bytes(
+                cipher.bitslice_pack(data), cipher.bitslice_circuit(table), ones
+            )
+            self.assertEqual(cipher.bitslice_unpack(planes, 256), table)
+
+
+class TestBytesAPI(unittest.TestCase):
+    def setUp(self):
+        self.key = cipher.parse_key("0123456789abcdef")
+        self.data = bytes(i for i in range(256) if i != 3) + b"tail"
+
+    def test_matches_text_api(self):
+        # Whole blocks are encrypted like text, PKCS#7 filling adds one block
+        data = self.data[:256]
+        for engine in cipher.ENGINES:
+            context = cipher.RijndaelContext(self.key, engine=engine)
+            expected = context.encrypt(data.decode("latin-1"))
+            encrypted = context.encrypt_bytes(data)
+            self.assertEqual(len(encrypted), len(data) + 16)
+            self.assertEqual(" ".join(map(str, encrypted[:256])), expected, engine)
+            self.assertEqual(context.decrypt_bytes(encrypted), data, engine)
+
+    def test_into_preallocated_buffer(self):
+        dst = bytearray(cipher.padded_length(len(self.data), 16) + 16)
+        length = cipher.encrypt_into(memoryview(self.data), dst, self.key)
+        self.assertEqual(length, len(dst) - 16)
+        self.assertEqual(dst[length:], bytes(16))
+
+        plain = bytearray(length)
+        plain_length = cipher.decrypt_into(dst[:length], plain, self.key)
+        self.assertEqual(plain[:plain_length], self.data)
+
+    def test_in_place(self):
+        context = cipher.RijndaelContext(self.key)
+        buffer = bytearray(48)
+        buffer[:32] = self.data[:32]
+        self.assertEqual(context.encrypt_into(memoryview(buffer)[:32], buffer), 48)
+        self.assertEqual(buffer, context.encrypt_bytes(self.data[:32]))
+        self.assertEqual(context.decrypt_into(buffer, buffer), 32)
+        self.assertEqual(buffer[:32], self.data[:32])
+
+    def test_binary_data_with_end_of_text(self):
+        # Data ending with 3rd element of ASCII table must come back unchanged
+        context = cipher.RijndaelContext(self.key)
+        for data in (
+            b"",
+            b"abc\x03",
+            bytes(15) + b"\x03",
+            b"A" * 17 + b"\x03",
+            b"\x03" * 16,
+            b"x" * 31 + b"\x03",
+            bytes(range(1, 17)),
+        ):
+            encrypted = context.encrypt_bytes(data)
+            self.assertEqual(len(encrypted), cipher.padded_length(len(data), 16))
+            self.assertEqual(context.decrypt_bytes(encrypted), data, data)
+
+    def test_buffer_too_small(self):
+        context = cipher.RijndaelContext(self.key)
+        with self.assertRaises(ValueError):
+            context.encrypt_into(b"sixteen bytes!!!", bytearray(16))
+        with self.assertRaises(ValueError):
+            context.decrypt_into(bytes(17), bytearray(32))
+        with self.assertRaises(ValueError):
+            context.decrypt_into(b"", bytearray(16))
+
+
+class TestCiphertextFormats(unittest.TestCase):
+    def setUp(self):
+        self.key = cipher.parse_key("0123456789abcdef")
+        self.text = "Hello, World!"
+
+    def test_round_trip(self):
+        for ciphertext_format in cipher.CIPHERTEXT_FORMATS:
+            encoded_message = cipher.encode_message(
+                self.text, self.key, ciphertext_format=ciphertext_format
+            )
+            decoded_message = cipher.decode_message(
+                encoded_message, self.key, ciphertext_format=ciphertext_format
+            )
+            self.assertEqual(decoded_message, self.text, ciphertext_format)
+
+    def test_same_bytes_in_every_format(self):
+        decimal = cipher.encode_message(self.text, self.key)
+        data = bytes(map(int, decimal.split()))
+        self.assertEqual(
+            cipher.encode_message(self.text, self.key, ciphertext_format="hex"),
+            data.hex(),
+        )
+        self.assertEqual(
+            cipher.encode_message(self.text, self.key, ciphertext_format="base64"),
+            base64.b64encode(data).decode("ascii"),
+        )
+        self.assertEqual(
+            cipher.encode_message(self.text, self.key, ciphertext_format="raw"), data
+        )
+
+    def test_reference_scheme(self):
+        size = 16
+        sbox = cipher.read_sbox(size)
+        inv_sbox = cipher.read_inv_sbox(size)
+        rcon = cipher.read_rcon(size)
+        round_keys = cipher.key_schedule(list(self.key), rcon, sbox)
+        encoded_message = cipher.encoder(
+            self.text, size, (0, 1, 2, 3), sbox, round_keys, "base64"
+        )
+        self.assertEqual(
+            encoded_message,
+            cipher.encode_message(self.text, self.key, ciphertext_format="base64"),
+        )
+        decoded_message = cipher.decoder(
+            encoded_message, size, (0, 1, 2, 3), inv_sbox, round_keys, "base64"
+        )
+        self.assertEqual(decoded_message, self.text)
+
+    def test_invalid_format(self):
+        with self.assertRaises(ValueError):
+            cipher.encode_message(self.text, self.key, ciphertext_format="octal")
+        with self.assertRaises(ValueError):
+            cipher.decode_message("zz", self.key, ciphertext_format="hex")
+
+
+class TestStreaming(unittest.TestCase):
+    def setUp(self):
+        self.context = cipher.RijndaelContext(cipher.parse_key("0123456789abcdef"))
+        self.data = bytes(i % 256 for i in range(10000)) + b"end\x03"
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def split(self, data, size):
+        return [data[i : i + size] for i in range(0, len(data), size)]
+
+    def test_chunks_of_any_length(self):
+        expected = self.context.encrypt_bytes(self.data)
+        for size in (1, 7, 16, 100, 4096):
+            chunks = self.split(self.data, size)
+            encrypted = b"".join(cipher.encrypt_stream(chunks, self.context))
+            self.assertEqual(encrypted, expected, size)
+            chunks = self.split(encrypted, size)
+            decrypted = b"".join(cipher.decrypt_stream(chunks, self.context))
+            self.assertEqual(decrypted, self.data, size)
+
+    def test_empty_stream(self):
+        encrypted = list(cipher.encrypt_stream([], self.context))
+        self.assertEqual(encrypted, [self.context.encrypt_bytes(b"")])
+        self.assertEqual(list(cipher.decrypt_stream(encrypted, self.context)), [])
+        with self.assertRaises(ValueError):
+            list(cipher.decrypt_stream([b""], self.context))
+
+    def test_files(self):
+        plain = os.path.join(self.directory.name, "plain")
+        encrypted = os.path.join(self.directory.name, "encrypted")
+        decrypted = os.path.join(self.directory.name, "decrypted")
+        with open(plain, "wb") as file:
+            file.write(self.data)
+
+        cipher.encrypt_file(plain, encrypted, self.context, chunk_size=1000)
+        cipher.decrypt_file(encrypted, decrypted, self.context, chunk_size=333)
+        with open(decrypted, "rb") as file:
+            self.assertEqual(file.read(), self.data)
+
+    def test_command_line(self):
+        plain = os.path.join(self.directory.name, "plain")
+        encrypted = os.path.join(self.directory.name, "encrypted")
+        decrypted = os.path.join(self.directory.name, "decrypted")
+        with open(plain, "wb") as file:
+            file.write(self.data)
+
+        key = ["--key", "0123456789abcdef"]
+        self.assertEqual(cipher.main(["encrypt", plain, encrypted] + key), 0)
+        self.assertEqual(cipher.main(["decrypt", encrypted, decrypted] + key), 0)
+        with open(encrypted, "rb") as file:
+            self.assertEqual(file.read(), self.context.encrypt_bytes(self.data))
+        with open(decrypted, "rb") as file:
+            self.assertEqual(file.read(), self.data)
+
+    def test_same_src_and_dst(self):
+        path = os.path.join(self.directory.name, "file")
+        with open(path, "wb") as file:
+            file.write(self.data)
+
+        cipher.encrypt_file(path, path, self.context, chunk_size=1000)
+        with open(path, "rb") as file:
+            self.assertEqual(file.read(), self.context.encrypt_bytes(self.data))
+        cipher.decrypt_file(path, path, self.context)
+        with open(path, "rb") as file:
+            self.assertEqual(file.read(), self.data)
+
+    def test_damaged_file_leaves_no_output(self):
+        encrypted = os.path.join(self.directory.name, "encrypted")
+        decrypted = os.path.join(self.directory.name, "decrypted")
+        with open(encrypted, "wb") as file:
+            file.write(self.context.encrypt_bytes(self.data)[:-5])
+
+        with self.assertRaises(ValueError):
+            cipher.decrypt_file(encrypted, decrypted, self.context, chunk_size=64)
+        self.assertEqual(os.listdir(self.directory.name), ["encrypted"])
+
+    def test_command_line_errors(self):
+        missing = os.path.join(self.directory.name, "missing")
+        output = os.path.join(self.directory.name, "output")
+        with mock.patch("sys.stderr"), self.assertRaises(SystemExit):
+            cipher.main(["encrypt", missing, output, "--key", "0123456789abcdef"])
+        self.assertFalse(os.path.exists(output))
+
+    def test_bounded_memory(self):
+        # Peak memory is the same for short and 16 times longer data
+        chunk = bytes(256)
+
+        def peak_memory(count):
+            tracemalloc.start()
+            for encrypted in cipher.encrypt_stream([chunk] * count, self.context):
+                pass
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return peak
+
+        short = peak_memory(4)
+        long = peak_memory(64)
+        self.assertLess(long, short * 1.5 + 1024)
+
+
+class TestKeyScheduleCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = cipher.KeyScheduleCache(capacity=2)
+        self.keys = [[number] * 16 for number in range(3)]
+
+    def test_hits_and_misses(self):
+        context = self.cache.get(self.keys[0])
+        self.assertIs(self.cache.get(self.keys[0]), context)
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (1, 1, 1))
+
+    def test_least_recently_used_evicted(self):
+        first = self.cache.get(self.keys[0])
+        self.cache.get(self.keys[1])
+        self.cache.get(self.keys[0])
+        self.cache.get(self.keys[2])
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+        self.assertIs(self.cache.get(self.keys[0]), first)
+        self.assertEqual(self.cache.stats()["misses"], 3)
+        self.cache.get(self.keys[1])
+        self.assertEqual(self.cache.stats()["misses"], 4)
+
+    def test_evict_clear_resize(self):
+        self.cache.get(self.keys[0])
+        self.cache.get(self.keys[1])
+        self.assertTrue(self.cache.evict(self.keys[0]))
+        self.assertFalse(self.cache.evict(self.keys[0]))
+        self.cache.clear()
+        self.assertEqual(self.cache.stats()["size"], 0)
+        self.assertEqual(self.cache.stats()["evictions"], 2)
+        self.cache.resize(0)
+        self.cache.get(self.keys[0])
+        self.assertEqual(self.cache.stats()["size"], 0)
+
+    def test_engines_cached_separately(self):
+        tables = self.cache.get(self.keys[0], "tables")
+        reference = self.cache.get(self.keys[0], "reference")
+        self.assertEqual((tables.engine, reference.engine), ("tables", "reference"))
+
+    def test_thread_safe(self):
+        cache = cipher.KeyScheduleCache(capacity=8)
+
+        def get(number):
+            return cache.get(self.keys[number % 3]).key[0] == number % 3
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            self.assertTrue(all(executor.map(get, range(300))))
+        stats = cache.stats()
+        self.assertEqual(stats["hits"] + stats["misses"], 300)
+        self.assertEqual(stats["size"], 3)
+
+    def test_encode_message_uses_cache(self):
+        key = cipher.parse_key("0123456789abcdef")
+        cipher.encode_message("python", key)
+        hits = cipher.KEY_CACHE.stats()["hits"]
+        cipher.encode_message("python", key)
+        self.assertEqual(cipher.KEY_CACHE.stats()["hits"], hits + 1)
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.metrics = cipher.Metrics(enabled=True)
+        self.metrics.descriptions = dict(cipher.METRICS.descriptions)
+        patcher = mock.patch.object(cipher, "METRICS", self.metrics)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_blocks_and_times_recorded(self):
+        context = cipher.RijndaelContext(cipher.parse_key("0123456789abcdef"))
+        encrypted = context.encrypt_bytes(bytes(40))
+        context.decrypt_bytes(encrypted)
+        counters = self.metrics.counters
+        self.assertEqual(counters["rijndael_blocks_encrypted_total", ()], 3)
+        self.assertEqual(counters["rijndael_blocks_decrypted_total", ()], 3)
+        text = self.metrics.render()
+        self.assertIn("# TYPE rijndael_key_schedule_seconds histogram", text)
+        self.assertIn("rijndael_key_schedule_seconds_count 1", text)
+        self.assertIn('rijndael_encrypt_seconds_bucket{le="+Inf"} 2', text)
+        self.assertIn("rijndael_blocks_decrypted_total 3", text)
+
+    def test_disabled_records_nothing(self):
+        self.metrics.enabled = False
+        context = cipher.RijndaelContext(cipher.parse_key("0123456789abcdef"))
+        context.decrypt_bytes(context.encrypt_bytes(b"python"))
+        self.assertEqual((self.metrics.counters, self.metrics.histograms), ({}, {}))
+
+    def test_histogram_buckets_are_cumulative(self):
+        metrics = cipher.Metrics(enabled=True, buckets=(0.1, 1.0))
+        metrics.describe("latency", "histogram", "Latency")
+        for seconds in (0.05, 0.1, 0.5, 2.0):
+            metrics.observe("latency", seconds, (("endpoint", "/encode"),))
+        self.assertEqual(
+            metrics.render().splitlines()[2:],
+            [
+                'latency_bucket{endpoint="/encode",le="0.1"} 2',
+                'latency_bucket{endpoint="/encode",le="1.0"} 3',
+                'latency_bucket{endpoint="/encode",le="+Inf"} 4',
+                'latency_sum{endpoint="/encode"} 2.65',
+                'latency_count{endpoint="/encode"} 4',
+            ],
+        )
+
+
+class TestCompiledTables(unittest.TestCase):
+    def test_compiled_tables_match_data_files(self):
+        # cipher_tables.py must be generated again after data/*.txt change
+        self.assertEqual(
+            cipher.load_compiled_tables(16),
+            (
+                bytes(cipher.read_sbox(16)),
+                bytes(cipher.read_inv_sbox(16)),
+                bytes(cipher.read_rcon(16)),
+            ),
+        )
+
+    def test_compile_tables(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "tables.py")
+            cipher.compile_tables(path)
+            namespace = {}
+            with open(path) as file:
+                exec(file.read(), namespace)
+        self.assertEqual(namespace["SBOX"], bytes(cipher.read_sbox(16)))
+        self.assertEqual(
+            namespace["CHECKSUM"],
+            cipher.tables_checksum(
+                namespace["SBOX"], namespace["INV_SBOX"], namespace["RCON"]
+            ),
+        )
+
+    def test_damaged_module_rejected(self):
+        damaged = mock.Mock(
+            SIZE=16, SBOX=bytes(256), INV_SBOX=bytes(256), RCON=bytes(256)
+        )
+        damaged.CHECKSUM = "0" * 64
+        with mock.patch.dict("sys.modules", {cipher.TABLES_MODULE: damaged}):
+            with self.assertRaises(ValueError):
+                cipher.load_compiled_tables(16)
+
+    def test_missing_module(self):
+        with mock.patch.object(cipher, "TABLES_MODULE", "missing_tables_module"):
+            self.assertIsNone(cipher.load_compiled_tables(16))
+
+    def test_generate_inside_key_concurrently(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(directory.name)
+        os.mkdir("data")
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(cipher.generate_inside_key, [16] * 16))
+        sbox = cipher.read_sbox(16)
+        inv_sbox = cipher.read_inv_sbox(16)
+        self.assertEqual([inv_sbox[item] for item in sbox], list(range(256)))
+        self.assertEqual(sorted(os.listdir("data")), ["inv_sbox.txt", "sbox.txt"])
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.key = cipher.parse_key("0123456789abcdef")
+        self.messages = ["python", "", "x" * 33, "\xff" * 16]
+
+    def test_same_as_single_messages(self):
+        for ciphertext_format in cipher.CIPHERTEXT_FORMATS:
+            encoded = cipher.encode_batch(
+                self.messages, self.key, ciphertext_format=ciphertext_format
+            )
+            self.assertEqual(
+                encoded,
+                [
+                    cipher.encode_message(message, self.key, None, ciphertext_format)
+                    for message in self.messages
+                ],
+            )
+            self.assertEqual(
+                cipher.decode_batch(
+                    encoded, self.key, ciphertext_format=ciphertext_format
+                ),
+                self.messages,
+            )
+
+    def test_single_pass(self):
+        context = cipher.RijndaelContext(self.key)
+        with mock.patch.object(
+            context, "encrypt_blocks", wraps=context.encrypt_blocks
+        ) as encrypt_blocks:
+            context.encrypt_many(self.messages)
+        encrypt_blocks.assert_called_once()
+
+
+class TestCiphertextReader(unittest.TestCase):
+    def setUp(self):
+        self.context = cipher.RijndaelContext(cipher.parse_key("0123456789abcdef"))
+        self.data = bytes(i * 7 % 256 for i in range(10000)) + b"end\x03"
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        src = os.path.join(self.directory.name, "data")
+        self.path = os.path.join(self.directory.name, "data.enc")
+        with open(src, "wb") as file:
+            file.write(self.data)
+        cipher.encrypt_file(src, self.path, self.context)
+
+    def test_ranges(self):
+        with cipher.CiphertextReader(self.path, self.context, cache_blocks=8) as reader:
+            self.assertEqual(reader.read(), self.data)
+            for start, length in (
+                (0, 1),
+                (15, 2),
+                (100, 1000),
+                (9990, 100),
+                (20000, 5),
+            ):
+                self.assertEqual(reader.seek(start), start)
+                chunk = reader.read(length)
+                self.assertEqual(chunk, self.data[start : start + length])
+                self.assertEqual(reader.tell(), start + len(chunk))
+            reader.seek(-4, io.SEEK_END)
+            self.assertEqual(reader.read(), b"end\x03")
+            reader.seek(-8, io.SEEK_CUR)
+            self.assertEqual(reader.read(4), self.data[-8:-4])
+            with self.assertRaises(ValueError):
+                reader.seek(-1)
+
+    def test_only_touched_blocks_decrypted(self):
+        with mock.patch.object(
+            self.context, "decrypt_blocks", wraps=self.context.decrypt_blocks
+        ) as decrypt_blocks:
+            reader = cipher.CiphertextReader(self.path, self.context)
+            reader.seek(1000)
+            self.assertEqual(reader.read(40), self.data[1000:1040])
+            reader.seek(1010)
+            self.assertEqual(reader.read(10), self.data[1010:1020])
+            reader.close()
+        # the last block (filling) and blocks 62..64, the second read is cached
+        lengths = [len(call.args[0]) for call in decrypt_blocks.call_args_list]
+        self.assertEqual(lengths, [16, 48])
+
+    def test_cache_is_bounded(self):
+        with cipher.CiphertextReader(self.path, self.context, cache_blocks=8) as reader:
+            reader.read()
+            self.assertEqual(len(reader.cache), 8)
+
+    def test_wrong_key(self):
+        context = cipher.RijndaelContext(cipher.parse_key("fedcba9876543210"))
+        with self.assertRaises(ValueError):
+            cipher.CiphertextReader(self.path, context)
+
+    def test_buffered(self):
+        reader = cipher.CiphertextReader(self.path, self.context)
+        with io.BufferedReader(reader, buffer_size=100) as file:
+            file.seek(5000)
+            self.assertEqual(file.read(3), self.data[5000:5003])
+        self.assertTrue(reader.closed)
+
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.context = cipher.RijndaelContext(cipher.parse_key("0123456789abcdef"))
+        self.data = bytearray(range(256)) * 4
+
+    def memory(self, function, table, rounds):
+        round_keys = self.context.round_keys[: rounds + 1]
+        output = bytearray(len(self.data))
+        function(self.data, output, (0, 1, 2, 3), table, round_keys)
+        tracemalloc.start()
+        function(self.data, output, (0, 1, 2, 3), table, round_keys)
+        memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return memory
+
+    def test_allocations_independent_of_rounds(self):
+        # all rounds change the same state list, so 10 rounds need
+        # no more memory than 2 and nothing is left allocated
+        for function, table in (
+            (cipher.pipeline_encrypt_blocks, self.context.sbox),
+            (cipher.pipeline_decrypt_blocks, self.context.inv_sbox),
+        ):
+            current_2, peak_2 = self.memory(function, table, 2)
+            current_10, peak_10 = self.memory(function, table, 10)
+            self.assertEqual((current_2, current_10), (0, 0))
+            self.assertAlmostEqual(peak_10, peak_2, delta=64)
+            self.assertLess(peak_10, 2048)
+
+    def test_in_place_mix_columns(self):
+        block = list(range(16))
+        self.assertEqual(
+            cipher.mix_columns_in_place(
+                list(block), cipher.load_gf_table(2), cipher.load_gf_table(3)
+            ),
+            cipher.mix_columns(block),
+        )
+        tables = [cipher.load_gf_table(factor) for factor in (9, 11, 13, 14)]
+        self.assertEqual(
+            cipher.inv_mix_columns_in_place(list(block), *tables),
+            cipher.inv_mix_columns(block),
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,75 @@
+import asyncio
+import unittest
+
+import loadtest
+
+
+class TestLoadTest(unittest.TestCase):
+    def test_parse_mix(self):
+        self.assertEqual(
+            loadtest.parse_mix("16:8,1K:4,16K", loadtest.parse_size),
+            [(16, 8.0), (1024, 4.0), (16384, 1.0)],
+        )
+        self.assertEqual(
+            loadtest.parse_mix("encode:3,decode"), [("encode", 3.0), ("decode", 1.0)]
+        )
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(loadtest.percentile(values, 50), 50)
+        self.assertEqual(loadtest.percentile(values, 99), 99)
+        self.assertEqual(loadtest.percentile(values, 100), 100)
+        self.assertEqual(loadtest.percentile([7], 1), 7)
+        self.assertEqual(loadtest.percentile([], 50), 0.0)
+
+    def test_in_process_report(self):
+        report = asyncio.run(
+            loadtest.load_test(
+                concurrency=4,
+                duration=30,
+                total=40,
+                sizes="16,1K",
+                ciphertext_format="hex",
+            )
+        )
+        results = report["results"]
+        self.assertEqual(results["total"]["requests"], 40)
+        self.assertEqual(results["total"]["errors"], 0)
+        for name in ("encode/16", "decode/16", "encode/1024", "decode/1024"):
+            self.assertIn(name, results)
+        latency = results["total"]["latency_ms"]
+        self.assertLessEqual(latency["p50"], latency["p99"])
+        self.assertLessEqual(latency["p99"], latency["max"])
+
+    def test_http_client_counts_errors(self):
+        async def handle(reader, writer):
+            while await reader.readline():
+                while await reader.readline() != b"\r\n":
+                    pass
+                # every second request fails
+                handle.count += 1
+                body = b'{"Response":"x"}' if handle.count % 2 else b'["KEY"]'
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\ncontent-length: %d\r\n\r\n" % len(body) + body
+                )
+                await writer.drain()
+            writer.close()
+
+        handle.count = 0
+
+        async def run():
+            server = await asyncio.start_server(handle, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            requests = loadtest.build_requests([(16, 1)], [("encode", 1)])
+            client = loadtest.HttpClient("http://127.0.0.1:{}".format(port))
+            async with server:
+                return await loadtest.run_load([client], requests, 30, total=10)
+
+        results = asyncio.run(run())
+        self.assertEqual(results["total"]["requests"], 10)
+        self.assertEqual(results["total"]["errors"], 5)
+        self.assertEqual(results["encode/16"]["error_rate"], 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,186 @@
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+
+import cipher
+import modes
+
+
+class TestCounterMode(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.context = cipher.RijndaelContext(cipher.parse_key("0123456789abcdef"))
+        cls.nonce = b"\x00\x01\x02\x03\x04\x05\x06\x07"
+        cls.data = bytes(i * 7 % 256 for i in range(5000)) + b"\x03"
+
+    def test_round_trip(self):
+        encrypted = modes.ctr_crypt(self.context, self.data, self.nonce)
+        self.assertEqual(len(encrypted), len(self.data))
+        self.assertNotEqual(encrypted, self.data)
+        self.assertEqual(
+            modes.ctr_crypt(self.context, encrypted, self.nonce), self.data
+        )
+
+    def test_keystream_is_encrypted_counter(self):
+        # The first block is plaintext xored with the encrypted counter block 0
+        counter = modes.counter_blocks(self.nonce, 0, 1)
+        keystream = self.context.encrypt_blocks(counter, bytearray(16))
+        encrypted = modes.ctr_crypt(self.context, bytes(16), self.nonce)
+        self.assertEqual(encrypted, keystream)
+
+    def test_identical_blocks_differ(self):
+        encrypted = modes.ctr_crypt(self.context, bytes(32), self.nonce)
+        self.assertNotEqual(encrypted[:16], encrypted[16:])
+
+    def test_parallel_matches_sequential(self):
+        expected = modes.ctr_crypt(self.context, self.data, self.nonce)
+        with mock.patch.object(modes, "PARALLEL_MIN", 0):
+            with ProcessPoolExecutor(2) as executor:
+                result = modes.ctr_crypt(
+                    self.context, self.data, self.nonce, workers=3, executor=executor
+                )
+        self.assertEqual(result, expected)
+
+    def test_split_segments(self):
+        self.assertEqual(modes.split_segments(100, 3), [(0, 48), (48, 96), (96, 100)])
+        self.assertEqual(modes.split_segments(16, 4), [(0, 16)])
+        self.assertEqual(modes.split_segments(0, 4), [])
+
+    def test_wrong_nonce(self):
+        with self.assertRaises(ValueError):
+            modes.ctr_crypt(self.context, self.data, b"short")
+
+
+class TestCipherBlockChaining(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.context = cipher.RijndaelContext(cipher.parse_key("0123456789abcdef"))
+        cls.iv = bytes(range(16))
+        cls.data = bytes(i * 13 % 256 for i in range(3000)) + b"\x03"
+
+    def test_round_trip(self):
+        for data in (b"", b"\x03", bytes(16), self.data):
+            encrypted = modes.cbc_encrypt(self.context, data, self.iv)
+            self.assertEqual(len(encrypted), cipher.padded_length(len(data), 16))
+            self.assertEqual(modes.cbc_decrypt(self.context, encrypted, self.iv), data)
+
+    def test_first_block(self):
+        # The first block is encrypted after xor with iv
+        block = bytes(modes.xor_bytes(self.data[:16], self.iv))
+        expected = self.context.encrypt_blocks(block, bytearray(16))
+        encrypted = modes.cbc_encrypt(self.context, self.data, self.iv)
+        self.assertEqual(encrypted[:16], expected)
+
+    def test_identical_blocks_differ(self):
+        encrypted = modes.cbc_encrypt(self.context, bytes(32), self.iv)
+        self.assertNotEqual(encrypted[:16], encrypted[16:32])
+
+    def test_parallel_matches_sequential(self):
+        encrypted = modes.cbc_encrypt(self.context, self.data, self.iv)
+        expected = modes.cbc_decrypt(self.context, encrypted, self.iv)
+        with mock.patch.object(modes, "PARALLEL_MIN", 0):
+            with ProcessPoolExecutor(2) as executor:
+                for workers in (2, 3, 7):
+                    result = modes.cbc_decrypt(
+                        self.context, encrypted, self.iv, workers, executor
+                    )
+                    self.assertEqual(result, expected, workers)
+        self.assertEqual(expected, self.data)
+
+    def test_damaged_data(self):
+        with self.assertRaises(ValueError):
+            modes.cbc_decrypt(self.context, bytes(15), self.iv)
+        with self.assertRaises(ValueError):
+            modes.cbc_encrypt(self.context, self.data, b"short")
+
+
+class TestGaloisCounterMode(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.context = cipher.RijndaelContext(cipher.parse_key("0123456789abcdef"))
+        cls.nonce = bytes(range(12))
+        cls.aad = b"header"
+        cls.data = bytes(i * 11 % 256 for i in range(1000))
+
+    @staticmethod
+    def multiply(first, second):
+        # GF(2^128) multiplication bit by bit, as in the GCM specification
+        result = 0
+        for bit in range(127, -1, -1):
+            if first >> bit & 1:
+                result ^= second
+            second = modes.gf128_mul_x(second)
+        return result
+
+    def test_tables_match_multiplication(self):
+        subkey = bytes(i * 37 % 256 for i in range(16))
+        tables = modes.generate_ghash_tables(subkey)
+        value = int.from_bytes(bytes(range(100, 116)), "big")
+        expected = self.multiply(value, int.from_bytes(subkey, "big"))
+        result = 0
+        for table, byte in zip(tables, value.to_bytes(16, "big")):
+            result ^= table[byte]
+        self.assertEqual(result, expected)
+
+    def test_ghash_known_answer(self):
+        # GHASH of test case 2 from the GCM specification (AES-128 with zero key)
+        tables = modes.generate_ghash_tables(
+            bytes.fromhex("66e94bd4ef8a2c3b884cfa59ca342b2e")
+        )
+        ciphertext = bytes.fromhex("0388dace60b6a392f328c2b971b2fe78")
+        self.assertEqual(
+            modes.ghash(tables, b"", ciphertext).hex(),
+            "f38cbb1ad69223dcc3457ae5b6b0f885",
+        )
+
+    def test_round_trip(self):
+        for data in (b"", b"\x03", bytes(16), self.data):
+            encrypted, tag = modes.gcm_encrypt(self.context, data, self.nonce, self.aad)
+            self.assertEqual(len(encrypted), len(data))
+            self.assertEqual(len(tag), modes.TAG_SIZE)
+            self.assertEqual(
+                modes.gcm_decrypt(self.context, encrypted, self.nonce, tag, self.aad),
+                data,
+            )
+
+    def test_keystream_starts_after_tag_block(self):
+        counter = modes.gcm_counter_blocks(self.nonce, 2, 1)
+        self.assertEqual(counter, self.nonce + b"\x00\x00\x00\x02")
+        expected = self.context.encrypt_blocks(counter, bytearray(16))
+        encrypted, tag = modes.gcm_encrypt(self.context, bytes(16), self.nonce)
+        self.assertEqual(encrypted, expected)
+
+    def test_tables_cached_in_context(self):
+        context = cipher.RijndaelContext(cipher.parse_key("fedcba9876543210"))
+        self.assertIsNone(context.ghash_tables)
+        modes.gcm_encrypt(context, self.data, self.nonce)
+        tables = context.ghash_tables
+        with mock.patch.object(modes, "generate_ghash_tables") as generate:
+            modes.gcm_encrypt(context, self.data, self.nonce)
+            generate.assert_not_called()
+        self.assertIs(context.ghash_tables, tables)
+
+    def test_tampering_detected(self):
+        encrypted, tag = modes.gcm_encrypt(
+            self.context, self.data, self.nonce, self.aad
+        )
+        damaged = bytearray(encrypted)
+        damaged[500] ^= 1
+        other = cipher.RijndaelContext(cipher.parse_key("fedcba9876543210"))
+        for context, data, nonce, tag_, aad in (
+            (self.context, damaged, self.nonce, tag, self.aad),
+            (self.context, encrypted, bytes(12), tag, self.aad),
+            (self.context, encrypted, self.nonce, bytes(16), self.aad),
+            (self.context, encrypted, self.nonce, tag, b"other"),
+            (other, encrypted, self.nonce, tag, self.aad),
+        ):
+            with self.assertRaises(ValueError):
+                modes.gcm_decrypt(context, data, nonce, tag_, aad)
+
+    def test_wrong_nonce_size(self):
+        with self.assertRaises(ValueError):
+            modes.gcm_encrypt(self.context, self.data, self.nonce[:8])
+
+
+if __name__ == "__main__":
+    unittest.main()